@@ -0,0 +1,246 @@
+"""
+Extractor micro-benchmarks on synthetic pages.
+
+    PYTHONPATH=src python -m benchmarks.bench_extractors --output results.json
+    PYTHONPATH=src python -m benchmarks.bench_extractors --baseline results.json --max-regression 0.15
+
+Each case parses one generated page repeatedly and reports pages/sec, the
+time spent in every `_extract_*` method (inclusive of the methods it calls)
+and the peak Python heap each method allocates. lxml's own allocations are
+not visible to tracemalloc; the process' max RSS is reported alongside.
+
+Detail pages are parsed by the compiled engine (`detail:*` cases) and by
+the reference implementation it replaced (`detail-reference:*`), which
+still calls the `_extract_*` methods.
+
+With `--baseline`, the run exits with status 1 when any case's pages/sec
+drops more than `--max-regression` below the baseline.
+"""
+import argparse
+import datetime
+import functools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+from brs.extractors import BusinessRegistryExtractor
+
+from . import pages
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _max_rss_kb() -> int:
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+class MethodProbe:
+    """Wraps an extractor's `_extract_*` methods to record their time and peak heap."""
+
+    def __init__(self, extractor: BusinessRegistryExtractor, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.peak_bytes: Dict[str, int] = defaultdict(int)
+        # Absolute traced peaks seen so far by each method on the call stack
+        self._stack: List[int] = []
+        for name in dir(extractor):
+            if name.startswith('_extract_') and callable(getattr(extractor, name)):
+                setattr(extractor, name, self._wrap(name, getattr(extractor, name)))
+
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        def probe(*args, **kwargs):
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                if self._stack:
+                    # Keep the caller's peak before resetting it for this call
+                    self._stack[-1] = max(self._stack[-1], peak)
+                tracemalloc.reset_peak()
+                self._stack.append(current)
+                start_bytes = current
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - started
+                self.calls[name] += 1
+                if self.trace_memory:
+                    absolute_peak = max(self._stack.pop(), tracemalloc.get_traced_memory()[1])
+                    self.peak_bytes[name] = max(self.peak_bytes[name], absolute_peak - start_bytes)
+                    if self._stack:
+                        self._stack[-1] = max(self._stack[-1], absolute_peak)
+
+        return probe
+
+
+def _run_case(parse: Callable[[BusinessRegistryExtractor], Any], min_time: float, min_iterations: int,
+              memory_iterations: int) -> Dict[str, Any]:
+    # Throughput, without any instrumentation
+    extractor = BusinessRegistryExtractor()
+    iterations = 0
+    started = time.perf_counter()
+    while True:
+        parse(extractor)
+        iterations += 1
+        elapsed = time.perf_counter() - started
+        if iterations >= min_iterations and elapsed >= min_time:
+            break
+
+    # Per-method time
+    extractor = BusinessRegistryExtractor()
+    timing = MethodProbe(extractor)
+    for _ in range(iterations):
+        parse(extractor)
+
+    # Per-method peak memory (tracemalloc slows everything down, so fewer iterations)
+    extractor = BusinessRegistryExtractor()
+    memory = MethodProbe(extractor, trace_memory=True)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        for _ in range(memory_iterations):
+            parse(extractor)
+        page_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'seconds': elapsed,
+        'pages_per_sec': iterations / elapsed,
+        'page_peak_bytes': page_peak,
+        'methods': {
+            name: {
+                'calls_per_page': timing.calls[name] / iterations,
+                'ms_per_page': 1000 * timing.seconds[name] / iterations,
+                'peak_bytes': memory.peak_bytes[name],
+            }
+            for name in sorted(timing.calls)
+        },
+    }
+
+
+def run(listing_sizes: List[int], activity_sizes: List[int], min_time: float = 1.0, min_iterations: int = 5,
+        memory_iterations: int = 2, seed: int = 0) -> Dict[str, Any]:
+    """Run every search and detail case and return the results document."""
+    cases = {}
+
+    for size in listing_sizes:
+        html = pages.search_page(size, seed=seed)
+        url = pages.search_url()
+        cases[f'search:listings={size}'] = _run_case(
+            lambda extractor: extractor.extract_business_listings(html, url),
+            min_time, min_iterations, memory_iterations,
+        )
+        cases[f'search:listings={size}']['html_bytes'] = len(html.encode('utf-8'))
+
+    for size in activity_sizes:
+        html = pages.detail_page(activities=size, seed=seed)
+        url = pages.detail_url(100001)
+        cases[f'detail:activities={size}'] = _run_case(
+            lambda extractor: extractor.extract_business_details(html, url),
+            min_time, min_iterations, memory_iterations,
+        )
+        cases[f'detail:activities={size}']['html_bytes'] = len(html.encode('utf-8'))
+        cases[f'detail-reference:activities={size}'] = _run_case(
+            lambda extractor: extractor.extract_business_details_reference(html, url),
+            min_time, min_iterations, memory_iterations,
+        )
+        cases[f'detail-reference:activities={size}']['html_bytes'] = len(html.encode('utf-8'))
+
+    return {
+        'benchmark': 'extractors',
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'max_rss_kb': _max_rss_kb(),
+        'cases': cases,
+    }
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Cases whose pages/sec fell more than `max_regression` (a fraction) below the baseline."""
+    regressions = []
+    for name, case in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous:
+            continue
+        floor = previous['pages_per_sec'] * (1 - max_regression)
+        if case['pages_per_sec'] < floor:
+            regressions.append(
+                f"{name}: {case['pages_per_sec']:.1f} pages/sec, baseline {previous['pages_per_sec']:.1f} "
+                f"(floor {floor:.1f})"
+            )
+    return regressions
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    lines = []
+    for name, case in results['cases'].items():
+        lines.append(
+            f"{name}: {case['pages_per_sec']:.1f} pages/sec, {case['html_bytes'] / 1024:.1f} KiB/page, "
+            f"peak heap {case['page_peak_bytes'] / 1024:.0f} KiB"
+        )
+        for method, stats in case['methods'].items():
+            lines.append(
+                f"  {method}: {stats['ms_per_page']:.3f} ms/page over {stats['calls_per_page']:g} calls, "
+                f"peak {stats['peak_bytes'] / 1024:.1f} KiB"
+            )
+    lines.append(f"max RSS {results['max_rss_kb'] / 1024:.1f} MiB")
+    return '\n'.join(lines)
+
+
+def _sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the registry extractors on synthetic pages')
+    parser.add_argument('--listings', type=_sizes, default=[1, 50, 500],
+                        help='Comma-separated listing counts per search page (default: 1,50,500)')
+    parser.add_argument('--activities', type=_sizes, default=[0, 20, 200],
+                        help='Comma-separated activity rows per detail page (default: 0,20,200)')
+    parser.add_argument('--min-time', type=float, default=1.0,
+                        help='Minimum seconds to run each case for (default: 1.0)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the page generator (default: 0)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against the results in this JSON file')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed pages/sec drop against the baseline, as a fraction (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    results = run(args.listings, args.activities, min_time=args.min_time, seed=args.seed)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.max_regression)
+        if regressions:
+            print('Throughput regressed past the threshold:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print(f'No case regressed more than {args.max_regression:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
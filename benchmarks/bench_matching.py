@@ -0,0 +1,118 @@
+"""
+Name matching benchmark on generated business names.
+
+    PYTHONPATH=src python -m benchmarks.bench_matching --queries 100,1000,10000
+
+For each query count it builds a NameMatcher in exact and fuzzy mode and
+reports the build time and the time per matched name. The names are a mix
+of queries spelled differently (case, punctuation, "Private Limited"),
+queries with a typo and names that match nothing. `linear` is the matching
+this replaced, comparing each name against every query in turn.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+from brs.matching import NameMatcher
+
+from .pages import WORDS
+
+SYLLABLES = ['ra', 'ni', 'ma', 'lo', 'ha', 'shi', 'fu', 'du', 'ke', 'vaa', 'thi', 'ba', 'ru', 'za', 'mee', 'go']
+
+
+def generate_queries(count: int, rng: random.Random) -> List[str]:
+    queries = set()
+    while len(queries) < count:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        queries.add(f'{word.upper()} {rng.choice(WORDS).upper()} Pvt Ltd')
+    return sorted(queries)
+
+
+def generate_names(queries: List[str], count: int, rng: random.Random) -> List[str]:
+    """Names to match: a quarter respelled, a quarter with a typo, half unrelated."""
+    names = []
+    for i in range(count):
+        query = rng.choice(queries)
+        if i % 4 == 0:
+            names.append(query.lower().replace('pvt ltd', '(Private) Limited.'))
+        elif i % 4 == 1:
+            position = rng.randrange(len(query) - 8)
+            names.append(query[:position] + rng.choice('aeiou') + query[position + 1:])
+        else:
+            names.append(generate_queries(1, rng)[0])
+    return names
+
+
+def linear_match(queries: List[str], name: str) -> bool:
+    return any(name.strip().lower() == query.strip().lower() for query in queries)
+
+
+def _time_per_name(match, names: List[str], min_time: float) -> Dict[str, Any]:
+    matched = 0
+    iterations = 0
+    started = time.perf_counter()
+    while True:
+        for name in names:
+            if match(name):
+                matched += 1
+        iterations += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+    return {
+        'us_per_name': 1e6 * elapsed / (iterations * len(names)),
+        'matched_fraction': matched / (iterations * len(names)),
+    }
+
+
+def run(query_counts: List[int], names: int = 2000, threshold: float = 0.8, min_time: float = 0.5,
+        seed: int = 0) -> Dict[str, Any]:
+    cases = {}
+    for count in query_counts:
+        rng = random.Random(seed)
+        queries = generate_queries(count, rng)
+        sample = generate_names(queries, names, rng)
+        for mode in ('exact', 'fuzzy'):
+            started = time.perf_counter()
+            matcher = NameMatcher.from_queries(queries, mode=mode, threshold=threshold)
+            build_sec = time.perf_counter() - started
+            cases[f'{mode}:queries={count}'] = {
+                'build_sec': build_sec,
+                **_time_per_name(matcher.match, sample, min_time),
+            }
+        cases[f'linear:queries={count}'] = _time_per_name(lambda name: linear_match(queries, name), sample, min_time)
+    return {'benchmark': 'matching', 'seed': seed, 'threshold': threshold, 'cases': cases}
+
+
+def _counts(value: str) -> List[int]:
+    return [int(count) for count in value.split(',') if count.strip()]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark name matching against generated queries')
+    parser.add_argument('--queries', type=_counts, default=[100, 1000, 10000],
+                        help='Comma-separated query counts (default: 100,1000,10000)')
+    parser.add_argument('--names', type=int, default=2000, help='Names matched per case (default: 2000)')
+    parser.add_argument('--threshold', type=float, default=0.8, help='Fuzzy match threshold (default: 0.8)')
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help='Minimum seconds to run each case for (default: 0.5)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the name generator (default: 0)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run(args.queries, args.names, args.threshold, args.min_time, args.seed)
+    for name, case in results['cases'].items():
+        build = f"  build {case['build_sec'] * 1000:8.1f} ms" if 'build_sec' in case else ''
+        print(f"{name:24} {case['us_per_name']:10.2f} us/name  matched {case['matched_fraction']:.0%}{build}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
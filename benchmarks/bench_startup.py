@@ -0,0 +1,163 @@
+"""
+Import-time and startup benchmark of the `brs` command.
+
+    PYTHONPATH=src python -m benchmarks.bench_startup --output startup.json
+    PYTHONPATH=src python -m benchmarks.bench_startup --baseline startup.json --max-regression 0.2
+
+Every case runs a fresh `python` process `--repeat` times and reports the
+median wall time:
+
+- `python`: the bare interpreter, for reference
+- `import:<module>`: importing the CLI module and the crawler module, with
+  the cumulative import time `-X importtime` reports for them
+- `help`: `brs --help`
+- `lookup`: `brs lookup` on a one-business index
+- `crawl`: a single-name check (`brs NAME --exact-match-only`) against the
+  fake registry, started in this process without added latency
+
+With `--baseline`, the run exits with status 1 when any case's median time
+grows more than `--max-regression` above the baseline.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from brs.index import BusinessIndex
+
+from .fake_registry import Corpus, FakeRegistry
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+IMPORTED_MODULES = ['brs.__main__', 'brs.main']
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SRC_DIR, env.get('PYTHONPATH')]))
+    return env
+
+
+def _time_command(command: List[str], repeat: int, cwd: str) -> Dict[str, Any]:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=cwd, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            raise RuntimeError(f'{" ".join(command)} failed:\n{result.stderr.decode(errors="replace")}')
+    return {'median_sec': statistics.median(times), 'min_sec': min(times), 'runs': repeat}
+
+
+def _import_time_us(module: str, cwd: str) -> int:
+    """Cumulative import time of `module` reported by `python -X importtime`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=cwd, env=_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True)
+    for line in result.stderr.decode().splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S+)$', line)
+        if match and match.group(2) == module:
+            return int(match.group(1))
+    raise RuntimeError(f'No import time reported for {module}')
+
+
+def run(repeat: int = 5) -> Dict[str, Any]:
+    """Run every case and return the results document."""
+    cases = {}
+    python = [sys.executable]
+    with tempfile.TemporaryDirectory(prefix='brs-startup-') as work_dir:
+        cases['python'] = _time_command([*python, '-c', 'pass'], repeat, work_dir)
+        for module in IMPORTED_MODULES:
+            cases[f'import:{module}'] = {
+                **_time_command([*python, '-c', f'import {module}'], repeat, work_dir),
+                'import_time_us': _import_time_us(module, work_dir),
+            }
+        cases['help'] = _time_command([*python, '-m', 'brs', '--help'], repeat, work_dir)
+
+        index_path = os.path.join(work_dir, 'index.db')
+        index = BusinessIndex()
+        index.open(index_path)
+        index.update([{'business_id': '1', 'business_name': 'OCEAN REEF Pvt Ltd', 'owner': 'AHMED ALI'}])
+        index.close()
+        cases['lookup'] = _time_command([*python, '-m', 'brs', 'lookup', 'ahmed ali', '--index', index_path],
+                                        repeat, work_dir)
+
+        registry = FakeRegistry(Corpus(200)).start()
+        try:
+            name = next(iter(registry.corpus.cards.values())).name
+            cases['crawl'] = _time_command([
+                *python, '-m', 'brs', name, '--exact-match-only', '--base-url', registry.url,
+                '--output-csv', '', '--output-ndjson', os.path.join(work_dir, 'check.ndjson'),
+            ], repeat, work_dir)
+        finally:
+            registry.stop()
+
+    return {
+        'benchmark': 'startup',
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': cases,
+    }
+
+
+def find_regressions(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Cases whose median time grew more than `max_regression` (a fraction) above the baseline."""
+    regressions = []
+    for name, case in results['cases'].items():
+        before = baseline.get('cases', {}).get(name)
+        if not before:
+            continue
+        if case['median_sec'] > before['median_sec'] * (1 + max_regression):
+            regressions.append(f"{name}: {before['median_sec'] * 1000:.0f} ms -> {case['median_sec'] * 1000:.0f} ms")
+    return regressions
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    lines = []
+    for name, case in results['cases'].items():
+        line = f"{name:24} {case['median_sec'] * 1000:8.0f} ms median  {case['min_sec'] * 1000:8.0f} ms min"
+        if 'import_time_us' in case:
+            line += f"  imports {case['import_time_us'] / 1000:6.0f} ms"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the import time and startup of brs')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per case (default: 5)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against the results in this JSON file')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed growth of the median time against the baseline, as a fraction (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.max_regression)
+        if regressions:
+            print('Startup regressed past the threshold:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print(f'No case regressed more than {args.max_regression:.0%} against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+HTTP transport benchmark: full `brs` crawls against the fake registry over TLS.
+
+    PYTHONPATH=src python -m benchmarks.bench_transport --queries 200 --output transport.json
+    PYTHONPATH=src python -m benchmarks.bench_transport --cases http2,http1 -- --max-concurrency 40
+
+Starts `benchmarks.fake_registry` in this process, serving HTTPS (with a
+self-signed certificate passed to `brs --ca-bundle`), HTTP/2 to clients
+that negotiate it and gzipped responses, with `--connect-latency-ms` added
+to every new connection like the handshake round trips to a remote host.
+Then it crawls the same queries once per transport setup:
+
+- `http2`: the defaults, HTTP/2 multiplexed over one connection
+- `http1`: `--no-http2`, a pool of kept-alive HTTP/1.1 connections
+- `http1-pool-4`: HTTP/1.1 with at most 4 connections
+- `http1-no-keep-alive`: HTTP/1.1 with a new connection (and TLS handshake) per request
+- `http2-identity`: HTTP/2 without compression
+
+and reports wall time, requests/sec, the connections and TLS handshakes the
+crawler made (from its metrics), requests sent on an already open
+connection and the bytes the server sent. Arguments after `--` are passed
+to every crawl.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+from .fake_registry import add_server_arguments, registry_from_args
+from .load_harness import run_crawl
+
+SETUPS = {
+    'http2': [],
+    'http1': ['--no-http2'],
+    'http1-pool-4': ['--no-http2', '--http-pool-size', '4'],
+    'http1-no-keep-alive': ['--no-http2', '--no-keep-alive'],
+    'http2-identity': ['--compression', 'none'],
+}
+
+CONNECTION_COUNTERS = ['http_connections_opened', 'http_tls_handshakes', 'http_connections_reused']
+
+
+def run_setup(args: argparse.Namespace, name: str, brs_args: List[str], work_dir: str) -> Dict[str, Any]:
+    """Crawl the queries with one transport setup, against a fresh registry."""
+    registry = registry_from_args(args).start()
+    queries = registry.corpus.queries(args.queries)
+    metrics_path = os.path.join(work_dir, 'metrics.json')
+    try:
+        crawl = run_crawl(registry.url, queries, [
+            '--ca-bundle', registry.certificate, '--metrics-file', metrics_path, *SETUPS[name], *brs_args,
+        ], work_dir)
+    finally:
+        registry.stop()
+    server = registry.stats()
+
+    counters = {}
+    if os.path.exists(metrics_path):
+        with open(metrics_path, encoding='utf-8') as f:
+            counters = json.load(f)['counters']
+    return {
+        'brs_args': SETUPS[name],
+        'exit_code': crawl['exit_code'],
+        'wall_time_sec': crawl['wall_time_sec'],
+        'records': crawl['records'],
+        'requests': server['requests'],
+        'requests_per_sec': server['requests'] / crawl['wall_time_sec'] if crawl['wall_time_sec'] else None,
+        'server_connections': server['connections'],
+        'server_bytes_sent': server['bytes_sent'],
+        **{name: counters.get(name, 0) for name in CONNECTION_COUNTERS},
+        'http_versions': {name: value for name, value in counters.items() if name.startswith('http_responses_')},
+        'log': crawl['log'],
+    }
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    lines = []
+    for name, case in results['cases'].items():
+        lines.append(
+            f"{name:20} {case['wall_time_sec']:6.1f}s  {case['requests_per_sec']:6.1f} req/s  "
+            f"{case['http_connections_opened']:5} connections  {case['http_tls_handshakes']:5} TLS handshakes  "
+            f"{case['http_connections_reused']:5} reused  {case['server_bytes_sent'] / 1024:8.0f} KiB sent"
+            + (f"  exit code {case['exit_code']}" if case['exit_code'] else '')
+        )
+    return '\n'.join(lines)
+
+
+def _cases(value: str) -> List[str]:
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SETUPS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown setups {', '.join(unknown)} (choose from {', '.join(SETUPS)})")
+    return names
+
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    brs_args: List[str] = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, brs_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description='Compare HTTP transport setups of brs against a local registry')
+    parser.add_argument('--queries', type=int, default=200, help='Distinct search queries to crawl (default: 200)')
+    parser.add_argument('--cases', type=_cases, default=list(SETUPS),
+                        help=f"Comma-separated setups to run (default: {','.join(SETUPS)})")
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    add_server_arguments(parser)
+    parser.set_defaults(corpus_size=2000, latency_ms=50, connect_latency_ms=100, gzip=True, tls=True, http2=True)
+    args = parser.parse_args(argv)
+
+    cases = {}
+    for name in args.cases:
+        cases[name] = run_setup(args, name, brs_args, tempfile.mkdtemp(prefix=f'brs-transport-{name}-'))
+    results = {
+        'benchmark': 'transport',
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'queries': args.queries,
+        'brs_args': brs_args,
+        'server': {
+            'corpus_size': args.corpus_size,
+            'latency_ms': args.latency_ms,
+            'connect_latency_ms': args.connect_latency_ms,
+            'gzip': args.gzip,
+            'tls': args.tls,
+            'http2': args.http2,
+        },
+        'cases': cases,
+    }
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(case['exit_code'] == 0 for case in cases.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,445 @@
+"""
+A local stand-in for business.egov.mv serving a generated corpus.
+
+    PYTHONPATH=src python -m benchmarks.fake_registry --port 8765 --latency-ms 50 --throttle-rate 0.02
+
+It answers `POST /BusinessRegistry/SearchBusinessRegistry` (form field `query`,
+case-insensitive substring match on business names) and
+`GET /BusinessRegistry/ViewDetails/<id>?key=...` with pages from
+`benchmarks.pages`. Latency, 5xx errors and 429 throttling can be injected.
+`GET /__stats` returns the request and connection counts as JSON.
+
+    PYTHONPATH=src python -m benchmarks.fake_registry --tls --http2 --connect-latency-ms 30 --gzip
+
+serves HTTPS with a self-signed certificate (pass the printed path to
+`brs --ca-bundle`), HTTP/2 to clients that negotiate it, a delay per new
+connection and gzipped responses.
+"""
+import argparse
+import gzip
+import json
+import os
+import queue
+import random
+import select
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.exceptions
+
+from . import pages
+
+SYLLABLES = ['ma', 'le', 'hul', 'hu', 'ra', 'fu', 'vi', 'li', 'dhoo', 'ka', 'nda', 'ga', 'thi', 'ba', 'ree', 'su']
+SUFFIXES = ['Pvt Ltd', 'Private Limited', 'Enterprise', 'Investment', 'Trading', 'Holdings']
+
+
+class Corpus:
+    """Generated businesses with mostly unique names, shared by search and detail pages."""
+
+    def __init__(self, size: int = 5000, seed: int = 0, first_id: int = 100001):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.cards: Dict[int, pages.Card] = {}
+        self.activities: Dict[int, int] = {}
+        for business_id in range(first_id, first_id + size):
+            stem = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).upper()
+            icon, business_type = rng.choice(pages.CARD_TYPES)
+            name = f'{stem} {rng.choice(pages.WORDS).upper()} {rng.choice(SUFFIXES)}'
+            status = rng.choice(['Registered', 'Registered', 'Registered', 'Dissolved'])
+            self.cards[business_id] = pages.Card(business_id, name, icon, business_type, status)
+            self.activities[business_id] = rng.choice([0, 1, 2, 3, 5, 8, 20])
+        self._lowered = [(card.name.lower(), card) for card in self.cards.values()]
+
+    def search(self, query: str, limit: int) -> List[pages.Card]:
+        query = query.strip().lower()
+        if not query:
+            return []
+        matches = []
+        for name, card in self._lowered:
+            if query in name:
+                matches.append(card)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def detail_page(self, business_id: int) -> Optional[str]:
+        card = self.cards.get(business_id)
+        if card is None:
+            return None
+        return pages.detail_page(
+            business_id,
+            activities=self.activities[business_id],
+            sole_proprietorship=card.business_type == 'Sole Proprietorship',
+            seed=self.seed,
+            name=card.name,
+            status=card.status,
+        )
+
+    def queries(self, count: int) -> List[str]:
+        """Distinct queries drawn from the corpus' names, each matching at least one business."""
+        queries = []
+        seen = set()
+        for card in self.cards.values():
+            stem = card.name.split()[0]
+            if stem not in seen:
+                seen.add(stem)
+                queries.append(stem)
+                if len(queries) >= count:
+                    break
+        return queries
+
+
+class FakeRegistry:
+    """
+    Threaded HTTP server for a Corpus, with injectable latency and faults.
+
+    With a `certificate` (see self_signed_certificate) it serves HTTPS, and
+    with `http2` it also speaks HTTP/2 to clients that negotiate it.
+    `connect_latency` is added once per connection, like the round trips of
+    the TCP and TLS handshakes with a remote host, and `compress` gzips the
+    responses of clients that accept it.
+    """
+
+    def __init__(self, corpus: Corpus, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, max_results: int = 100,
+                 connect_latency: float = 0.0, compress: bool = False, certificate: Optional[Tuple[str, str]] = None,
+                 http2: bool = False):
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_results = max_results
+        self.connect_latency = connect_latency
+        self.compress = compress
+        self.counts: Counter = Counter()
+        self.connections = 0
+        self.bytes_sent = 0
+        self.first_request_at: Optional[float] = None
+        self.last_request_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(corpus.seed)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.certificate = certificate[0] if certificate else None
+        self._ssl_context: Optional[ssl.SSLContext] = None
+        if certificate:
+            self._ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self._ssl_context.load_cert_chain(*certificate)
+            self._ssl_context.set_alpn_protocols(['h2', 'http/1.1'] if http2 else ['http/1.1'])
+        elif http2:
+            raise ValueError('HTTP/2 is only served over TLS, pass a certificate')
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{'https' if self._ssl_context else 'http'}://{host}:{port}"
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> 'FakeRegistry':
+        """Serve in a background thread; port 0 picks a free port."""
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            elapsed = (self.last_request_at or 0) - (self.first_request_at or 0)
+            total = sum(self.counts.values())
+            return {
+                'requests': total,
+                'requests_per_sec': total / elapsed if elapsed > 0 else None,
+                'connections': self.connections,
+                'bytes_sent': self.bytes_sent,
+                'counts': {f'{kind}_{status}': count for (kind, status), count in sorted(self.counts.items())},
+            }
+
+    def respond(self, method: str, path: str, body: bytes = b'',
+                accept_encoding: str = '') -> Tuple[int, Dict[str, str], bytes]:
+        """Status, headers and body of the response to one request, after the injected latency."""
+        if method == 'GET' and path == '/__stats':
+            return 200, {'Content-Type': 'application/json'}, json.dumps(self.stats()).encode('utf-8')
+        kind, status, text, headers = self._route(method, path, body)
+        data = text.encode('utf-8')
+        headers = {'Content-Type': 'text/html; charset=utf-8', **headers}
+        if self.compress and 'gzip' in accept_encoding:
+            data = gzip.compress(data, compresslevel=6)
+            headers['Content-Encoding'] = 'gzip'
+        self._record(kind, status, len(data))
+        return status, headers, data
+
+    def _route(self, method: str, path: str, body: bytes) -> Tuple[str, int, str, Dict[str, str]]:
+        if method == 'POST' and path.startswith('/BusinessRegistry/SearchBusinessRegistry'):
+            kind = 'search'
+        elif method == 'GET' and path.startswith('/BusinessRegistry/ViewDetails/'):
+            kind = 'detail'
+        else:
+            return 'other', 404, 'Not Found', {}
+
+        status = self._fault()
+        if status == 429:
+            return kind, 429, 'Too Many Requests', {'Retry-After': f'{self.retry_after:g}'}
+        if status:
+            return kind, status, 'Service Unavailable', {}
+
+        if kind == 'search':
+            query = parse_qs(body.decode('utf-8')).get('query', [''])[0]
+            cards = self.corpus.search(query, self.max_results)
+            return kind, 200, pages.render_search_page(query, cards), {}
+        business_id = path.split('/ViewDetails/', 1)[1].split('?', 1)[0]
+        page = self.corpus.detail_page(int(business_id)) if business_id.isdigit() else None
+        if page is None:
+            return kind, 404, 'Not Found', {}
+        return kind, 200, page, {}
+
+    def _record(self, kind: str, status: int, size: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.counts[(kind, status)] += 1
+            self.bytes_sent += size
+            if self.first_request_at is None:
+                self.first_request_at = now
+            self.last_request_at = now
+
+    def _connected(self) -> None:
+        with self._lock:
+            self.connections += 1
+        if self.connect_latency:
+            time.sleep(self.connect_latency)
+
+    def _fault(self) -> Optional[int]:
+        """Pick the injected response status for a request, if any, after the injected latency."""
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            roll = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+
+    def _handler_class(self):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                registry._connected()
+                if registry._ssl_context is not None:
+                    # The handshake runs on this connection's thread, not the accepting one
+                    self.request = registry._ssl_context.wrap_socket(self.request, server_side=True)
+                super().setup()
+
+            def handle(self):
+                if registry._ssl_context is not None and self.request.selected_alpn_protocol() == 'h2':
+                    _serve_http2(registry, self.request)
+                else:
+                    super().handle()
+
+            def finish(self):
+                super().finish()
+                if registry._ssl_context is not None:
+                    self.request.close()
+
+            def _respond(self, method: str, body: bytes = b''):
+                status, headers, data = registry.respond(method, self.path, body,
+                                                         self.headers.get('Accept-Encoding', ''))
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                self._respond('POST', self.rfile.read(length))
+
+            def do_GET(self):
+                self._respond('GET')
+
+        return Handler
+
+
+def _serve_http2(registry: FakeRegistry, sock: ssl.SSLSocket) -> None:
+    """
+    Serve one HTTP/2 connection until the client closes it.
+
+    Each stream is answered on a thread of its own, so the injected latency
+    overlaps like it does for concurrent HTTP/1.1 connections; all reads
+    and writes of the connection stay on this thread.
+    """
+    connection = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+    connection.initiate_connection()
+    sock.sendall(connection.data_to_send())
+    requests: Dict[int, Tuple[Dict[str, str], bytearray]] = {}
+    # Response bodies waiting for the flow control window, by stream
+    outgoing: Dict[int, bytes] = {}
+    answered: queue.SimpleQueue = queue.SimpleQueue()
+    wake_read, wake_write = socket.socketpair()
+
+    def answer(stream_id: int, headers: Dict[str, str], body: bytes) -> None:
+        response = registry.respond(headers[':method'], headers[':path'], body, headers.get('accept-encoding', ''))
+        answered.put((stream_id, response))
+        try:
+            wake_write.send(b'\0')
+        except OSError:
+            # The connection is gone
+            pass
+
+    def send_bodies() -> None:
+        for stream_id, data in list(outgoing.items()):
+            while data:
+                size = min(connection.local_flow_control_window(stream_id), connection.max_outbound_frame_size)
+                if size <= 0:
+                    break
+                connection.send_data(stream_id, data[:size])
+                data = data[size:]
+            if data:
+                outgoing[stream_id] = data
+            else:
+                connection.end_stream(stream_id)
+                del outgoing[stream_id]
+
+    try:
+        while True:
+            readable, _, _ = select.select([sock, wake_read], [], [])
+            if sock in readable:
+                data = sock.recv(65536)
+                while data and sock.pending():
+                    data += sock.recv(sock.pending())
+                if not data:
+                    return
+                for event in connection.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        requests[event.stream_id] = (dict(event.headers), bytearray())
+                    elif isinstance(event, h2.events.DataReceived):
+                        requests[event.stream_id][1].extend(event.data)
+                        connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded):
+                        headers, body = requests.pop(event.stream_id)
+                        threading.Thread(target=answer, args=(event.stream_id, headers, bytes(body)),
+                                         daemon=True).start()
+                    elif isinstance(event, h2.events.StreamReset):
+                        requests.pop(event.stream_id, None)
+                        outgoing.pop(event.stream_id, None)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+            if wake_read in readable:
+                wake_read.recv(4096)
+                while not answered.empty():
+                    stream_id, (status, headers, data) = answered.get()
+                    response_headers = [(':status', str(status)), ('content-length', str(len(data)))]
+                    response_headers += [(name.lower(), value) for name, value in headers.items()]
+                    try:
+                        connection.send_headers(stream_id, response_headers)
+                    except h2.exceptions.StreamClosedError:
+                        continue
+                    outgoing[stream_id] = data
+            send_bodies()
+            sock.sendall(connection.data_to_send())
+    except OSError:
+        # The client went away mid-read or mid-write
+        pass
+    finally:
+        wake_read.close()
+        wake_write.close()
+
+
+def self_signed_certificate(directory: str) -> Tuple[str, str]:
+    """
+    Write a self-signed certificate for 127.0.0.1 and localhost and its key to `directory`.
+
+    Returns the certificate and key paths; crawls trust the certificate with `--ca-bundle`.
+    Needs the `openssl` command.
+    """
+    certificate = os.path.join(directory, 'registry-cert.pem')
+    key = os.path.join(directory, 'registry-key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', key, '-out', certificate,
+        '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1,DNS:localhost',
+    ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return certificate, key
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--corpus-size', type=int, default=5000, help='Businesses in the corpus (default: 5000)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the corpus and faults (default: 0)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Added latency per request (default: 0)')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Standard deviation of the latency (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered 503 (default: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0,
+                        help='Fraction of requests answered 429 (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds on 429s (default: 1)')
+    parser.add_argument('--max-results', type=int, default=100, help='Cards per search page (default: 100)')
+    parser.add_argument('--connect-latency-ms', type=float, default=0,
+                        help='Added latency per new connection (default: 0)')
+    parser.add_argument('--gzip', action='store_true', help='Gzip the responses of clients that accept it')
+    parser.add_argument('--tls', action='store_true', help='Serve HTTPS with a generated self-signed certificate')
+    parser.add_argument('--http2', action='store_true', help='Also serve HTTP/2 (needs --tls)')
+
+
+def registry_from_args(args: argparse.Namespace) -> FakeRegistry:
+    return FakeRegistry(
+        Corpus(args.corpus_size, seed=args.seed),
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        max_results=args.max_results,
+        connect_latency=args.connect_latency_ms / 1000,
+        compress=args.gzip,
+        certificate=self_signed_certificate(tempfile.mkdtemp(prefix='brs-registry-')) if args.tls else None,
+        http2=args.http2,
+    )
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description='Serve a fake business registry for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.http2 and not args.tls:
+        parser.error('--http2 needs --tls')
+    registry = registry_from_args(args).start(args.host, args.port)
+    print(f'Serving {args.corpus_size} businesses on {registry.url}')
+    if registry.certificate:
+        print(f'Certificate (for brs --ca-bundle): {registry.certificate}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        registry.stop()
+
+
+if __name__ == '__main__':
+    main()
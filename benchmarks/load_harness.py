@@ -0,0 +1,148 @@
+"""
+End-to-end load test of a full `brs` crawl against the fake registry.
+
+    PYTHONPATH=src python -m benchmarks.load_harness --queries 2000 --latency-ms 30 --throttle-rate 0.01 \\
+        --output load.json -- --max-concurrency 40 --parser-workers 2
+
+Starts `benchmarks.fake_registry` in this process, runs `python -m brs` in a
+subprocess against it (arguments after `--` are passed to `brs`) and reports
+requests/sec, time to the first dataset record, total wall time and the
+crawler's peak RSS.
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from .fake_registry import add_server_arguments, registry_from_args
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def _first_record_file(dataset_dir: str) -> Optional[str]:
+    try:
+        names = os.listdir(dataset_dir)
+    except FileNotFoundError:
+        return None
+    return next((name for name in names if name.endswith('.json') and not name.startswith('__')), None)
+
+
+def _child_max_rss_kb() -> int:
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_crawl(base_url: str, queries: List[str], brs_args: List[str], work_dir: str,
+              poll_interval: float = 0.05) -> Dict[str, Any]:
+    """Run one crawl in `work_dir` and time it from the outside."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SRC_DIR, env.get('PYTHONPATH')]))
+    ndjson_path = os.path.join(work_dir, 'businesses.ndjson')
+    command = [
+        sys.executable, '-m', 'brs', ','.join(queries),
+        '--base-url', base_url,
+        '--output-csv', os.path.join(work_dir, 'businesses.csv'),
+        '--output-ndjson', ndjson_path,
+        *brs_args,
+    ]
+    dataset_dir = os.path.join(work_dir, 'storage', 'datasets', 'default')
+
+    started = time.monotonic()
+    first_record = None
+    with open(os.path.join(work_dir, 'crawl.log'), 'wb') as log:
+        process = subprocess.Popen(command, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        while process.poll() is None:
+            if first_record is None and _first_record_file(dataset_dir):
+                first_record = time.monotonic() - started
+            time.sleep(poll_interval)
+    wall_time = time.monotonic() - started
+
+    records = 0
+    if os.path.exists(ndjson_path):
+        with open(ndjson_path, 'rb') as f:
+            records = sum(1 for _ in f)
+
+    return {
+        'exit_code': process.returncode,
+        'wall_time_sec': wall_time,
+        'time_to_first_record_sec': first_record,
+        'records': records,
+        'records_per_sec': records / wall_time if wall_time else None,
+        'crawler_max_rss_kb': _child_max_rss_kb(),
+        'log': os.path.join(work_dir, 'crawl.log'),
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    brs_args: List[str] = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, brs_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description='Load-test a brs crawl against a local fake registry')
+    parser.add_argument('--queries', type=int, default=1000, help='Distinct search queries to crawl (default: 1000)')
+    parser.add_argument('--work-dir', help='Directory for the crawl storage and outputs (default: a temp dir)')
+    parser.add_argument('--output', help='Write the report to this JSON file')
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+
+    registry = registry_from_args(args).start()
+    queries = registry.corpus.queries(args.queries)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='brs-load-')
+    os.makedirs(work_dir, exist_ok=True)
+    print(f'Crawling {len(queries)} queries against {registry.url} in {work_dir}')
+
+    try:
+        crawl = run_crawl(registry.url, queries, brs_args, work_dir)
+    finally:
+        registry.stop()
+    server = registry.stats()
+    requests = server['requests']
+
+    report = {
+        'benchmark': 'load',
+        'created_at': datetime.datetime.utcnow().isoformat(),
+        'queries': len(queries),
+        'brs_args': brs_args,
+        'server': {
+            'corpus_size': args.corpus_size,
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'error_rate': args.error_rate,
+            'throttle_rate': args.throttle_rate,
+            **server,
+        },
+        'crawl': crawl,
+        'requests_per_sec': requests / crawl['wall_time_sec'] if crawl['wall_time_sec'] else None,
+    }
+
+    ttfr = crawl['time_to_first_record_sec']
+    print(
+        f"exit code {crawl['exit_code']}, {requests} requests in {crawl['wall_time_sec']:.1f}s "
+        f"({report['requests_per_sec']:.1f} req/s), {crawl['records']} records, "
+        f"first record after {f'{ttfr:.2f}s' if ttfr is not None else 'n/a'}, "
+        f"crawler peak RSS {crawl['crawler_max_rss_kb'] / 1024:.0f} MiB"
+    )
+    print(f"responses: {server['counts']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0 if crawl['exit_code'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
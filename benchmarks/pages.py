@@ -0,0 +1,158 @@
+"""
+Synthetic registry pages with the markup the extractors target.
+
+The pages are deterministic for a given seed, so benchmark runs (and the fake
+registry used by the load harness) are comparable between machines and runs.
+"""
+import html
+import random
+from typing import Iterable, NamedTuple, Optional
+
+BASE_URL = 'https://business.egov.mv'
+
+WORDS = [
+    'capital', 'investment', 'mart', 'ware', 'ocean', 'blue', 'island', 'trading',
+    'holdings', 'atoll', 'reef', 'sun', 'coral', 'lagoon', 'marine', 'star',
+]
+PEOPLE = [
+    'AHMED ALI', 'AISHATH SHAREEFA', 'MOHAMED IBRAHIM', 'FATHIMATH NASHWA',
+    'HASSAN RASHEED', 'MARIYAM SHIFA', 'IBRAHIM SHAREEF', 'HAWWA LUBNA',
+]
+ACTIVITIES = [
+    '620100 Computer programming activities',
+    '551010 Resort operations',
+    '471100 Retail sale in non-specialized stores',
+    '492300 Freight transport by road',
+    '561010 Restaurants',
+    '031100 Marine fishing',
+]
+# (icon class, business type) as shown on the search result cards
+CARD_TYPES = [
+    ('icon_set_1_icon-9', 'Business Name'),
+    ('icon_set_1_icon-29', 'Sole Proprietorship'),
+    ('icon_set_1_icon-43', 'Business Activity'),
+    ('', 'Private Company'),
+]
+
+
+def business_name(rng: random.Random) -> str:
+    return f'{rng.choice(WORDS).upper()} {rng.choice(WORDS).upper()} Pvt Ltd'
+
+
+class Card(NamedTuple):
+    """What a search result card shows about a business."""
+
+    business_id: int
+    name: str
+    icon: str
+    business_type: str
+    status: str
+
+
+def random_card(business_id: int, rng: random.Random) -> Card:
+    icon, business_type = rng.choice(CARD_TYPES)
+    return Card(business_id, business_name(rng), icon, business_type, rng.choice(['Registered', 'Dissolved']))
+
+
+def render_search_page(query: str, cards: Iterable[Card]) -> str:
+    """A search results page for `query` showing the given cards."""
+    rendered = ''.join(
+        f'<div class="col-md-4 col-sm-6"><div class="feature_home">'
+        f'<i class="{card.icon}"></i>'
+        f'<h3><span>{html.escape(card.name)}</span></h3>'
+        f'<p>{card.business_type}</p><p>{card.status}</p>'
+        f'<a class="btn_1" href="{detail_path(card.business_id)}">View Details</a></div></div>'
+        for card in cards
+    )
+    return (
+        '<!DOCTYPE html><html><head><title>Business Registry</title></head><body>'
+        '<div class="container"><div class="row">'
+        f'<div class="col-md-12"><h4 id="search-query">Search result for "{html.escape(query)}"</h4></div>'
+        f'{rendered}'
+        '</div></div></body></html>'
+    )
+
+
+def search_page(listings: int, query: str = 'capital', seed: int = 0, first_id: int = 100001) -> str:
+    """A search results page with `listings` random business cards."""
+    rng = random.Random(seed)
+    return render_search_page(query, [random_card(first_id + i, rng) for i in range(listings)])
+
+
+def _table(table_id: str, header: str, rows: list) -> str:
+    return (
+        f'<table id="{table_id}" class="table"><thead><tr>{header}</tr></thead>'
+        f'<tbody>{"".join(rows)}</tbody></table>'
+    )
+
+
+def detail_page(business_id: int = 100001, activities: int = 10, directors: int = 3, shareholders: int = 3,
+                business_names: int = 2, sole_proprietorship: bool = False, seed: int = 0,
+                name: Optional[str] = None, status: str = 'Registered') -> str:
+    """A business detail page with the given number of table rows."""
+    rng = random.Random(seed * 1_000_003 + business_id)
+    name = name or business_name(rng)
+    business_type = 'Sole Proprietorship' if sole_proprietorship else 'Private Company'
+    prefix = 'SP' if sole_proprietorship else 'PV'
+
+    if sole_proprietorship:
+        management = f'<div class="form_title"><h3>Owner</h3><p>{rng.choice(PEOPLE)}</p></div>'
+    else:
+        management = f'<div class="form_title"><h3>Managing Director</h3><p>{rng.choice(PEOPLE)}</p></div>'
+
+    director_rows = [
+        f'<tr><td>{rng.choice(PEOPLE)}</td><td>{rng.randint(1, 28):02d}-Mar-20{rng.randint(10, 25)}</td></tr>'
+        for _ in range(directors)
+    ]
+    shareholder_rows = [
+        f'<tr><td>{rng.choice(PEOPLE)}</td><td>{rng.randint(1, 28):02d}-Jan-20{rng.randint(10, 25)}</td></tr>'
+        for _ in range(shareholders)
+    ]
+    name_rows = [
+        f'<tr><td>{business_name(rng)}</td><td>BN{business_id}{j}</td><td>2024BN{business_id}{j}K</td></tr>'
+        for j in range(business_names)
+    ]
+    activity_rows = [
+        f'<tr><td>BA{business_id}{j:03d}</td><td>{rng.choice(ACTIVITIES)}</td>'
+        f'<td>{rng.choice(["Issued", "Expired", "Cancelled"])}</td>'
+        f'<td>{rng.randint(1, 28):02d}-Jun-20{rng.randint(10, 25)}</td>'
+        f'<td>{rng.choice(["-", f"{rng.randint(1, 28):02d}-Jun-20{rng.randint(26, 35)}"])}</td>'
+        f'<td>{name}</td><td>H. {rng.choice(WORDS).title()} Building, Male</td></tr>'
+        for j in range(activities)
+    ]
+
+    return f'''<!DOCTYPE html><html><head><title>{name} - Business Registry</title></head><body>
+<div class="businessRegistryBanner"><div class="container">
+<h1 class="name">{name} <span>[ {business_type} ]</span></h1>
+<p class="address">H. {rng.choice(WORDS).title()} Building, Male</p>
+<p class="number">C-{business_id:06d} ∙ <span>{status}</span></p>
+<p class="number">2021{prefix}{business_id:07d}D</p>
+<p class="smeClassification">SME Classification: {rng.choice(["Micro", "Small", "Medium", "Large"])}</p>
+</div></div>
+<div class="container">
+{management}
+<div class="form_title"><h3>Board of Directors</h3></div>
+{_table('homepage-board-directors-list', '<th>Name</th><th>Appointed Date</th>', director_rows)}
+<div class="form_title"><h3>Shareholders</h3></div>
+{_table('homepage-shareholders-list', '<th>Name</th><th>Join Date</th>', shareholder_rows)}
+<div class="form_title"><h3>Business Names</h3></div>
+{_table('homepage-bn-list', '<th>Name</th><th>Number</th><th>UPN</th>', name_rows)}
+<div class="form_title"><h3>Business Activities</h3></div>
+{_table('homepage-business-activity-list',
+        '<th>Number</th><th>Activity</th><th>State</th><th>Issued</th><th>Expiry</th><th>Name</th><th>Address</th>',
+        activity_rows)}
+<div class="form_title"><h3>Permits</h3></div><div><p>Does not have any business permit owned by {name}</p></div>
+<div class="form_title"><h3>Licenses</h3></div><div><p>Does not have any business license owned by {name}</p></div>
+</div></body></html>'''
+
+
+def search_url() -> str:
+    return f'{BASE_URL}/BusinessRegistry/SearchBusinessRegistry'
+
+
+def detail_path(business_id: int) -> str:
+    return f'/BusinessRegistry/ViewDetails/{business_id}?key=-{business_id * 7919}'
+
+
+def detail_url(business_id: int) -> str:
+    return f'{BASE_URL}{detail_path(business_id)}'
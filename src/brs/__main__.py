@@ -1,22 +1,34 @@
 import argparse
 import asyncio
+import contextlib
+import logging
 import os
 import sys
 
 from dotenv import load_dotenv
-from apify import Actor
 
+from .enumeration import parse_shard
 
-async def main():
-    """Main entry point that handles both CLI and Apify modes."""
-    load_dotenv()
-    
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse and check the crawler's command line."""
     parser = argparse.ArgumentParser(description='Run the business registry crawler')
     parser.add_argument(
         'queries', 
         nargs='?', 
         help='Comma-separated search queries (e.g., "company1,company2,company3")'
     )
+    parser.add_argument(
+        '--queries-file',
+        metavar='PATH',
+        help='Read queries from this file, one per line (gzip is detected, "-" reads stdin); names may contain commas'
+    )
+    parser.add_argument(
+        '--max-pending-searches',
+        type=int,
+        default=50,
+        help='Queries are fed to the crawler lazily, with at most this many searches queued or running (default: 50)'
+    )
     parser.add_argument(
         '--apify', 
         action='store_true',
@@ -25,56 +37,519 @@ async def main():
     parser.add_argument(
         '--exact-match-only',
         action='store_true',
-        help='Only save businesses that exactly match the search queries'
+        help='Only save businesses whose name or trading name matches a search query (see --match-mode)'
+    )
+    parser.add_argument(
+        '--match-mode',
+        choices=['exact', 'fuzzy'],
+        default='exact',
+        help='How --exact-match-only compares names: "exact" ignores case, punctuation, whitespace and '
+             'Pvt Ltd/Private Limited spellings; "fuzzy" also accepts similar names (default: exact)'
+    )
+    parser.add_argument(
+        '--match-threshold',
+        type=float,
+        default=0.8,
+        help='Lowest character trigram similarity (0-1) of a fuzzy match (default: 0.8)'
+    )
+    parser.add_argument(
+        '--seen-ttl-days',
+        type=float,
+        default=0,
+        help='Skip businesses whose record a previous run saved within this many days (0 disables)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='Cache registry responses (gzip-compressed) in this directory'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Serve the whole crawl from the response cache without contacting the registry'
+    )
+    parser.add_argument(
+        '--search-cache-ttl-hours',
+        type=float,
+        default=24,
+        help='How long cached search results stay fresh (default: 24)'
+    )
+    parser.add_argument(
+        '--detail-cache-ttl-hours',
+        type=float,
+        default=168,
+        help='How long cached business detail pages stay fresh (default: 168)'
+    )
+    parser.add_argument(
+        '--output-csv',
+        default='businesses.csv',
+        help='CSV export written at the end of the crawl (default: businesses.csv)'
+    )
+    parser.add_argument(
+        '--output-ndjson',
+        help='Also export the dataset as newline-delimited JSON to this path'
+    )
+    parser.add_argument(
+        '--live-output',
+        metavar='PATH',
+        help='Stream each saved record as a JSON line to this file or named pipe ("-" for stdout) while the crawl '
+             'runs, ending with a run_summary line'
+    )
+    parser.add_argument(
+        '--live-flush-interval',
+        type=float,
+        default=1.0,
+        help='Flush the live output at least this often, in seconds (default: 1)'
+    )
+    parser.add_argument(
+        '--columnar-dir',
+        help='Also export normalized per-entity tables (businesses, directors, shareholders, ...) to this directory'
+    )
+    parser.add_argument(
+        '--columnar-format',
+        choices=['parquet', 'arrow'],
+        default='parquet',
+        help='File format of the columnar export (default: parquet)'
+    )
+    parser.add_argument(
+        '--store',
+        help='SQLite file that keeps every business between runs; unchanged businesses are not saved again'
+    )
+    parser.add_argument(
+        '--changes-only',
+        metavar='PATH',
+        help='Write businesses whose status, directors, shareholders or activities changed to this NDJSON file '
+             '(requires --store)'
+    )
+    parser.add_argument(
+        '--index',
+        metavar='PATH',
+        help='Add the run\'s records to this lookup index (see "brs lookup") at the end of the crawl'
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Re-fetch businesses in --store that are due for a check (by status, activity expiry dates and change history)'
+    )
+    parser.add_argument(
+        '--refresh-budget',
+        type=int,
+        default=1000,
+        help='Most businesses re-fetched per --refresh run, most urgent first (default: 1000)'
+    )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        default=20,
+        help='Upper bound on parallel requests (default: 20)'
+    )
+    parser.add_argument(
+        '--search-concurrency',
+        type=int,
+        default=4,
+        help='Ceiling for parallel search POSTs; the actual level adapts to the registry (default: 4)'
+    )
+    parser.add_argument(
+        '--detail-concurrency',
+        type=int,
+        default=16,
+        help='Ceiling for parallel detail page GETs; the actual level adapts to the registry (default: 16)'
+    )
+    parser.add_argument(
+        '--parser-workers',
+        type=int,
+        default=0,
+        help='Parse pages in this many worker processes so fetching and parsing overlap (default: 0, parse inline)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=100,
+        help='Records buffered per dataset write (default: 100)'
+    )
+    parser.add_argument(
+        '--base-url',
+        default='https://business.egov.mv',
+        help='Registry to crawl, e.g. a local stand-in for load tests (default: https://business.egov.mv)'
+    )
+    parser.add_argument(
+        '--http-pool-size',
+        type=int,
+        default=100,
+        help='Most open connections to the registry; further requests wait for a free one (default: 100)'
+    )
+    parser.add_argument(
+        '--no-keep-alive',
+        dest='keep_alive',
+        action='store_false',
+        help='Close each connection after its response instead of reusing it for the next request'
+    )
+    parser.add_argument(
+        '--keep-alive-expiry',
+        type=float,
+        default=30.0,
+        help='Close connections that have been idle this many seconds (default: 30)'
+    )
+    parser.add_argument(
+        '--no-http2',
+        dest='http2',
+        action='store_false',
+        help='Only speak HTTP/1.1; by default HTTP/2 is used when the registry negotiates it over TLS'
+    )
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=5.0,
+        help='Seconds to open a connection, including the TLS handshake (default: 5)'
+    )
+    parser.add_argument(
+        '--request-timeout',
+        type=float,
+        default=5.0,
+        help='Seconds to send a request, read its response or wait for a pooled connection (default: 5)'
+    )
+    parser.add_argument(
+        '--compression',
+        choices=['auto', 'gzip', 'none'],
+        default='auto',
+        help='Response encodings to accept: auto (gzip, deflate, br, zstd), gzip or none (default: auto)'
+    )
+    parser.add_argument(
+        '--ca-bundle',
+        metavar='PATH',
+        help="Verify the registry's certificate against the CAs in this file, e.g. a local test server's"
+    )
+    parser.add_argument(
+        '--metrics-file',
+        help='Write counters and per-stage timing histograms to this JSON file at the end of the run'
+    )
+    parser.add_argument(
+        '--metrics-interval',
+        type=float,
+        default=0,
+        help='Log a metrics summary every this many seconds during the crawl (default: 0, off)'
+    )
+    parser.add_argument(
+        '--resume',
+        metavar='RUN_ID',
+        help='Make the run resumable under this id; running again with the same id carries on where it stopped'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Split the queries into this many shards, crawled by separate processes and merged into one export (default: 1)'
+    )
+    parser.add_argument('--shared-claims', help=argparse.SUPPRESS)
+    parser.add_argument('--store-run-id', help=argparse.SUPPRESS)
+    parser.add_argument(
+        '--enumerate',
+        action='store_true',
+        help='Enumerate the whole registry by searching generated prefixes instead of given queries'
+    )
+    parser.add_argument(
+        '--shard',
+        default='0/1',
+        metavar='INDEX/COUNT',
+        help='Only crawl this share of the queries or prefixes, e.g. 0/4 .. 3/4; merge the outputs with "brs merge" (default: 0/1)'
+    )
+    parser.add_argument(
+        '--saturation',
+        type=int,
+        default=100,
+        help='A prefix with at least this many results is split into longer prefixes (default: 100)'
+    )
+    parser.add_argument(
+        '--max-prefix-length',
+        type=int,
+        default=8,
+        help='Saturated prefixes are not split beyond this length (default: 8)'
+    )
+    parser.add_argument(
+        '--seed-length',
+        type=int,
+        default=1,
+        help='Length of the prefixes enumeration starts from (default: 1)'
+    )
+    parser.add_argument(
+        '--raw-html-dir',
+        help='Keep raw card and error page HTML in this compressed store, referenced from records by SHA-256 (default: off)'
     )
     
-    args = parser.parse_args()
-    
-    async with Actor:
+    args = parser.parse_args(argv)
+    if args.changes_only and not args.store:
+        parser.error('--changes-only requires --store')
+    if args.refresh and not args.store:
+        parser.error('--refresh requires --store')
+    if args.enumerate and args.exact_match_only:
+        parser.error('--exact-match-only has no queries to match in --enumerate mode')
+    if not 0 < args.match_threshold <= 1:
+        parser.error('--match-threshold must be between 0 and 1')
+    if args.http_pool_size < 1:
+        parser.error('--http-pool-size must be at least 1')
+    if args.connect_timeout <= 0 or args.request_timeout <= 0:
+        parser.error('--connect-timeout and --request-timeout must be positive')
+    if args.keep_alive_expiry < 0:
+        parser.error('--keep-alive-expiry must not be negative')
+    try:
+        args.shard_index, args.shard_count = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers > 1:
+        if args.apify:
+            parser.error('--workers is only supported in CLI mode')
+        if args.shard_count > 1:
+            parser.error('--workers assigns the shards itself, drop --shard')
+        if args.refresh:
+            parser.error('--refresh runs in a single process, drop --workers')
+        if args.live_output:
+            parser.error('--live-output streams from a single process, drop --workers')
+        if not (args.queries or os.getenv('QUERIES') or args.queries_file or args.enumerate):
+            parser.error('No queries provided')
+    return args
+
+
+async def main(args: argparse.Namespace):
+    """Main entry point that handles both CLI and Apify modes."""
+    if args.apify:
+        from apify import Actor
+        run_context = Actor
+    else:
+        # Plain CLI runs skip the Actor: no SDK import and no platform bootstrap. Messages from before the
+        # crawler sets up its own logging go to stderr, which keeps stdout free for `--live-output -`
+        logging.basicConfig(level=logging.INFO, format='[%(name)s] %(levelname)s %(message)s', force=True)
+        run_context = contextlib.AsyncExitStack()
+    async with run_context:
         if args.apify:
             # Apify mode - get input from Apify platform
             actor_input = await Actor.get_input() or {}
             queries_list = actor_input.get('queries', [])
             max_requests = actor_input.get('maxRequestsPerCrawl')
             exact_match_only = actor_input.get('exactMatchOnly', False)
+            crawl_options = {
+                'seen_ttl_days': actor_input.get('seenTtlDays', 0),
+                'max_concurrency': actor_input.get('maxConcurrency', 20),
+                'search_concurrency': actor_input.get('searchConcurrency', 4),
+                'detail_concurrency': actor_input.get('detailConcurrency', 16),
+                'parser_workers': actor_input.get('parserWorkers', 0),
+                'batch_size': actor_input.get('datasetBatchSize', 100),
+                'metrics_interval': actor_input.get('metricsIntervalSecs', 0),
+                # The run's default storages survive a migration, so the run id alone is enough to carry on
+                'resume_run_id': actor_input.get('resumeRunId') or Actor.config.actor_run_id,
+                'resume_in_default_storages': not actor_input.get('resumeRunId'),
+                'enumerate_registry': actor_input.get('enumerate', False),
+                'shard_index': actor_input.get('shardIndex', 0),
+                'shard_count': actor_input.get('shardCount', 1),
+                'saturation': actor_input.get('saturation', 100),
+                'match_mode': actor_input.get('matchMode', 'exact'),
+                'match_threshold': actor_input.get('matchThreshold', 0.8),
+                'http_pool_size': actor_input.get('httpPoolSize', 100),
+                'keep_alive': actor_input.get('keepAlive', True),
+                'keep_alive_expiry': actor_input.get('keepAliveExpirySecs', 30),
+                'http2': actor_input.get('http2', True),
+                'connect_timeout': actor_input.get('connectTimeoutSecs', 5),
+                'request_timeout': actor_input.get('requestTimeoutSecs', 5),
+                'compression': actor_input.get('compression', 'auto'),
+            }
             
-            if not queries_list:
+            if not queries_list and not crawl_options['enumerate_registry']:
                 Actor.log.error('No queries provided in input!')
                 await Actor.fail('No queries provided. Please specify business names to search for.')
                 return
+            if not 0 < crawl_options['match_threshold'] <= 1:
+                Actor.log.error(f"Invalid matchThreshold: {crawl_options['match_threshold']}")
+                await Actor.fail('matchThreshold must be between 0 and 1.')
+                return
             
             queries = ','.join(queries_list)
-            Actor.log.info(f'Starting scraper with queries: {queries}')
+            if crawl_options['enumerate_registry']:
+                Actor.log.info(f"Starting enumeration of shard {crawl_options['shard_index']}/{crawl_options['shard_count']}")
+            else:
+                Actor.log.info(f'Starting scraper with queries: {queries}')
             if max_requests:
                 Actor.log.info(f'Max requests per crawl: {max_requests}')
         else:
             # CLI mode - get queries from arguments or environment
-            print("Running in CLI Mode . . ")
+            # Stdout may be carrying the live output
+            print("Running in CLI Mode . . ", file=sys.stderr if args.live_output == '-' else sys.stdout)
             queries = args.queries or os.getenv("QUERIES")
             max_requests = None
             exact_match_only = args.exact_match_only
+            crawl_options = {
+                'seen_ttl_days': args.seen_ttl_days,
+                'cache_dir': args.cache_dir,
+                'offline': args.offline,
+                'search_cache_ttl_hours': args.search_cache_ttl_hours,
+                'detail_cache_ttl_hours': args.detail_cache_ttl_hours,
+                'output_csv': args.output_csv,
+                'output_ndjson': args.output_ndjson,
+                'columnar_dir': args.columnar_dir,
+                'columnar_format': args.columnar_format,
+                'store_path': args.store,
+                'changes_only': args.changes_only,
+                'max_concurrency': args.max_concurrency,
+                'search_concurrency': args.search_concurrency,
+                'detail_concurrency': args.detail_concurrency,
+                'parser_workers': args.parser_workers,
+                'batch_size': args.batch_size,
+                'raw_html_dir': args.raw_html_dir,
+                'base_url': args.base_url,
+                'metrics_file': args.metrics_file,
+                'resume_run_id': args.resume,
+                'query_file': args.queries_file,
+                'max_pending_searches': args.max_pending_searches,
+                'metrics_interval': args.metrics_interval,
+                'enumerate_registry': args.enumerate,
+                'shard_index': args.shard_index,
+                'shard_count': args.shard_count,
+                'saturation': args.saturation,
+                'max_prefix_length': args.max_prefix_length,
+                'seed_length': args.seed_length,
+                'shared_claims': args.shared_claims,
+                'store_run_id': args.store_run_id,
+                'refresh': args.refresh,
+                'refresh_budget': args.refresh_budget,
+                'index_path': args.index,
+                'match_mode': args.match_mode,
+                'match_threshold': args.match_threshold,
+                'live_output': args.live_output,
+                'live_flush_interval': args.live_flush_interval,
+                'http_pool_size': args.http_pool_size,
+                'keep_alive': args.keep_alive,
+                'keep_alive_expiry': args.keep_alive_expiry,
+                'http2': args.http2,
+                'connect_timeout': args.connect_timeout,
+                'request_timeout': args.request_timeout,
+                'compression': args.compression,
+                'ca_bundle': args.ca_bundle,
+            }
             queries_list = [q.strip() for q in queries.split(",")] if queries else []
             
-            if not queries:
+            if not queries and not args.queries_file and not args.enumerate and not args.refresh:
                 print("Error: No queries provided. Use either:")
                 print("  uv run python -m crawler 'query1,query2,query3'")
                 print("  or set QUERIES environment variable")
+                print("  or pass --queries-file names.txt (one per line, '-' for stdin)")
+                print("  or pass --enumerate to crawl the whole registry")
                 exit(1)
         
         # Import and call the crawler main function
         from .main import main as crawler_main
         if args.apify:
-            await crawler_main(queries, max_requests, exact_match_only, queries_list)
+            await crawler_main(queries, max_requests, exact_match_only, queries_list, **crawl_options)
         else:
-            await crawler_main(queries, max_requests, exact_match_only, queries_list)
+            await crawler_main(queries, max_requests, exact_match_only, queries_list, **crawl_options)
         
         if args.apify:
             Actor.log.info('Scraper completed successfully!')
 
 
+def merge_main(argv):
+    """`brs merge`: combine the NDJSON exports of several runs or shards, one record per business."""
+    from .export import merge_exports
+
+    parser = argparse.ArgumentParser(prog='brs merge', description='Merge NDJSON exports, deduplicating businesses')
+    parser.add_argument('inputs', nargs='+', help='NDJSON exports to merge (e.g. one per shard)')
+    parser.add_argument('--output-csv', default='businesses.csv', help='Merged CSV (default: businesses.csv)')
+    parser.add_argument('--output-ndjson', help='Also write the merged records as NDJSON to this path')
+    parser.add_argument('--columnar-dir', help='Also write normalized per-entity tables to this directory')
+    parser.add_argument('--columnar-format', choices=['parquet', 'arrow'], default='parquet')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    written, duplicates = merge_exports(
+        args.inputs,
+        csv_path=args.output_csv,
+        ndjson_path=args.output_ndjson,
+        columnar_dir=args.columnar_dir,
+        columnar_format=args.columnar_format,
+    )
+    print(f'Merged {len(args.inputs)} files: {written} records, {duplicates} duplicates dropped')
+
+
+def index_main(argv):
+    """`brs index`: build or update the lookup index from NDJSON exports and/or the incremental store."""
+    from .index import business_index, iter_ndjson_records
+    from .store import business_store
+
+    parser = argparse.ArgumentParser(prog='brs index', description='Build or update the lookup index')
+    parser.add_argument('inputs', nargs='*', help='NDJSON exports to index (later records replace earlier ones)')
+    parser.add_argument('--index', default='brs-index.db', help='Index file (default: brs-index.db)')
+    parser.add_argument('--store', help='Also index every business in this incremental store')
+    args = parser.parse_args(argv)
+    if not args.inputs and not args.store:
+        parser.error('Give NDJSON exports and/or --store to index')
+
+    business_index.open(args.index)
+    try:
+        if args.store:
+            business_store.open(args.store)
+            try:
+                print(f'Indexed {args.store}: {business_index.update(business_store.iter_records())}')
+            finally:
+                business_store.close()
+        if args.inputs:
+            print(f'Indexed {len(args.inputs)} files: {business_index.update(iter_ndjson_records(args.inputs))}')
+        print(f'Index {args.index}: {business_index.stats()}')
+    finally:
+        business_index.close()
+
+
+def lookup_main(argv):
+    """`brs lookup`: find businesses by person, business name, registration number, UPN or activity code."""
+    import json
+    import time
+    from .index import KINDS, business_index
+
+    parser = argparse.ArgumentParser(prog='brs lookup', description='Look businesses up in the index')
+    parser.add_argument('query', help='Name, registration number, UPN or activity code')
+    parser.add_argument('--index', default='brs-index.db', help='Index file (default: brs-index.db)')
+    parser.add_argument('--kind', choices=KINDS, help='Only match this kind of term')
+    parser.add_argument('--prefix', action='store_true', help='Match terms starting with the query')
+    parser.add_argument('--limit', type=int, default=100, help='Most businesses shown (default: 100)')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per business')
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.index):
+        parser.error(f'No index at {args.index}; build it with "brs index"')
+
+    business_index.open(args.index)
+    try:
+        started = time.perf_counter()
+        results = business_index.lookup(args.query, kind=args.kind, prefix=args.prefix, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    finally:
+        business_index.close()
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+        else:
+            roles = ', '.join(sorted({f"{match['role']} ({match['term']})" for match in result['matches']}))
+            print(f"{result['business_id']}\t{result['business_name']}\t{result['status']}\t{roles}")
+    if not args.json:
+        print(f'{len(results)} businesses in {elapsed_ms:.1f} ms', file=sys.stderr)
+
+
+# Subcommands that work on existing output and don't crawl
+SUBCOMMANDS = {
+    'merge': merge_main,
+    'index': index_main,
+    'lookup': lookup_main,
+}
+
+
 def cli_main():
     """Sync wrapper for CLI entry point."""
-    asyncio.run(main())
+    if sys.argv[1:2] and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    load_dotenv()
+    args = parse_args()
+    if args.workers > 1:
+        # The pool only waits for its worker processes, outside any event loop, so Ctrl-C reaches it directly
+        from .workers import run_workers
+        sys.exit(run_workers(args, sys.argv[1:]))
+    asyncio.run(main(args))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import timedelta
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from crawlee import HttpHeaders, Request
+from crawlee.http_clients import HttpClient, HttpCrawlingResult, HttpResponse
+
+from .clients import DelegatingHttpClient, request_kind, search_query
+from .extractors import BusinessRegistryExtractor
+from .queries import normalize_query, query_key
+from .stats import run_stats
+
+
+class CachedHttpResponse:
+    """HttpResponse served from the on-disk cache."""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], body: bytes):
+        self._status_code = status_code
+        self._headers = headers
+        self._body = body
+
+    @property
+    def http_version(self) -> str:
+        return 'HTTP/1.1'
+
+    @property
+    def status_code(self) -> int:
+        return self._status_code
+
+    @property
+    def headers(self) -> HttpHeaders:
+        return HttpHeaders(self._headers)
+
+    def read(self) -> bytes:
+        return self._body
+
+    async def read_stream(self) -> AsyncIterator[bytes]:
+        yield self._body
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a request isn't in the cache."""
+
+
+class CachingHttpClient(DelegatingHttpClient):
+    """
+    Wraps another HttpClient with a gzip-compressed on-disk response cache.
+
+    Search POSTs are keyed by their normalized query payload and detail GETs by
+    business id, so the `?key=` suffix and query spelling don't cause misses.
+    Entries are kept per registry host, so a crawl of a test registry never
+    serves or overwrites the real registry's pages. Each page type has its
+    own TTL. In offline mode every request is served
+    from the cache regardless of age, and misses fail without retrying.
+    """
+
+    def __init__(
+        self,
+        inner: HttpClient,
+        cache_dir: str = 'http_cache',
+        search_ttl: timedelta = timedelta(days=1),
+        detail_ttl: timedelta = timedelta(days=7),
+        offline: bool = False,
+    ):
+        super().__init__(inner)
+        self.cache_dir = cache_dir
+        self.ttls = {'search': search_ttl, 'detail': detail_ttl}
+        self.offline = offline
+        self._business_extractor = BusinessRegistryExtractor()
+
+    def _cache_key(self, request: Request) -> Optional[Tuple[str, str, str]]:
+        """Return (host, page type, key) for cacheable requests, None otherwise."""
+        host = _host_dirname(str(request.url))
+        kind = request_kind(request)
+        if kind == 'search':
+            normalized = query_key(normalize_query(search_query(request)))
+            return host, 'search', hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+        if kind == 'detail':
+            business_id = self._business_extractor._extract_business_id(str(request.url))
+            if business_id:
+                return host, 'detail', business_id
+
+        return None
+
+    def _path(self, host: str, page_type: str, key: str) -> str:
+        return os.path.join(self.cache_dir, host, page_type, f'{key}.gz')
+
+    def _load(self, path: str, page_type: str) -> Optional[CachedHttpResponse]:
+        try:
+            if not self.offline and time.time() - os.path.getmtime(path) > self.ttls[page_type].total_seconds():
+                return None
+            with gzip.open(path, 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return CachedHttpResponse(meta['status_code'], meta['headers'], body)
+
+    def _store(self, path: str, url: str, response: HttpResponse) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': {'content-type': response.headers.get('content-type', 'text/html; charset=utf-8')},
+        }
+        # Write to a temp file first so a crash can't leave a truncated entry behind
+        tmp_path = f'{path}.tmp'
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(response.read())
+        os.replace(tmp_path, path)
+
+    async def crawl(self, request: Request, *, session=None, proxy_info=None, statistics=None) -> HttpCrawlingResult:
+        cache_key = self._cache_key(request)
+        if cache_key is None:
+            return await super().crawl(request, session=session, proxy_info=proxy_info, statistics=statistics)
+
+        host, page_type, key = cache_key
+        path = self._path(host, page_type, key)
+        cached = self._load(path, page_type)
+        if cached is not None:
+            run_stats.increment(f'http_cache_hit_{page_type}')
+            # No request goes out, so a slot reserved for it is free for the next one
+            await self.release_reservation(request)
+            if statistics:
+                statistics.register_status_code(cached.status_code)
+            request.loaded_url = str(request.url)
+            return HttpCrawlingResult(http_response=cached)
+
+        run_stats.increment(f'http_cache_miss_{page_type}')
+        if self.offline:
+            request.no_retry = True
+            raise OfflineCacheMiss(f'{request.url} is not in the cache ({self.cache_dir})')
+
+        result = await super().crawl(request, session=session, proxy_info=proxy_info, statistics=statistics)
+        if result.http_response.status_code == 200:
+            self._store(path, str(request.url), result.http_response)
+        return result
+
+
+def _host_dirname(url: str) -> str:
+    """Directory name for the host (and port) of a URL."""
+    return urlsplit(url).netloc.lower().replace(':', '_') or 'local'
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from crawlee import service_locator
+from crawlee.events import Event
+from crawlee.storages import Dataset, KeyValueStore
+
+from .export import iter_dataset_pages
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """
+    Progress of a resumable run, persisted in a key-value store.
+
+    It tracks the search requests that were handled (by unique key), the
+    detail pages that were enqueued and the ones that are done. A detail page
+    only counts as done once its record has been pushed to the dataset (the
+    dataset writer reports every pushed batch), or when it was handled without
+    producing a record. A restarted run re-enqueues the searches that weren't
+    handled and the detail pages that aren't done, so finished work is neither
+    fetched nor written twice. Queries added by enumeration (split prefixes)
+    are kept too, so a restarted run searches the ones still outstanding.
+
+    The state is saved every `save_interval` seconds, on the platform's
+    persist-state, migrating and aborting events and at the end of the run.
+    Records pushed after the last save are found again by `reconcile()`.
+    Disabled until `open()` is called.
+    """
+
+    RECORD_KEY = 'BRS_CHECKPOINT'
+    SAVE_EVENTS = (Event.PERSIST_STATE, Event.MIGRATING, Event.ABORTING)
+
+    def __init__(self, save_interval: float = 10.0):
+        self.save_interval = save_interval
+        self._store: Optional[KeyValueStore] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.run_id: Optional[str] = None
+        self.resumed = False
+        self.finished = False
+        self.store_run_id: Optional[str] = None
+        self.searched: Set[str] = set()
+        self.split_queries: List[str] = []
+        self.pending: Dict[str, str] = {}
+        self.done: Set[str] = set()
+        self.pushed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._store is not None
+
+    @staticmethod
+    def storage_name(run_id: str) -> str:
+        """Name of the storages kept for a run id (letters, digits and dashes only)."""
+        return 'brs-run-' + re.sub(r'[^a-zA-Z0-9-]+', '-', run_id).strip('-').lower()
+
+    async def open(self, run_id: str, store_name: Optional[str] = None) -> None:
+        """
+        Load the state of `run_id`, or start it.
+
+        Args:
+            run_id: Identifies the run across restarts
+            store_name: Named key-value store to keep the state in (the default store if not given)
+        """
+        self.run_id = run_id
+        self._store = await KeyValueStore.open(name=store_name)
+        state = await self._store.get_value(self.RECORD_KEY) or {}
+        if state.get('run_id') not in (None, run_id):
+            raise ValueError(f"Checkpoint store belongs to run {state['run_id']!r}, not {run_id!r}")
+
+        self.resumed = bool(state)
+        self.finished = state.get('finished', False)
+        self.store_run_id = state.get('store_run_id')
+        self.searched = set(state.get('searched', []))
+        self.split_queries = list(state.get('split_queries', []))
+        self.pending = dict(state.get('pending', {}))
+        self.done = set(state.get('done', []))
+        self.pushed = state.get('pushed', 0)
+
+        event_manager = service_locator.get_event_manager()
+        for event in self.SAVE_EVENTS:
+            event_manager.on(event=event, listener=self.save)
+        self._timer = asyncio.create_task(self._save_periodically())
+
+    async def reconcile(self, dataset: Dataset) -> None:
+        """Count every record already in the run's dataset as done, including ones pushed after the last save."""
+        self.pushed = 0
+        async for items in iter_dataset_pages(dataset):
+            for item in items:
+                self.pushed += 1
+                self.mark_done(item.get('business_id'))
+
+    async def close(self, finished: bool = False) -> None:
+        """
+        Save the final state and stop listening for events.
+
+        The run's state is then forgotten (also when the checkpoint was never
+        opened, since the store run id is set either way), so a later crawl in
+        this process doesn't resume it.
+        """
+        if self.enabled:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            event_manager = service_locator.get_event_manager()
+            for event in self.SAVE_EVENTS:
+                event_manager.off(event=event, listener=self.save)
+            self.finished = finished
+            await self.save()
+            self._store = None
+        self._reset()
+
+    async def save(self, event_data: Any = None) -> None:
+        if not self.enabled:
+            return
+        # Snapshot synchronously, so the state is consistent even while handlers keep running
+        state = {
+            'run_id': self.run_id,
+            'finished': self.finished,
+            'store_run_id': self.store_run_id,
+            'searched': sorted(self.searched),
+            'split_queries': list(self.split_queries),
+            'pending': {business_id: url for business_id, url in self.pending.items() if business_id not in self.done},
+            'done': sorted(self.done),
+            'pushed': self.pushed,
+        }
+        try:
+            await self._store.set_value(self.RECORD_KEY, state)
+        except Exception as e:
+            logger.warning(f'Saving the checkpoint failed, will retry on the next save: {e}')
+
+    async def _save_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self.save()
+
+    def is_searched(self, unique_key: str) -> bool:
+        return unique_key in self.searched
+
+    def mark_searched(self, unique_key: str) -> None:
+        """Record a handled search request (after its detail pages were enqueued)."""
+        if self.enabled:
+            self.searched.add(unique_key)
+
+    def mark_split(self, queries: Iterable[str]) -> None:
+        """Record queries added by enumeration, which the query source can't reproduce."""
+        if self.enabled:
+            self.split_queries.extend(queries)
+
+    def mark_pending(self, business_id: Optional[str], url: str) -> None:
+        """Record an enqueued detail page."""
+        if self.enabled and business_id and business_id not in self.done:
+            self.pending[business_id] = url
+
+    def mark_done(self, business_id: Optional[str]) -> None:
+        """Record a detail page as finished (its record pushed, or nothing to push)."""
+        if self.enabled and business_id:
+            self.done.add(business_id)
+            self.pending.pop(business_id, None)
+
+    def record_pushed(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Called by the dataset writer after a batch was pushed."""
+        if not self.enabled:
+            return
+        for record in records:
+            self.pushed += 1
+            self.mark_done(record.get('business_id'))
+
+    def pending_details(self) -> Dict[str, str]:
+        """Detail pages (business id -> URL) enqueued by an earlier attempt and not done yet."""
+        return {business_id: url for business_id, url in self.pending.items() if business_id not in self.done}
+
+    def known_ids(self) -> List[str]:
+        return [*self.done, *self.pending]
+
+
+# Configured by the crawler entry point
+checkpoint = Checkpoint()
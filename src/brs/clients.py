@@ -0,0 +1,63 @@
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+from urllib.parse import parse_qs
+
+from crawlee import Request
+from crawlee.http_clients import HttpClient, HttpCrawlingResult, HttpResponse
+
+
+class DelegatingHttpClient(HttpClient):
+    """
+    Base for HttpClient wrappers that add behaviour around another client.
+
+    Everything is forwarded to the wrapped client; subclasses override
+    `crawl` (used for every crawled request) and call `super().crawl()`.
+    """
+
+    def __init__(self, inner: HttpClient):
+        super().__init__()
+        self._inner = inner
+
+    async def crawl(self, request: Request, *, session=None, proxy_info=None, statistics=None) -> HttpCrawlingResult:
+        return await self._inner.crawl(request, session=session, proxy_info=proxy_info, statistics=statistics)
+
+    async def send_request(self, url: str, **kwargs: Any) -> HttpResponse:
+        return await self._inner.send_request(url, **kwargs)
+
+    def stream(self, url: str, **kwargs: Any) -> AbstractAsyncContextManager[HttpResponse]:
+        return self._inner.stream(url, **kwargs)
+
+    async def release_reservation(self, request: Request) -> None:
+        """Give back a concurrency slot reserved for `request`, if a wrapped client holds one."""
+        if isinstance(self._inner, DelegatingHttpClient):
+            await self._inner.release_reservation(request)
+
+    async def __aenter__(self) -> 'DelegatingHttpClient':
+        await self._inner.__aenter__()
+        await super().__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await super().__aexit__(exc_type, exc_value, traceback)
+        await self._inner.__aexit__(exc_type, exc_value, traceback)
+
+    async def cleanup(self) -> None:
+        """The wrapped client cleans up its own resources on exit."""
+
+
+def request_kind(request: Request) -> str:
+    """Classify a registry request as 'search', 'detail' or 'other'."""
+    url = str(request.url)
+    if '/SearchBusinessRegistry' in url and request.method == 'POST':
+        return 'search'
+    if '/ViewDetails/' in url and request.method == 'GET':
+        return 'detail'
+    return 'other'
+
+
+def search_query(request: Request) -> str:
+    """The query sent by a search request (from its form payload)."""
+    payload = request.payload or b''
+    if isinstance(payload, bytes):
+        payload = payload.decode('utf-8')
+    return parse_qs(payload).get('query', [''])[0]
@@ -0,0 +1,169 @@
+import os
+from typing import Any, Dict, List, Optional
+
+# Flat main table: banner fields plus the scalar fields of a detail record
+BUSINESS_COLUMNS = [
+    ('business_id', 'string'),
+    ('business_name', 'string'),
+    ('business_type', 'string'),
+    ('address', 'string'),
+    ('registration_number', 'string'),
+    ('status', 'string'),
+    ('upn', 'string'),
+    ('sme_classification', 'string'),
+    ('owner', 'string'),
+    ('managing_director', 'string'),
+    ('board_of_directors_count', 'int64'),
+    ('shareholders_count', 'int64'),
+    ('business_names_count', 'int64'),
+    ('business_activities_count', 'int64'),
+    ('detail_url', 'string'),
+    ('extracted_at', 'string'),
+    # Only set by runs that match names against their queries
+    ('matched_query', 'string'),
+    ('match_score', 'float64'),
+]
+
+# One table per nested list, linked to the main table by business_id
+ENTITY_TABLES = {
+    'directors': ('board_of_directors', [('name', 'string'), ('appointed_date', 'string')]),
+    'shareholders': ('shareholders', [('name', 'string'), ('join_date', 'string')]),
+    'business_names': ('business_names', [('name', 'string'), ('number', 'string'), ('upn', 'string')]),
+    'business_activities': ('business_activities', [
+        ('number', 'string'),
+        ('activity_description', 'string'),
+        ('state', 'string'),
+        ('issued_date', 'string'),
+        ('expiry_date', 'string'),
+        ('business_name', 'string'),
+        ('address', 'string'),
+    ]),
+}
+
+# Permits and licenses are single objects per business, flattened to one row each
+STATUS_TABLES = {
+    'permits': ('permits', [('has_permits', 'bool_'), ('message', 'string')]),
+    'licenses': ('licenses', [('has_licenses', 'bool_'), ('message', 'string')]),
+}
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError('Columnar export needs pyarrow: install it with `pip install "brs[columnar]"`') from e
+    return pyarrow
+
+
+class _TableWriter:
+    """Buffers rows for one table and writes them out a row group at a time."""
+
+    def __init__(self, pa, path: str, columns: List[tuple], file_format: str, row_group_size: int):
+        self._pa = pa
+        self.path = path
+        self.schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.rows_written = 0
+        self._rows: List[Dict[str, Any]] = []
+        self._writer = None
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        if self._writer is None:
+            if self.file_format == 'parquet':
+                self._writer = self._pa.parquet.ParquetWriter(self.path, self.schema)
+            else:
+                self._writer = self._pa.ipc.new_file(self.path, self.schema)
+        table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+        self._writer.write_table(table)
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is None:
+            # Still produce an (empty) file so every run has the same set of tables
+            table = self.schema.empty_table()
+            if self.file_format == 'parquet':
+                self._pa.parquet.write_table(table, self.path)
+            else:
+                with self._pa.ipc.new_file(self.path, self.schema) as writer:
+                    writer.write_table(table)
+        else:
+            self._writer.close()
+
+
+class ColumnarExporter:
+    """
+    Writes detail records as normalized columnar tables.
+
+    `businesses` holds one flat row per business; directors, shareholders,
+    business names, activities, permits and licenses each get their own table
+    keyed by business_id. Rows are streamed to disk in row groups, so memory
+    stays bounded by `row_group_size` per table.
+    """
+
+    def __init__(self, output_dir: str, file_format: str = 'parquet', row_group_size: int = 10000):
+        if file_format not in FORMATS:
+            raise ValueError(f'Unknown columnar format {file_format!r}, expected one of {sorted(FORMATS)}')
+        pa = _import_pyarrow()
+        os.makedirs(output_dir, exist_ok=True)
+
+        def writer(name: str, columns: List[tuple]) -> _TableWriter:
+            path = os.path.join(output_dir, f'{name}{FORMATS[file_format]}')
+            return _TableWriter(pa, path, columns, file_format, row_group_size)
+
+        key_column = [('business_id', 'string')]
+        self._businesses = writer('businesses', BUSINESS_COLUMNS)
+        self._entities = {
+            name: (field, writer(name, key_column + columns))
+            for name, (field, columns) in ENTITY_TABLES.items()
+        }
+        self._statuses = {
+            name: (field, writer(name, key_column + columns))
+            for name, (field, columns) in STATUS_TABLES.items()
+        }
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """
+        Add one dataset record to the tables.
+
+        Returns:
+            False if the record isn't a business detail (e.g. an error row) and was skipped
+        """
+        if record.get('page_type') != 'business_detail':
+            return False
+
+        business_id = record.get('business_id')
+        self._businesses.append({name: record.get(name) for name, _ in BUSINESS_COLUMNS})
+
+        for field, table in self._entities.values():
+            for entry in record.get(field) or []:
+                table.append({'business_id': business_id, **entry})
+
+        for field, table in self._statuses.values():
+            status: Optional[Dict[str, Any]] = record.get(field)
+            if status:
+                table.append({'business_id': business_id, **status})
+
+        return True
+
+    def close(self) -> Dict[str, int]:
+        """Flush and close every table, returning the number of rows written per table."""
+        tables = {'businesses': self._businesses}
+        tables.update({name: table for name, (_, table) in self._entities.items()})
+        tables.update({name: table for name, (_, table) in self._statuses.items()})
+        for table in tables.values():
+            table.close()
+        return {name: table.rows_written for name, table in tables.items()}
@@ -0,0 +1,123 @@
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from crawlee.storages import KeyValueStore
+
+
+class SeenIndex:
+    """
+    Tracks business detail pages by business_id, within a run and across runs.
+
+    Within a run every business_id is fetched at most once, whichever query
+    found it. Across runs the fetch times are persisted in a named key-value
+    store (named stores aren't purged on start), so a business fetched less
+    than `ttl_days` ago isn't fetched again. A TTL of 0 disables the
+    cross-run index.
+
+    Worker processes of one crawl (`--workers`) also claim business ids in a
+    shared SQLite file (`share()`), so each business is fetched by one worker.
+    While shared, the fetch times are loaded from and saved to that file
+    too: the pool copies them in from its own key-value store before the
+    workers start and back once they're done (each worker has a storage
+    directory of its own).
+    """
+
+    STORE_NAME = 'brs-seen-index'
+    RECORD_KEY = 'fetched_at'
+
+    def __init__(self, ttl_days: float = 0):
+        self.ttl_days = ttl_days
+        self._fetched_at: Dict[str, float] = {}
+        self._enqueued: Set[str] = set()
+        self._claims: Optional[sqlite3.Connection] = None
+
+    @property
+    def persistent(self) -> bool:
+        return self.ttl_days > 0
+
+    async def load(self) -> None:
+        """Load fetch times from previous runs, dropping entries older than the TTL."""
+        self._enqueued.clear()
+        self._fetched_at = {}
+        if not self.persistent:
+            return
+
+        if self._claims is not None:
+            stored = dict(self._claims.execute('SELECT business_id, fetched_at FROM fetched'))
+        else:
+            store = await KeyValueStore.open(name=self.STORE_NAME)
+            stored = await store.get_value(self.RECORD_KEY, {}) or {}
+        cutoff = time.time() - self.ttl_days * 86400
+        self._fetched_at = {business_id: ts for business_id, ts in stored.items() if ts >= cutoff}
+
+    def share(self, path: Optional[str]) -> None:
+        """Claim business ids in the SQLite file at `path`, shared with the other workers of the crawl."""
+        if self._claims is not None:
+            self._claims.close()
+            self._claims = None
+        if not path:
+            return
+        # Claims only matter while the crawl runs, so they don't need to survive a power loss
+        self._claims = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._claims.execute('PRAGMA journal_mode=WAL')
+        self._claims.execute('PRAGMA synchronous=OFF')
+        self._claims.execute('CREATE TABLE IF NOT EXISTS claims (business_id TEXT PRIMARY KEY)')
+        self._claims.execute('CREATE TABLE IF NOT EXISTS fetched (business_id TEXT PRIMARY KEY, fetched_at REAL)')
+
+    async def save(self) -> None:
+        """Persist fetch times for the next run."""
+        if not self.persistent:
+            return
+
+        if self._claims is not None:
+            self._claims.execute('BEGIN')
+            self._claims.executemany('INSERT OR REPLACE INTO fetched VALUES (?, ?)', self._fetched_at.items())
+            self._claims.execute('COMMIT')
+            return
+        store = await KeyValueStore.open(name=self.STORE_NAME)
+        await store.set_value(self.RECORD_KEY, self._fetched_at)
+
+    def check(self, business_id: Optional[str]) -> Optional[str]:
+        """
+        Claim a business for fetching.
+
+        Args:
+            business_id: Numeric business id from the detail URL
+
+        Returns:
+            None if the detail page should be fetched, otherwise the skip reason
+            ('duplicate' within this run, 'fresh' from a previous run, or
+            'claimed' by another worker)
+        """
+        if not business_id:
+            return None
+        if business_id in self._enqueued:
+            return 'duplicate'
+        if business_id in self._fetched_at:
+            return 'fresh'
+
+        self._enqueued.add(business_id)
+        if self._claims is not None:
+            cursor = self._claims.execute('INSERT OR IGNORE INTO claims VALUES (?)', (business_id,))
+            if cursor.rowcount == 0:
+                return 'claimed'
+        return None
+
+    def mark_enqueued(self, business_ids: Iterable[str]) -> None:
+        """Claim businesses already handled (or queued) by an earlier attempt of this run."""
+        business_ids = list(business_ids)
+        self._enqueued.update(business_ids)
+        if self._claims is not None:
+            self._claims.execute('BEGIN')
+            self._claims.executemany('INSERT OR IGNORE INTO claims VALUES (?)', ((i,) for i in business_ids))
+            self._claims.execute('COMMIT')
+
+    def mark_fetched(self, business_id: Optional[str]) -> None:
+        """Record a detail fetch whose record was saved (pushed, or already stored unchanged)."""
+        if business_id:
+            self._fetched_at[business_id] = time.time()
+
+
+# Shared by the request handler and the crawler entry point
+seen_index = SeenIndex()
@@ -0,0 +1,218 @@
+from typing import Any, Dict, Iterator, List, Optional
+
+from lxml import etree
+from parsel.csstranslator import css2xpath
+from parsel.selector import create_root_node
+
+
+def _compile(css: str) -> etree.XPath:
+    # Same translation parsel applies to .css(), so the matched nodes are the same
+    return etree.XPath(css2xpath(css))
+
+
+BANNER = _compile('.businessRegistryBanner')
+NAME = _compile('h1.name')
+NUMBER = _compile('p.number')
+ALL_TEXT = _compile('::text')
+SPAN_TEXT = _compile('span::text')
+ADDRESS_TEXT = _compile('p.address::text')
+NUMBER_TEXT = _compile('p.number::text')
+SME_TEXT = _compile('p.smeClassification::text')
+
+FORM_TITLE = _compile('div.form_title')
+P_TEXT = _compile('p::text')
+STRING_VALUE = etree.XPath('string()')
+NEXT_DIV = etree.XPath('following-sibling::div[1]')
+
+DIRECTOR_ROWS = _compile('#homepage-board-directors-list tbody tr')
+SHAREHOLDER_ROWS = _compile('#homepage-shareholders-list tbody tr')
+BUSINESS_NAME_ROWS = _compile('#homepage-bn-list tbody tr')
+ACTIVITY_ROWS = _compile('#homepage-business-activity-list tbody tr')
+
+# form_title labels, matched like :contains() (a substring of the section's text)
+OWNER_LABEL = 'Owner'
+MANAGING_DIRECTOR_LABEL = 'Managing Director'
+PERMITS_LABEL = 'Permits'
+LICENSES_LABEL = 'Licenses'
+SECTION_LABELS = (OWNER_LABEL, MANAGING_DIRECTOR_LABEL, PERMITS_LABEL, LICENSES_LABEL)
+
+
+def parse_html(html_content: str):
+    """
+    Parse a page into the same tree as parsel's Selector, with plain lxml elements.
+
+    Selector uses lxml.html's parser, whose element classes cost a Python
+    lookup for every element the engine touches.
+    """
+    return create_root_node(html_content, etree.HTMLParser)
+
+
+def _first(xpath: etree.XPath, elements: List[Any]) -> Optional[str]:
+    """First result of `xpath` over `elements` in order, like SelectorList.css(...).get()."""
+    for element in elements:
+        for result in xpath(element):
+            return result
+    return None
+
+
+def _first_text(element) -> Optional[str]:
+    """First descendant text node of an element (`descendant-or-self::text()[1]`)."""
+    if isinstance(element.tag, str) and element.text is not None:
+        return element.text
+    for child in element:
+        text = _first_text(child)
+        if text is not None:
+            return text
+        if child.tail is not None:
+            return child.tail
+    return None
+
+
+def _cell_texts(row) -> Iterator[str]:
+    """The text nodes directly inside the row's cells (`td::text`)."""
+    for cell in row.iter('td'):
+        if cell.text is not None:
+            yield cell.text
+        for child in cell:
+            if child.tail is not None:
+                yield child.tail
+
+
+def _banner(root) -> Dict[str, Any]:
+    banners = BANNER(root)
+    names = [name for banner in banners for name in NAME(banner)]
+    business_name = _first(ALL_TEXT, names)
+    business_type = _first(SPAN_TEXT, names)
+    if business_type:
+        business_type = business_type.strip('[ ]')
+    address = _first(ADDRESS_TEXT, banners)
+
+    numbers = [number for banner in banners for number in NUMBER(banner)]
+    number_text = [text for number in numbers for text in ALL_TEXT(number)]
+    registration_number = None
+    status = None
+    if number_text:
+        registration_number = number_text[0].strip(' ∙').strip()
+        status = _first(SPAN_TEXT, numbers)
+
+    upn = None
+    for text in (text for banner in banners for text in NUMBER_TEXT(banner)):
+        if len(text.strip()) > 10 and any(prefix in text for prefix in ['SP', 'PV', 'BN']):
+            upn = text.strip()
+            break
+
+    sme_classification = _first(SME_TEXT, banners)
+    if sme_classification:
+        sme_classification = sme_classification.replace('SME Classification: ', '').strip()
+
+    return {
+        'business_name': business_name.strip() if business_name else None,
+        'business_type': business_type,
+        'address': address.strip() if address else None,
+        'registration_number': registration_number,
+        'status': status.strip() if status else None,
+        'upn': upn,
+        'sme_classification': sme_classification,
+    }
+
+
+def _sections(root) -> Dict[str, List[Any]]:
+    """The form_title sections containing each label, from one pass over all of them."""
+    sections = {label: [] for label in SECTION_LABELS}
+    for title in FORM_TITLE(root):
+        text = STRING_VALUE(title)
+        for label in SECTION_LABELS:
+            if label in text:
+                sections[label].append(title)
+    return sections
+
+
+def _person(sections: List[Any]) -> Optional[str]:
+    name = _first(P_TEXT, sections)
+    return name.strip() if name else None
+
+
+def _notice(sections: List[Any], flag: str, list_key: str) -> Dict[str, Any]:
+    message = _first(P_TEXT, [div for title in sections for div in NEXT_DIV(title)])
+    # Tables aren't extracted yet, so both cases have the same shape
+    return {
+        flag: False,
+        'message': message.strip() if message else None,
+        list_key: [],
+    }
+
+
+def _pairs(rows: List[Any], second: str) -> List[Dict[str, Any]]:
+    people = []
+    for row in rows:
+        cells = list(_cell_texts(row))
+        if len(cells) >= 2:
+            people.append({'name': cells[0].strip(), second: cells[1].strip()})
+    return people
+
+
+def _business_names(rows: List[Any]) -> List[Dict[str, Any]]:
+    business_names = []
+    for row in rows:
+        cells = list(_cell_texts(row))
+        if len(cells) >= 3:
+            business_names.append({'name': cells[0].strip(), 'number': cells[1].strip(), 'upn': cells[2].strip()})
+    return business_names
+
+
+def _activities(rows: List[Any]) -> List[Dict[str, Any]]:
+    activities = []
+    for row in rows:
+        cells = list(row.iter('td'))
+        if len(cells) < 7:
+            continue
+        number, activity, state, issued_date, expiry_date, business_name, address = (
+            _first_text(cell) for cell in cells[:7]
+        )
+        activities.append({
+            'number': number.strip() if number else None,
+            'activity_description': activity.strip() if activity else None,
+            'state': state.strip() if state else None,
+            'issued_date': issued_date.strip() if issued_date else None,
+            'expiry_date': expiry_date.strip() if expiry_date and expiry_date.strip() != '-' else None,
+            'business_name': business_name.strip() if business_name else None,
+            'address': address.strip() if address else None,
+        })
+    return activities
+
+
+def extract_detail_fields(root) -> Dict[str, Any]:
+    """
+    Extract the fields of a business detail page from its lxml root.
+
+    Produces the same fields as the reference implementation
+    (BusinessRegistryExtractor.extract_business_details_reference) from the
+    lxml tree directly: the selectors are compiled to XPath once at import
+    time, the `form_title` sections are matched against their labels in one
+    pass, and table cells are read by walking the tree instead of running a
+    selector per cell.
+
+    Returns:
+        The BusinessDetail fields that come from the page (everything but
+        business_id, detail_url, page_type and extracted_at)
+    """
+    sections = _sections(root)
+    board_of_directors = _pairs(DIRECTOR_ROWS(root), 'appointed_date')
+    shareholders = _pairs(SHAREHOLDER_ROWS(root), 'join_date')
+    business_names = _business_names(BUSINESS_NAME_ROWS(root))
+    business_activities = _activities(ACTIVITY_ROWS(root))
+    return {
+        **_banner(root),
+        'owner': _person(sections[OWNER_LABEL]),
+        'managing_director': _person(sections[MANAGING_DIRECTOR_LABEL]),
+        'board_of_directors': board_of_directors,
+        'board_of_directors_count': len(board_of_directors),
+        'shareholders': shareholders,
+        'shareholders_count': len(shareholders),
+        'business_names': business_names,
+        'business_names_count': len(business_names),
+        'business_activities': business_activities,
+        'business_activities_count': len(business_activities),
+        'permits': _notice(sections[PERMITS_LABEL], 'has_permits', 'permits_list'),
+        'licenses': _notice(sections[LICENSES_LABEL], 'has_licenses', 'licenses_list'),
+    }
@@ -0,0 +1,71 @@
+import itertools
+from typing import Iterator, List
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+
+class PrefixEnumerator:
+    """
+    Enumerates the registry by searching systematically generated prefixes.
+
+    The crawl starts from every prefix of `seed_length` characters (or one
+    shard of them). A search that returns `saturation` or more cards has
+    probably been cut off, so the prefix is split into longer ones: each
+    character of the alphabet appended directly and after a space (to follow
+    the next word). Prefixes stop growing at `max_length`.
+
+    Shards partition the seed prefixes, so shards can be crawled by separate
+    processes or runs and merged afterwards (`brs merge`). Business ids found
+    by several prefixes are deduplicated by the seen index. Names that end
+    exactly where a saturated prefix ends are only found through other
+    prefixes.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.alphabet = ALPHABET
+        self.saturation = 100
+        self.max_length = 8
+
+    def open(self, saturation: int = 100, max_length: int = 8, alphabet: str = ALPHABET) -> None:
+        self.enabled = True
+        self.saturation = saturation
+        self.max_length = max_length
+        self.alphabet = alphabet
+
+    def close(self) -> None:
+        """Stop splitting saturated searches, so a later crawl in this process doesn't enumerate."""
+        self.enabled = False
+
+    def seed_prefixes(self, length: int = 1, shard_index: int = 0, shard_count: int = 1) -> Iterator[str]:
+        """Yield this shard's starting prefixes."""
+        for i, chars in enumerate(itertools.product(self.alphabet, repeat=length)):
+            if i % shard_count == shard_index:
+                yield ''.join(chars)
+
+    def is_saturated(self, result_count: int) -> bool:
+        return result_count >= self.saturation
+
+    def split(self, prefix: str) -> List[str]:
+        """Longer prefixes covering a saturated one (empty once `max_length` is reached)."""
+        if len(prefix) >= self.max_length:
+            return []
+        children = [prefix + char for char in self.alphabet]
+        if len(prefix) + 2 <= self.max_length:
+            children += [f'{prefix} {char}' for char in self.alphabet]
+        return children
+
+
+def parse_shard(value: str) -> tuple:
+    """Parse 'INDEX/COUNT' (e.g. '0/4') into (index, count)."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like INDEX/COUNT (e.g. 0/4), got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f'Shard index must be between 0 and {count - 1}, got {index}')
+    return index, count
+
+
+# Configured by the crawler entry point
+prefix_enumerator = PrefixEnumerator()
@@ -0,0 +1,226 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only annotations; `brs merge` runs without loading crawlee
+    from crawlee.storages import Dataset
+
+from .columnar import ColumnarExporter
+
+# Records handed to the writers at a time while merging
+_MERGE_CHUNK_SIZE = 1000
+
+
+async def iter_dataset_pages(dataset: 'Dataset', chunk_size: int = 1000) -> AsyncIterator[list]:
+    """Yield the dataset items in pages of at most `chunk_size` items."""
+    offset = 0
+    while True:
+        page = await dataset.get_data(offset=offset, limit=chunk_size)
+        if not page.items:
+            break
+        yield page.items
+        offset += page.count
+        if offset >= page.total:
+            break
+
+
+async def _write_outputs(
+    pages: AsyncIterator[List[dict]],
+    csv_path: Optional[str],
+    ndjson_path: Optional[str],
+    columnar_dir: Optional[str],
+    columnar_format: str,
+    log: logging.Logger,
+) -> int:
+    """
+    Write pages of items to CSV, NDJSON and/or columnar tables in one pass.
+
+    Items go to NDJSON (to `ndjson_path`, or a temporary file when only CSV
+    is wanted) while the union of all keys is collected. The CSV is then
+    written from that file using the union as header, so error rows and
+    records of a different shape keep their columns. On failure, the
+    columnar tables written so far are closed and the temporary file is
+    removed.
+
+    Returns:
+        Number of written items
+    """
+    temporary = ndjson_path is None
+    if temporary:
+        fd, ndjson_path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(fd)
+
+    columnar = ColumnarExporter(columnar_dir, columnar_format) if columnar_dir else None
+
+    fieldnames: Dict[str, None] = {}
+    written = 0
+    try:
+        with open(ndjson_path, 'w', encoding='utf-8') as ndjson_file:
+            async for items in pages:
+                for item in items:
+                    fieldnames.update(dict.fromkeys(item))
+                    ndjson_file.write(json.dumps(item, ensure_ascii=False) + '\n')
+                    if columnar:
+                        columnar.add(item)
+                written += len(items)
+
+        if columnar:
+            row_counts = columnar.close()
+            columnar = None
+            log.info(f'Columnar export ({columnar_format}) written to {columnar_dir}: {row_counts}')
+
+        if csv_path and written:
+            ndjson_to_csv(ndjson_path, csv_path, list(fieldnames))
+    finally:
+        try:
+            if columnar:
+                # Close the tables written so far, so a failed export doesn't leave truncated files
+                columnar.close()
+        finally:
+            if temporary:
+                os.remove(ndjson_path)
+
+    return written
+
+
+async def export_dataset(
+    dataset: 'Dataset',
+    csv_path: Optional[str] = 'businesses.csv',
+    ndjson_path: Optional[str] = None,
+    chunk_size: int = 1000,
+    log: Optional[logging.Logger] = None,
+    columnar_dir: Optional[str] = None,
+    columnar_format: str = 'parquet',
+) -> int:
+    """
+    Stream the dataset to CSV and/or NDJSON with bounded memory.
+
+    A single pass over the dataset writes every output (see _write_outputs),
+    so error rows and records of a different shape keep their CSV columns.
+    With `columnar_dir`, the same pass also streams detail records into
+    normalized per-entity tables (see ColumnarExporter).
+
+    Args:
+        dataset: The dataset to export
+        csv_path: Where to write the CSV export (None to skip)
+        ndjson_path: Where to write the NDJSON export (None to skip)
+        chunk_size: Number of items fetched from the dataset per page
+        log: Logger for progress messages
+        columnar_dir: Directory for the normalized columnar tables (None to skip)
+        columnar_format: 'parquet' or 'arrow'
+
+    Returns:
+        Number of exported items
+    """
+    log = log or logging.getLogger(__name__)
+    if not csv_path and not ndjson_path and not columnar_dir:
+        return 0
+
+    info = await dataset.get_info()
+    total = info.item_count if info else 0
+
+    async def pages() -> AsyncIterator[list]:
+        exported = 0
+        async for items in iter_dataset_pages(dataset, chunk_size):
+            yield items
+            exported += len(items)
+            log.info(f'Exported {exported}/{total} items')
+
+    return await _write_outputs(pages(), csv_path, ndjson_path, columnar_dir, columnar_format, log)
+
+
+def ndjson_to_csv(ndjson_path: str, csv_path: str, fieldnames: List[str]) -> None:
+    """Write an NDJSON file as CSV, with `fieldnames` (the union of all keys) as header."""
+    with open(ndjson_path, encoding='utf-8') as ndjson_file, \
+            open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for line in ndjson_file:
+            writer.writerow(json.loads(line))
+
+
+def _merge_rank(item: dict) -> Tuple[bool, str]:
+    # Detail records beat error rows, then the most recently extracted wins
+    return 'error' not in item, item.get('extracted_at') or ''
+
+
+def merge_exports(
+    input_paths: Iterable[str],
+    csv_path: Optional[str] = 'businesses.csv',
+    ndjson_path: Optional[str] = None,
+    log: Optional[logging.Logger] = None,
+    columnar_dir: Optional[str] = None,
+    columnar_format: str = 'parquet',
+) -> Tuple[int, int]:
+    """
+    Merge the NDJSON exports of several runs (e.g. enumeration shards) into one export.
+
+    The first pass picks one record per business_id: a detail record over an
+    error row, and the most recently extracted one among equals. Only the
+    position of the winner is kept per business, so memory grows with the
+    number of businesses, not records. The second pass writes the winners
+    (and every record without a business_id) in input order, to the same
+    outputs as export_dataset().
+
+    Args:
+        input_paths: NDJSON files to merge
+        csv_path: Where to write the merged CSV (None to skip)
+        ndjson_path: Where to write the merged NDJSON (None to skip)
+        log: Logger for progress messages
+        columnar_dir: Directory for the normalized columnar tables (None to skip)
+        columnar_format: 'parquet' or 'arrow'
+
+    Returns:
+        (records written, duplicates dropped)
+    """
+    log = log or logging.getLogger(__name__)
+    input_paths = list(input_paths)
+
+    best: Dict[str, Tuple[Tuple[bool, str], int, int]] = {}
+    for file_index, path in enumerate(input_paths):
+        with open(path, encoding='utf-8') as ndjson_file:
+            for line_number, line in enumerate(ndjson_file):
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                business_id = item.get('business_id')
+                if not business_id:
+                    continue
+                rank = _merge_rank(item)
+                if business_id not in best or rank > best[business_id][0]:
+                    best[business_id] = (rank, file_index, line_number)
+    winners = {(file_index, line_number) for _, file_index, line_number in best.values()}
+    del best
+
+    duplicates = 0
+
+    async def pages() -> AsyncIterator[List[dict]]:
+        nonlocal duplicates
+        written = 0
+        for file_index, path in enumerate(input_paths):
+            with open(path, encoding='utf-8') as ndjson_file:
+                items: List[dict] = []
+                for line_number, line in enumerate(ndjson_file):
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    if item.get('business_id') and (file_index, line_number) not in winners:
+                        duplicates += 1
+                        continue
+                    items.append(item)
+                    if len(items) == _MERGE_CHUNK_SIZE:
+                        yield items
+                        written += len(items)
+                        items = []
+                if items:
+                    yield items
+                    written += len(items)
+            log.info(f'Merged {path} ({written} records so far, {duplicates} duplicates dropped)')
+
+    written = asyncio.run(_write_outputs(pages(), csv_path, ndjson_path, columnar_dir, columnar_format, log))
+    return written, duplicates
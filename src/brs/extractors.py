@@ -1,19 +1,47 @@
+import asyncio
+import logging
 import re
-from typing import Dict, List, Optional, Any
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Union
 from urllib.parse import urljoin, urlparse
 from parsel import Selector
 from crawlee.crawlers import HttpCrawlingContext
-from apify import Actor
-from crawlee.storages import Dataset
+
+from .checkpoint import checkpoint
+from .detail_engine import extract_detail_fields, parse_html
+from .matching import Match, NameMatcher
+from .rawstore import raw_html_store
+from .records import BusinessDetail, BusinessListing, DetailPageError, ExtractionError
+from .stats import run_stats
+from .store import business_store
+from .writer import dataset_writer
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_URL = 'https://business.egov.mv'
+
+
+@dataclass
+class ParsedPage:
+    """Result of decoding and parsing a crawled page exactly once."""
+
+    page_type: str
+    source_url: str
+    listings: List[BusinessListing] = field(default_factory=list)
+    detail: Optional[Union[BusinessDetail, DetailPageError]] = None
+    # Whether the detail record was pushed, or is already stored unchanged
+    saved: bool = False
 
 
 class BusinessRegistryExtractor:
     """Extractor for Maldivian Business Registry data."""
 
-    def __init__(self, base_url: str = "https://business.egov.mv"):
+    def __init__(self, base_url: str = REGISTRY_URL):
         self.base_url = base_url
 
-    def extract_business_listings(self, html_content: str, source_url: str) -> List[Dict[str, Any]]:
+    def extract_business_listings(self, html_content: str, source_url: str) -> List[BusinessListing]:
         """
         Extract business listings from search results HTML.
 
@@ -22,7 +50,7 @@ class BusinessRegistryExtractor:
             source_url: The URL that was crawled
 
         Returns:
-            List of business data dictionaries
+            List of business listings
         """
         selector = Selector(text=html_content)
         businesses = []
@@ -50,7 +78,7 @@ class BusinessRegistryExtractor:
         return None
 
     def _extract_single_business(self, card: Selector, source_url: str, search_query: Optional[str]) -> Optional[
-        Dict[str, Any]]:
+        BusinessListing]:
         """Extract data from a single business card."""
         try:
             # Extract business name
@@ -81,28 +109,24 @@ class BusinessRegistryExtractor:
             business_id = self._extract_business_id(detail_link)
 
             # Build comprehensive business data
-            business_data = {
-                'business_name': business_name,
-                'business_type': business_type,
-                'status': status,
-                'business_category': business_category,
-                'business_id': business_id,
-                'detail_url': full_detail_url,
-                'detail_path': detail_link,
-                'search_query': search_query,
-                'source_url': source_url,
-                'icon_class': icon_class,
-                'extracted_at': None,  # Will be set when saving to dataset
-            }
-
-            # Add metadata
-            business_data.update(self._extract_metadata(card, source_url))
-
-            return business_data
+            return BusinessListing(
+                business_name=business_name,
+                business_type=business_type,
+                status=status,
+                business_category=business_category,
+                business_id=business_id,
+                detail_url=full_detail_url,
+                detail_path=detail_link,
+                search_query=search_query,
+                source_url=source_url,
+                icon_class=icon_class,
+                # Add metadata
+                **self._extract_metadata(card, source_url),
+            )
 
         except Exception as e:
             # Log error but don't fail the entire extraction
-            print(f"Error extracting business data: {e}")
+            logger.error(f"Error extracting business data from {source_url}: {e}")
             return None
 
     def _map_icon_to_category(self, icon_class: str) -> Optional[str]:
@@ -132,16 +156,48 @@ class BusinessRegistryExtractor:
         """Extract additional metadata from the business card."""
         return {
             'has_detail_link': bool(card.css('a.btn_1').get()),
-            'card_html': card.get(),  # Store original HTML for debugging
             'domain': urlparse(source_url).netloc,
+            # Original HTML for debugging lives in the raw HTML store, if enabled
+            'card_html_sha256': raw_html_store.put(card.get()) if raw_html_store.enabled else None,
         }
 
-    def extract_business_details(self, html_content: str, source_url: str) -> Optional[Dict[str, Any]]:
+    def extract_business_details(self, html_content: str, source_url: str) -> Optional[
+        Union[BusinessDetail, DetailPageError]]:
         """
         Extract comprehensive business information from a business detail page.
+
+        Uses the compiled single-pass engine (see detail_engine); the result is
+        the same as extract_business_details_reference().
+        """
+        try:
+            root = parse_html(html_content)
+            return BusinessDetail(
+                business_id=self._extract_business_id(source_url),
+                detail_url=source_url,
+                page_type='business_detail',
+                extracted_at=None,  # Will be set when saving
+                **extract_detail_fields(root),
+            )
+
+        except Exception as e:
+            logger.error(f"Error extracting business details from {source_url}: {e}")
+            return DetailPageError(
+                error=str(e),
+                detail_url=source_url,
+                page_type='detail_page_error',
+                business_id=self._extract_business_id(source_url),
+                html_length=len(html_content),
+                html_sha256=raw_html_store.put(html_content),  # Only kept when the raw HTML store is enabled
+            )
+
+    def extract_business_details_reference(self, html_content: str, source_url: str) -> Optional[
+        Union[BusinessDetail, DetailPageError]]:
+        """
+        Extract comprehensive business information from a business detail page.
+
+        Reference implementation with one selector pass per field, kept to
+        check extract_business_details() against.
         """
-        add_metadata = False
-        # TODO: See the todo in __main__
         try:
             selector = Selector(text=html_content)
             business_id = self._extract_business_id(source_url)
@@ -166,56 +222,46 @@ class BusinessRegistryExtractor:
             licenses_info = self._extract_licenses_info(selector)
 
             # Build comprehensive detail data
-            detail_data = {
-                'business_id': business_id,
-                'detail_url': source_url,
-                'page_type': 'business_detail',
-                'extracted_at': None,  # Will be set when saving
+            return BusinessDetail(
+                business_id=business_id,
+                detail_url=source_url,
+                page_type='business_detail',
+                extracted_at=None,  # Will be set when saving
 
                 # Main business info
                 **business_info,
 
                 # Owner/Management information (varies by business type)
-                'owner': owner_info,  # For sole proprietorships
-                'managing_director': managing_director,  # For companies
-                'board_of_directors': board_of_directors,
-                'board_of_directors_count': len(board_of_directors) if board_of_directors else 0,
-                'shareholders': shareholders,
-                'shareholders_count': len(shareholders) if shareholders else 0,
+                owner=owner_info,  # For sole proprietorships
+                managing_director=managing_director,  # For companies
+                board_of_directors=board_of_directors,
+                board_of_directors_count=len(board_of_directors) if board_of_directors else 0,
+                shareholders=shareholders,
+                shareholders_count=len(shareholders) if shareholders else 0,
 
                 # Business names (array of business names owned)
-                'business_names': business_names,
-                'business_names_count': len(business_names),
+                business_names=business_names,
+                business_names_count=len(business_names),
 
                 # Business activities (array of activities)
-                'business_activities': business_activities,
-                'business_activities_count': len(business_activities),
+                business_activities=business_activities,
+                business_activities_count=len(business_activities),
 
                 # Permits and licenses
-                'permits': permits_info,
-                'licenses': licenses_info,
-            }
-            if add_metadata:
-                detail_data["metadata"] = {
-                    # Metadata
-                    'domain': urlparse(source_url).netloc,
-                    'page_title': selector.css('title::text').get(),
-                    'html_length': len(html_content),
-                    'full_html': html_content,
-                }
-
-            return detail_data
+                permits=permits_info,
+                licenses=licenses_info,
+            )
 
         except Exception as e:
-            print(f"Error extracting business details: {e}")
-            return {
-                'error': str(e),
-                'detail_url': source_url,
-                'page_type': 'detail_page_error',
-                'business_id': self._extract_business_id(source_url),
-                'full_html': html_content,  # Always save HTML even on error
-                'html_length': len(html_content),
-            }
+            logger.error(f"Error extracting business details from {source_url}: {e}")
+            return DetailPageError(
+                error=str(e),
+                detail_url=source_url,
+                page_type='detail_page_error',
+                business_id=self._extract_business_id(source_url),
+                html_length=len(html_content),
+                html_sha256=raw_html_store.put(html_content),  # Only kept when the raw HTML store is enabled
+            )
 
     def _extract_business_banner(self, selector: Selector) -> Dict[str, Any]:
         """Extract main business information from the banner section."""
@@ -405,95 +451,203 @@ class BusinessRegistryExtractor:
 class RichDataExtractor:
     """Enhanced extractor that combines multiple extraction strategies."""
 
-    def __init__(self):
-        self.business_extractor = BusinessRegistryExtractor()
-    
-    def _is_exact_match(self, detail_data: Dict[str, Any], exact_queries: List[str]) -> bool:
+    # Listing categories that can own trading names; those names are only listed
+    # on the detail page, so such cards can't be ruled out from the card alone.
+    # Companies have no dedicated icon and therefore map to 'Unknown'. Nothing
+    # shows that a trading name's own card links to its owner's detail page,
+    # so company cards are kept even when their card name doesn't match.
+    TRADING_NAME_OWNER_CATEGORIES = frozenset({'Sole Proprietorship', 'Unknown'})
+
+    def __init__(self, base_url: str = REGISTRY_URL):
+        self.business_extractor = BusinessRegistryExtractor(base_url)
+        # Optional process pool; when set, pages are parsed in worker processes
+        self.parser_pool: Optional[Executor] = None
+        # The run's queries (all of them are added before crawling, see main)
+        self.matcher = NameMatcher()
+
+    def could_match_listing(self, listing: BusinessListing) -> bool:
+        """
+        Decide from a search-result card whether its detail page could still match a query.
+
+        Args:
+            listing: A business listing from extract_business_listings
+
+        Returns:
+            False only when the card alone proves the business can't match
         """
-        Check if the business name exactly matches one of the requested queries.
-        
+        if listing.business_category in self.TRADING_NAME_OWNER_CATEGORIES:
+            return True
+        return self.matcher.match(listing.business_name) is not None
+
+    def match_detail(self, detail_data: Union[BusinessDetail, DetailPageError]) -> Optional[Match]:
+        """
+        Match the business name and trading names of a detail page against the queries.
+
         Args:
             detail_data: The extracted business detail data
-            exact_queries: List of exact business names to match against
-            
+
         Returns:
-            True if business name exactly matches one of the queries, False otherwise
+            The matched query and its score, or None if no name matches
         """
-        business_name = detail_data.get('business_name', '').strip()
+        business_name = getattr(detail_data, 'business_name', None)
         if not business_name:
-            return False
-        
-        # Check for exact matches (case-insensitive)
-        for query in exact_queries:
-            if business_name.lower() == query.strip().lower():
-                return True
-        
-        # Also check business names from the business_names array if available
-        business_names = detail_data.get('business_names', [])
-        for name_entry in business_names:
-            if isinstance(name_entry, dict) and 'name' in name_entry:
-                name = name_entry['name'].strip()
-                for query in exact_queries:
-                    if name.lower() == query.strip().lower():
-                        return True
-        
-        return False
-
-    async def extract_and_save(self, context: HttpCrawlingContext, exact_match_config: dict = None) -> None:
+            return None
+        business_names = getattr(detail_data, 'business_names', None) or []
+        return self.matcher.match_any([
+            business_name,
+            *(entry['name'] for entry in business_names if isinstance(entry, dict) and 'name' in entry),
+        ])
+
+    def parse_page(self, html_content: str, source_url: str) -> ParsedPage:
+        """
+        Parse a page once and return everything the handler needs from it.
+
+        Args:
+            html_content: Decoded HTML content of the response
+            source_url: The URL that was crawled
+
+        Returns:
+            ParsedPage with the listings (search results) or detail record (detail page)
+        """
+        if '/SearchBusinessRegistry' in source_url:
+            listings = self.business_extractor.extract_business_listings(html_content, source_url)
+            return ParsedPage(page_type='search_results', source_url=source_url, listings=listings)
+
+        if '/ViewDetails/' in source_url:
+            detail_data = self.business_extractor.extract_business_details(html_content, source_url)
+            return ParsedPage(page_type='business_detail', source_url=source_url, detail=detail_data)
+
+        return ParsedPage(page_type='unknown', source_url=source_url)
+
+    async def parse_response(self, body: bytes, source_url: str) -> ParsedPage:
+        """
+        Decode and parse a response body, in the parser pool if one is configured.
+
+        With a pool the event loop only ships raw bytes out and gets the
+        compact records back, so fetching continues while pages are being parsed.
+        Pool timings include decoding and the wait for a free worker.
+        """
+        started = time.perf_counter()
+        if self.parser_pool is None:
+            html_content = body.decode('utf-8')
+            decoded = time.perf_counter()
+            run_stats.observe('decode', decoded - started)
+            page = self.parse_page(html_content, source_url)
+            run_stats.observe(f'parse_{page.page_type}', time.perf_counter() - decoded)
+        else:
+            loop = asyncio.get_running_loop()
+            page = await loop.run_in_executor(self.parser_pool, parse_page_bytes, body, source_url)
+            run_stats.observe(f'parse_{page.page_type}', time.perf_counter() - started)
+        run_stats.increment(f'pages_{page.page_type}')
+        return page
+
+    async def extract_and_save(self, context: HttpCrawlingContext, exact_match_config: dict = None) -> Optional[ParsedPage]:
         """
         Main extraction method that processes the response and saves rich data.
+
+        The response is decoded and parsed a single time; the returned ParsedPage
+        is reused by the caller (e.g. for enqueueing detail pages).
         """
         if exact_match_config is None:
             exact_match_config = {}
         try:
-            # Get HTML content
-            html_content = context.http_response.read().decode('utf-8')
             source_url = str(context.request.url)
 
             context.log.info(f"Extracting data from {source_url}")
 
+            page = await self.parse_response(context.http_response.read(), source_url)
+
             # Check if this is a search results page or detail page
-            if '/SearchBusinessRegistry' in source_url:
-                businesses = self.business_extractor.extract_business_listings(html_content, source_url)
-                if businesses:
-                    context.log.info(f"Extracted {len(businesses)} businesses")
+            if page.page_type == 'search_results':
+                if page.listings:
+                    context.log.info(f"Extracted {len(page.listings)} businesses")
                 else:
                     context.log.warning("No businesses extracted from search results")
 
-            elif '/ViewDetails/' in source_url:
-                detail_data = self.business_extractor.extract_business_details(html_content, source_url)
+            elif page.page_type == 'business_detail':
+                detail_data = page.detail
                 if detail_data:
                     import datetime
-                    detail_data['extracted_at'] = datetime.datetime.utcnow().isoformat()
+                    detail_data.extracted_at = datetime.datetime.utcnow().isoformat()
                     
                     # Get exact match settings
                     exact_match_only = exact_match_config.get('exact_match_only', False)
-                    exact_queries = exact_match_config.get('exact_queries', [])
-                    business_name = detail_data.get('business_name', 'Unknown')
+                    business_name = getattr(detail_data, 'business_name', 'Unknown')
                     
-                    # Check for exact match if enabled
+                    # Check for a matching query if enabled
                     should_save = True
+                    match = None
                     if exact_match_only:
-                        should_save = self._is_exact_match(detail_data, exact_queries)
-                        context.log.info(f"EXACT MATCH CHECK: Business '{business_name}' - Exact match enabled: {exact_match_only} - Is exact match: {should_save}")
+                        with run_stats.time('exact_match'):
+                            match = self.match_detail(detail_data)
+                        should_save = match is not None
+                        context.log.info(f"EXACT MATCH CHECK: Business '{business_name}' - Exact match enabled: {exact_match_only} - Match: {match}")
                     else:
                         context.log.info(f"EXACT MATCH CHECK: Business '{business_name}' - Exact match enabled: {exact_match_only} - Saving all results")
                     
+                    # Records become plain dicts only here, at the storage boundary
+                    record = detail_data.to_dict()
+
+                    # Skip businesses whose stored record hasn't changed since a previous run
+                    if (should_save and business_store.enabled and detail_data.business_id
+                            and isinstance(detail_data, BusinessDetail)):
+                        with run_stats.time('store_upsert'):
+                            change_type, changed_fields = business_store.upsert(record)
+                        run_stats.increment(f'store_{change_type}')
+                        if change_type == 'unchanged':
+                            context.log.info(f"UNCHANGED: '{business_name}' - same as the stored record, not saving again")
+                            page.saved = True
+                            # Nothing to push, so the page is done as soon as it's handled
+                            checkpoint.mark_done(detail_data.business_id)
+                            return page
+
                     if should_save:
                         context.log.info(f"SAVING: Extracted detailed data for: {business_name}")
-                        await Actor.push_data(detail_data)
+                        if match is not None:
+                            # Reported with the row only; the store keeps the record as extracted
+                            record['matched_query'] = match.query
+                            record['match_score'] = match.score
+                        await dataset_writer.push(record)
+                        page.saved = True
                     else:
                         context.log.info(f"SKIPPING: '{business_name}' - not an exact match")
+                        # Nothing to push, so the page is done as soon as it's handled
+                        checkpoint.mark_done(detail_data.business_id)
                 else:
                     context.log.warning("No detail data extracted")
             else:
                 context.log.warning(f"Unknown page type: {source_url}")
 
+            return page
+
         except Exception as e:
             context.log.error(f"Error during data extraction: {e}")
             import datetime
-            await Actor.push_data({
-                'error': str(e),
-                'url': str(context.request.url),
-                'extracted_at': datetime.datetime.utcnow().isoformat()
-            })
+            await dataset_writer.push(ExtractionError(
+                error=str(e),
+                url=str(context.request.url),
+                extracted_at=datetime.datetime.utcnow().isoformat(),
+            ).to_dict())
+            return None
+
+
+_worker_extractor: Optional[RichDataExtractor] = None
+
+
+def configure_parser_worker(raw_html_dir: Optional[str] = None, base_url: str = REGISTRY_URL) -> None:
+    """Process pool initializer: point the worker at the shared raw HTML store and the crawled registry."""
+    global _worker_extractor
+    raw_html_store.open(raw_html_dir)
+    _worker_extractor = RichDataExtractor(base_url)
+
+
+def parse_page_bytes(body: bytes, source_url: str) -> ParsedPage:
+    """
+    Decode and parse a page (the slotted records pickle compactly back to the crawler).
+
+    Runs inside parser worker processes, which each keep one extractor.
+    """
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = RichDataExtractor()
+    return _worker_extractor.parse_page(body.decode('utf-8'), source_url)
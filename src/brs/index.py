@@ -0,0 +1,222 @@
+import json
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .store import content_hash
+
+# Kinds of indexed terms
+KINDS = ('person', 'business_name', 'registration_number', 'upn', 'activity')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS businesses (
+    business_id TEXT PRIMARY KEY,
+    business_name TEXT,
+    status TEXT,
+    extracted_at TEXT,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL,
+    business_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    PRIMARY KEY (kind, term, business_id, role)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS terms_by_business ON terms (business_id);
+"""
+
+
+def normalize_name(value: str) -> str:
+    """Index key of a person or business name: lowercase words, punctuation dropped."""
+    return ' '.join(re.sub(r'[^\w]+', ' ', value.casefold()).split())
+
+
+def normalize_code(value: str) -> str:
+    """Index key of a registration number, UPN or activity code: uppercase, letters and digits only."""
+    return re.sub(r'[\W_]+', '', value).upper()
+
+
+NORMALIZERS = {
+    'person': normalize_name,
+    'business_name': normalize_name,
+    'registration_number': normalize_code,
+    'upn': normalize_code,
+    'activity': normalize_code,
+}
+
+
+def index_terms(record: Dict[str, Any]) -> Iterator[Tuple[str, str, str]]:
+    """Yield the (kind, normalized term, role) entries of a detail record."""
+
+    def entry(kind: str, value: Any, role: str) -> Iterator[Tuple[str, str, str]]:
+        if isinstance(value, str):
+            term = NORMALIZERS[kind](value)
+            if term:
+                yield kind, term, role
+
+    yield from entry('person', record.get('owner'), 'owner')
+    yield from entry('person', record.get('managing_director'), 'managing_director')
+    for director in record.get('board_of_directors') or []:
+        yield from entry('person', director.get('name'), 'director')
+    for shareholder in record.get('shareholders') or []:
+        yield from entry('person', shareholder.get('name'), 'shareholder')
+
+    yield from entry('business_name', record.get('business_name'), 'name')
+    yield from entry('registration_number', record.get('registration_number'), 'registration')
+    yield from entry('upn', record.get('upn'), 'registration')
+    for business_name in record.get('business_names') or []:
+        yield from entry('business_name', business_name.get('name'), 'business_name')
+        yield from entry('registration_number', business_name.get('number'), 'business_name')
+        yield from entry('upn', business_name.get('upn'), 'business_name')
+
+    for activity in record.get('business_activities') or []:
+        # "6201 Computer programming activities" is indexed under 6201
+        code = (activity.get('activity_description') or '').split(' ', 1)[0]
+        if code[:1].isdigit():
+            yield from entry('activity', code, 'activity')
+        yield from entry('registration_number', activity.get('number'), 'activity')
+
+
+class BusinessIndex:
+    """
+    Persistent inverted index from names, numbers and activity codes to business ids.
+
+    Kept in a SQLite file: `terms` maps (kind, normalized term) to business
+    ids with the role the term plays (director, shareholder, trading name,
+    ...), `businesses` keeps a name and status to show with lookup results and
+    the content hash of the indexed record. Updates are incremental: a record
+    replaces the indexed one only if it is newer and its content changed.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def open(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def update(self, records: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Index detail records (error rows and records without a business_id are skipped).
+
+        Returns:
+            Counts of 'new', 'updated', 'unchanged' and 'skipped' records
+        """
+        counts = dict.fromkeys(('new', 'updated', 'unchanged', 'skipped'), 0)
+        pending = 0
+        for record in records:
+            business_id = record.get('business_id')
+            if not business_id or 'error' in record or record.get('page_type', 'business_detail') != 'business_detail':
+                counts['skipped'] += 1
+                continue
+
+            new_hash = content_hash(record)
+            extracted_at = record.get('extracted_at') or ''
+            row = self._conn.execute(
+                'SELECT content_hash, extracted_at FROM businesses WHERE business_id = ?', (business_id,)
+            ).fetchone()
+            if row is not None and ((row[1] or '') > extracted_at or row[0] == new_hash):
+                # Same content seen again: keep its newer time, so an older copy read later can't replace it
+                if (row[1] or '') < extracted_at:
+                    self._conn.execute(
+                        'UPDATE businesses SET extracted_at = ? WHERE business_id = ?', (extracted_at, business_id)
+                    )
+                counts['unchanged'] += 1
+                continue
+
+            if row is not None:
+                self._conn.execute('DELETE FROM terms WHERE business_id = ?', (business_id,))
+            self._conn.execute(
+                'INSERT OR REPLACE INTO businesses (business_id, business_name, status, extracted_at, content_hash) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (business_id, record.get('business_name'), record.get('status'), extracted_at, new_hash),
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO terms (kind, term, business_id, role) VALUES (?, ?, ?, ?)',
+                ((kind, term, business_id, role) for kind, term, role in index_terms(record)),
+            )
+            counts['updated' if row is not None else 'new'] += 1
+            pending += 1
+            if pending >= batch_size:
+                self._conn.commit()
+                pending = 0
+        self._conn.commit()
+        return counts
+
+    def lookup(self, query: str, kind: Optional[str] = None, prefix: bool = False,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Find the businesses indexed under `query`.
+
+        Args:
+            query: Person or business name, registration number, UPN or activity code
+            kind: Only search terms of this kind (all kinds by default)
+            prefix: Match terms starting with the query instead of equal to it
+            limit: Maximum number of businesses returned
+
+        Returns:
+            One dict per business: business_id, business_name, status and the matches (kind, term, role)
+        """
+        kinds = [kind] if kind else list(KINDS)
+        matches: Dict[str, Dict[str, Any]] = {}
+        for term_kind in kinds:
+            term = NORMALIZERS[term_kind](query)
+            if not term:
+                continue
+            if prefix:
+                rows = self._conn.execute(
+                    'SELECT term, business_id, role FROM terms WHERE kind = ? AND term >= ? AND term < ? '
+                    'ORDER BY term LIMIT ?',
+                    (term_kind, term, term + '\U0010ffff', limit * 10),
+                )
+            else:
+                rows = self._conn.execute(
+                    'SELECT term, business_id, role FROM terms WHERE kind = ? AND term = ? LIMIT ?',
+                    (term_kind, term, limit * 10),
+                )
+            for matched_term, business_id, role in rows:
+                result = matches.setdefault(business_id, {'business_id': business_id, 'matches': []})
+                result['matches'].append({'kind': term_kind, 'term': matched_term, 'role': role})
+
+        results = list(matches.values())[:limit]
+        for result in results:
+            row = self._conn.execute(
+                'SELECT business_name, status FROM businesses WHERE business_id = ?', (result['business_id'],)
+            ).fetchone()
+            result['business_name'], result['status'] = row if row else (None, None)
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """Number of indexed businesses and of terms per kind."""
+        counts = {'businesses': self._conn.execute('SELECT COUNT(*) FROM businesses').fetchone()[0]}
+        for kind, count in self._conn.execute('SELECT kind, COUNT(DISTINCT term) FROM terms GROUP BY kind'):
+            counts[f'{kind}_terms'] = count
+        return counts
+
+
+def iter_ndjson_records(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield the records of NDJSON exports, in order."""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Configured by the crawler entry point
+business_index = BusinessIndex()
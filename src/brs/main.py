@@ -1,39 +1,163 @@
-import csv
+import asyncio
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
 from urllib.parse import urlencode
-from crawlee import Request
+from crawlee import ConcurrencySettings, Request
 
-from apify import Actor
 from crawlee.crawlers import HttpCrawler
-from crawlee.http_clients import HttpxHttpClient
-from crawlee.storages import Dataset
+from crawlee.storages import Dataset, KeyValueStore
 from dotenv import load_dotenv
 
-from .routes import router
+from .cache import CachingHttpClient
+from .checkpoint import checkpoint
+from .dedup import seen_index
+from .enumeration import prefix_enumerator
+from .export import export_dataset, iter_dataset_pages
+from .extractors import REGISTRY_URL, configure_parser_worker
+from .index import business_index
+from .matching import NameMatcher
+from .rawstore import raw_html_store
+from .queries import QueryStream, query_feed, read_query_file
+from .routes import extractor, failed_request_handler, router
+from .schedule import RecrawlScheduler
+from .sink import live_sink
+from .stats import run_stats
+from .store import business_store
+from .throttle import AdaptiveHttpClient
+from .transport import build_http_client
+from .writer import dataset_writer
 
 
-async def main(queries: str, max_requests: int = None, exact_match_only: bool = False, queries_list: list = None) -> None:
+async def main(queries: str, max_requests: int = None, exact_match_only: bool = False, queries_list: list = None,
+               seen_ttl_days: float = 0, cache_dir: str = None, offline: bool = False,
+               search_cache_ttl_hours: float = 24, detail_cache_ttl_hours: float = 168,
+               output_csv: str = 'businesses.csv', output_ndjson: str = None,
+               columnar_dir: str = None, columnar_format: str = 'parquet',
+               store_path: str = None, changes_only: str = None,
+               max_concurrency: int = 20, search_concurrency: int = 4, detail_concurrency: int = 16,
+               parser_workers: int = 0, batch_size: int = 100, raw_html_dir: str = None,
+               base_url: str = REGISTRY_URL, metrics_file: str = None, metrics_interval: float = 0,
+               resume_run_id: str = None, resume_in_default_storages: bool = False,
+               query_file: str = None, max_pending_searches: int = 50,
+               enumerate_registry: bool = False, shard_index: int = 0, shard_count: int = 1,
+               saturation: int = 100, max_prefix_length: int = 8, seed_length: int = 1,
+               shared_claims: str = None, store_run_id: str = None,
+               refresh: bool = False, refresh_budget: int = 1000, index_path: str = None,
+               match_mode: str = 'exact', match_threshold: float = 0.8,
+               live_output: str = None, live_flush_interval: float = 1.0,
+               http_pool_size: int = 100, keep_alive: bool = True, keep_alive_expiry: float = 30.0,
+               http2: bool = True, connect_timeout: float = 5.0, request_timeout: float = 5.0,
+               compression: str = 'auto', ca_bundle: str = None) -> None:
     """The crawler entry point."""
-    if not queries:
+    if not queries and not queries_list and not query_file and not enumerate_registry and not refresh:
         raise Exception("No queries provided")
+    if refresh and not store_path:
+        raise ValueError('Refreshing needs the store of previous runs')
 
-    crawler = HttpCrawler(
-        request_handler=router,
-        max_requests_per_crawl=max_requests,
-        http_client=HttpxHttpClient(),
+    run_stats.start()
+
+    seen_index.ttl_days = seen_ttl_days
+    # Workers load the fetch times from the shared file, where the pool put them
+    seen_index.share(shared_claims)
+    await seen_index.load()
+
+    # Resumable runs keep their progress and records in storages that survive a restart
+    dataset = None
+    if resume_run_id:
+        if resume_in_default_storages:
+            await checkpoint.open(resume_run_id)
+        else:
+            storage_name = checkpoint.storage_name(resume_run_id)
+            await checkpoint.open(resume_run_id, storage_name)
+            dataset = await Dataset.open(name=storage_name)
+        if checkpoint.resumed:
+            await checkpoint.reconcile(dataset or await Dataset.open())
+        seen_index.mark_enqueued(checkpoint.known_ids())
+
+    if store_path:
+        # A resumed run keeps its store run id, so its change log isn't split in two
+        business_store.open(store_path, run_id=checkpoint.store_run_id or store_run_id)
+        checkpoint.store_run_id = business_store.run_id
+    raw_html_store.open(raw_html_dir)
+    base_url = base_url.rstrip('/')
+    extractor.business_extractor.base_url = base_url
+    if parser_workers > 0:
+        # Spawned (not forked) workers, since the crawler already runs threads
+        extractor.parser_pool = ProcessPoolExecutor(
+            max_workers=parser_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=configure_parser_worker,
+            initargs=(raw_html_dir, base_url),
+        )
+
+    # Every request goes to the registry host, over one pool of warm connections
+    transport = build_http_client(
+        pool_size=http_pool_size,
+        keep_alive=keep_alive,
+        keep_alive_expiry=keep_alive_expiry,
+        http2=http2,
+        connect_timeout=connect_timeout,
+        request_timeout=request_timeout,
+        compression=compression,
+        ca_bundle=ca_bundle,
+    )
+    # Separate adaptive budgets for search POSTs and detail GETs, within the overall ceiling
+    adaptive_client = AdaptiveHttpClient(
+        transport,
+        search_ceiling=min(search_concurrency, max_concurrency),
+        detail_ceiling=min(detail_concurrency, max_concurrency),
     )
+    http_client = adaptive_client
+    # Cache hits are served before the adaptive limiter, so they never wait for a slot
+    if cache_dir or offline:
+        http_client = CachingHttpClient(
+            http_client,
+            cache_dir=cache_dir or 'http_cache',
+            search_ttl=timedelta(hours=search_cache_ttl_hours),
+            detail_ttl=timedelta(hours=detail_cache_ttl_hours),
+            offline=offline,
+        )
+
+    # Queries are streamed (one per line from a file or stdin, or the given list) and deduplicated as they're read
+    if refresh and not (queries or queries_list or query_file):
+        query_source = []
+    elif enumerate_registry:
+        # Enumeration searches generated prefixes instead, splitting the ones with saturated results
+        prefix_enumerator.open(saturation=saturation, max_length=max_prefix_length)
+        query_source = prefix_enumerator.seed_prefixes(seed_length, shard_index, shard_count)
+    elif query_file:
+        query_source = read_query_file(query_file)
+    else:
+        query_source = queries_list or queries.split(",")
+    if not enumerate_registry:
+        extractor.matcher = NameMatcher(match_mode, match_threshold)
+        if exact_match_only:
+            # Every query goes into the matcher before the first detail page is checked: a business
+            # found by an earlier, broader search must still match a query further down the stream.
+            # Query files are read twice, stdin and lists are held in memory.
+            if query_file and query_file != '-':
+                matcher_source = read_query_file(query_file)
+            else:
+                query_source = matcher_source = list(query_source)
+            for _ in QueryStream(matcher_source, matcher=extractor.matcher):
+                pass
+    # Prefixes are sharded by the enumerator, queries by the hash of their key
+    if enumerate_registry:
+        query_stream = QueryStream(query_source)
+    else:
+        query_stream = QueryStream(query_source, shard_index, shard_count)
 
-    # Store exact match configuration in request user_data
+    # Only the exact match flag travels with each request; the queries live on the extractor's matcher
     exact_match_config = {
         'exact_match_only': exact_match_only,
-        'exact_queries': queries_list or [q.strip() for q in queries.split(",")]
     }
 
-    crawlee_requests = []
-    for query in queries.split(","):
+    def build_search_request(query: str):
         # Prepare a POST request to the form endpoint.
         request = Request.from_url(
-            url='https://business.egov.mv/BusinessRegistry/SearchBusinessRegistry',
+            url=f'{base_url}/BusinessRegistry/SearchBusinessRegistry',
             method='POST',
             headers={'content-type': 'application/x-www-form-urlencoded'},
             use_extended_unique_key=True,
@@ -44,18 +168,129 @@ async def main(queries: str, max_requests: int = None, exact_match_only: bool =
             ).encode(),
             user_data=exact_match_config
         )
-        crawlee_requests.append(request)
+        # A resumed run skips the searches an earlier attempt already handled
+        return None if checkpoint.is_searched(request.unique_key) else request
+
+    # Searches are fed lazily, keeping at most max_pending_searches queued or running
+    query_feed.open(query_stream, build_search_request, max_pending_searches)
+    if checkpoint.resumed:
+        query_feed.extend(checkpoint.split_queries)
 
-    await crawler.run(
-        crawlee_requests
+    crawler = HttpCrawler(
+        request_handler=router,
+        # Requests are only handed out with a concurrency slot, so none waits for one inside its handler timeout.
+        # Offline runs send nothing to the registry and aren't throttled.
+        request_manager=await query_feed.to_tandem(gate=None if offline else adaptive_client),
+        max_requests_per_crawl=max_requests,
+        http_client=http_client,
+        concurrency_settings=ConcurrencySettings(
+            max_concurrency=max_concurrency,
+            desired_concurrency=min(10, max_concurrency),
+        ),
     )
 
-    dataset = await Dataset.open()
-    data_page = await dataset.get_data()
-    items = data_page.items
-    
-    if items:
-        with open("businesses.csv", "w", newline="", encoding="utf-8") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=items[0].keys())
-            writer.writeheader()
-            writer.writerows(items)
+    crawler.failed_request_handler(failed_request_handler)
+
+    crawlee_requests = []
+    if checkpoint.resumed:
+        pending = checkpoint.pending_details()
+        crawlee_requests = [
+            Request.from_url(url, unique_key=f'business:{business_id}', user_data=exact_match_config)
+            for business_id, url in pending.items()
+        ]
+        crawler.log.info(
+            f'Resuming run {resume_run_id}: {len(checkpoint.searched)} searches and {len(checkpoint.done)} '
+            f'businesses done, {len(pending)} businesses left'
+        )
+
+    if refresh:
+        # Re-fetch the stored businesses that are due, most urgent first, within the budget
+        scheduler = RecrawlScheduler()
+        with run_stats.time('refresh_plan'):
+            due = scheduler.due(business_store, refresh_budget)
+        known = set(checkpoint.known_ids())
+        due = [business for business in due if business.business_id not in known]
+        seen_index.mark_enqueued(business.business_id for business in due)
+        for business in due:
+            checkpoint.mark_pending(business.business_id, business.detail_url)
+        crawlee_requests += [
+            Request.from_url(business.detail_url, unique_key=f'business:{business.business_id}',
+                             user_data=exact_match_config)
+            for business in due
+        ]
+        run_stats.increment('refresh_due', scheduler.due_count)
+        run_stats.increment('refresh_enqueued', len(due))
+        crawler.log.info(f'Refreshing {len(due)} of {scheduler.due_count} due businesses (budget {refresh_budget})')
+
+    dataset_writer.max_items = batch_size
+    # With nothing reading the dataset after the crawl, records are only streamed, so memory stays flat
+    dataset_writer.stream_only = bool(live_output) and not (
+        output_csv or output_ndjson or columnar_dir or index_path or resume_run_id
+    )
+    await dataset_writer.open(dataset)
+    live_sink.open(live_output, live_flush_interval)
+    metrics_reporter = None
+    if metrics_interval > 0:
+        metrics_reporter = asyncio.create_task(run_stats.log_periodically(crawler.log, metrics_interval))
+    completed = False
+    try:
+        with run_stats.time('crawl'):
+            await crawler.run(
+                crawlee_requests
+            )
+        completed = True
+        run_stats.increment('queries_searched', query_feed.fed)
+        if query_stream.duplicates:
+            run_stats.increment('queries_duplicate', query_stream.duplicates)
+
+        if business_store.enabled and changes_only:
+            changed = business_store.export_changes(changes_only)
+            crawler.log.info(f'Wrote {changed} changed businesses to {changes_only}')
+    finally:
+        if metrics_reporter is not None:
+            metrics_reporter.cancel()
+        # Push buffered records even if the crawl aborted
+        await dataset_writer.close()
+        # Also after an aborted crawl: only saved records are marked fetched, so the next run skips just those
+        await seen_index.save()
+        live_sink.close(completed=completed, counters=run_stats.summary())
+        await checkpoint.close(finished=completed)
+        prefix_enumerator.close()
+        business_store.close()
+        seen_index.share(None)
+        if extractor.parser_pool is not None:
+            extractor.parser_pool.shutdown()
+            extractor.parser_pool = None
+    crawler.log.info(f'Run summary: {run_stats.format_summary()}')
+    crawler.log.info(f'Adaptive concurrency: {adaptive_client.describe()}')
+
+    dataset = dataset or await Dataset.open()
+    with run_stats.time('export'):
+        await export_dataset(
+            dataset,
+            csv_path=output_csv,
+            ndjson_path=output_ndjson,
+            log=crawler.log,
+            columnar_dir=columnar_dir,
+            columnar_format=columnar_format,
+        )
+
+    if index_path:
+        # Bring the lookup index up to date with this run's records
+        with run_stats.time('index'):
+            business_index.open(index_path)
+            counts = {}
+            try:
+                async for items in iter_dataset_pages(dataset):
+                    for name, count in business_index.update(items).items():
+                        counts[name] = counts.get(name, 0) + count
+            finally:
+                business_index.close()
+        crawler.log.info(f'Updated index {index_path}: {counts}')
+
+    crawler.log.info(f'Stage timings: {run_stats.format_timings()}')
+    # Metrics are also kept with the run's storage (the METRICS record), on Apify as well
+    await (await KeyValueStore.open()).set_value('METRICS', run_stats.to_dict())
+    if metrics_file:
+        run_stats.write(metrics_file)
+        crawler.log.info(f'Wrote metrics to {metrics_file}')
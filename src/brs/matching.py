@@ -0,0 +1,156 @@
+import math
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+# Spellings of legal forms and connectives, mapped to one canonical word
+CANONICAL_WORDS = {
+    'pvt': 'private',
+    'pte': 'private',
+    'ltd': 'limited',
+    'co': 'company',
+    'corp': 'corporation',
+    'inc': 'incorporated',
+    '&': 'and',
+}
+
+# Canonical legal form words; fuzzy matching compares names without them
+LEGAL_FORM_WORDS = frozenset({'private', 'limited', 'company', 'corporation', 'incorporated'})
+
+MATCH_MODES = ('exact', 'fuzzy')
+
+
+def normalize_business_name(name: str) -> str:
+    """
+    Matching key of a business name.
+
+    Case, punctuation and whitespace are ignored and legal forms are spelled
+    out, so "ABC (Pvt.) Ltd" and "abc private limited" have the same key.
+    """
+    name = re.sub(r"['’]", '', name.casefold())
+    words = re.sub(r'[^\w&]+|(&)', r' \1 ', name).split()
+    return ' '.join(CANONICAL_WORDS.get(word, word) for word in words)
+
+
+def _core(key: str) -> str:
+    """A normalized name without its legal form words (unless that's all there is)."""
+    core = ' '.join(word for word in key.split() if word not in LEGAL_FORM_WORDS)
+    return core or key
+
+
+def ngrams(text: str, n: int = 3) -> List[str]:
+    """Distinct character n-grams of a name, padded so that word edges count."""
+    padded = f' {text} '
+    return list(dict.fromkeys(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))))
+
+
+class Match(NamedTuple):
+    # The query as it was given
+    query: str
+    # 1.0 for names equal to the query after normalization, the n-gram similarity otherwise
+    score: float
+
+
+class NameMatcher:
+    """
+    Matches business names against the run's queries.
+
+    Built once per run from all the queries, before crawling. Exact
+    matching is a lookup of the name's normalized key (see
+    normalize_business_name) in a dict of the query keys. In fuzzy mode,
+    names without an exact match are scored against the queries sharing
+    character n-grams with them, found through an inverted n-gram index:
+    the score is the Dice coefficient of the two n-gram sets (legal form
+    words left out), and the best query scoring at least `threshold` matches.
+    Only queries sharing one of the name's rarest n-grams can reach the
+    threshold, so only the postings of those are read. Either way the work
+    per name depends on the name and how common its n-grams are, not on the
+    number of queries.
+    """
+
+    def __init__(self, mode: str = 'exact', threshold: float = 0.8, n: int = 3):
+        if mode not in MATCH_MODES:
+            raise ValueError(f'Unknown match mode {mode!r}, expected one of {MATCH_MODES}')
+        if not 0 < threshold <= 1:
+            raise ValueError('The match threshold must be in (0, 1]')
+        self.mode = mode
+        self.threshold = threshold
+        self.n = n
+        # Normalized key -> first query with that key
+        self._queries: Dict[str, str] = {}
+        # Fuzzy index: n-gram -> positions in _fuzzy_queries
+        self._postings: Dict[str, List[int]] = {}
+        self._fuzzy_queries: List[str] = []
+        self._fuzzy_grams: List[FrozenSet[str]] = []
+
+    @classmethod
+    def from_queries(cls, queries: Iterable[str], mode: str = 'exact', threshold: float = 0.8) -> 'NameMatcher':
+        matcher = cls(mode, threshold)
+        for query in queries:
+            matcher.add(query)
+        return matcher
+
+    @property
+    def fuzzy(self) -> bool:
+        return self.mode == 'fuzzy'
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def add(self, query: str) -> None:
+        key = normalize_business_name(query)
+        if not key or key in self._queries:
+            return
+        self._queries[key] = query
+        if self.fuzzy:
+            grams = ngrams(_core(key), self.n)
+            position = len(self._fuzzy_queries)
+            self._fuzzy_queries.append(query)
+            self._fuzzy_grams.append(frozenset(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+    def match(self, name: Optional[str]) -> Optional[Match]:
+        """The query a business name matches (the best scoring one in fuzzy mode), or None."""
+        key = normalize_business_name(name or '')
+        if not key:
+            return None
+        query = self._queries.get(key)
+        if query is not None:
+            return Match(query, 1.0)
+        if not self.fuzzy:
+            return None
+
+        grams = ngrams(_core(key), self.n)
+        size = len(grams)
+        threshold = self.threshold
+        # A query scoring at least the threshold shares at least `overlap` n-grams with the name and has
+        # `min_size`..`max_size` of them, so it shares one of the name's `size - overlap + 1` rarest n-grams
+        overlap = math.ceil(threshold * size / (2 - threshold) - 1e-9)
+        min_size = overlap
+        max_size = (2 - threshold) * size / threshold
+        grams.sort(key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = set()
+        for gram in grams[:size - overlap + 1]:
+            candidates.update(self._postings.get(gram, ()))
+
+        best = None
+        name_grams = set(grams)
+        for position in candidates:
+            query_size = len(self._fuzzy_grams[position])
+            if not min_size <= query_size <= max_size:
+                continue
+            score = 2 * len(name_grams & self._fuzzy_grams[position]) / (size + query_size)
+            if score >= threshold and (best is None or score > best.score):
+                best = Match(self._fuzzy_queries[position], round(score, 4))
+        return best
+
+    def match_any(self, names: Iterable[Optional[str]]) -> Optional[Match]:
+        """The best match among several names of one business (exact matches win straight away)."""
+        best = None
+        for name in names:
+            match = self.match(name)
+            if match is not None and (best is None or match.score > best.score):
+                best = match
+                if match.score >= 1.0:
+                    break
+        return best
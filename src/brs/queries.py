@@ -0,0 +1,262 @@
+import gzip
+import io
+import logging
+import sys
+import time
+import zlib
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from crawlee import Request
+from crawlee.request_loaders import RequestLoader, RequestManager, RequestManagerTandem
+from crawlee.storage_clients.models import ProcessedRequest
+from crawlee.storages import RequestQueue
+
+from .clients import request_kind
+from .matching import NameMatcher
+from .stats import run_stats
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def normalize_query(query: str) -> str:
+    """Collapse and trim whitespace, which the registry search ignores anyway."""
+    return ' '.join(query.split())
+
+
+def query_key(query: str) -> str:
+    """Key that identifies a normalized query (the search is case-insensitive)."""
+    return query.lower()
+
+
+def read_query_file(path: str) -> Iterator[str]:
+    """
+    Yield the lines of a query file, one query per line.
+
+    `-` reads stdin. Gzip input is detected from its magic bytes, so both
+    `names.txt.gz` and a gzip stream piped to stdin work.
+    """
+    raw = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        buffered = io.BufferedReader(raw) if not hasattr(raw, 'peek') else raw
+        if buffered.peek(2)[:2] == GZIP_MAGIC:
+            buffered = gzip.GzipFile(fileobj=buffered)
+        for line in io.TextIOWrapper(buffered, encoding='utf-8', errors='replace'):
+            yield line.rstrip('\r\n')
+    finally:
+        if raw is not sys.stdin.buffer:
+            raw.close()
+
+
+class QueryStream:
+    """
+    Normalizes and deduplicates queries as they are read.
+
+    The keys of all queries read so far are kept in `keys`, and every new
+    query is added to `matcher` if one is given. With `shard_count` > 1
+    only the queries whose key hashes to `shard_index` are yielded, but
+    every query is added to the matcher, so each worker matches against the
+    whole query set. Matching needs the whole set before the first detail
+    page is checked, so the run fills its matcher in a pass of its own
+    before crawling.
+    """
+
+    def __init__(self, queries: Iterable[str], shard_index: int = 0, shard_count: int = 1,
+                 matcher: Optional[NameMatcher] = None):
+        self._queries = queries
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.matcher = matcher
+        self.keys: Set[str] = set()
+        self.duplicates = 0
+
+    def __iter__(self) -> Iterator[str]:
+        for query in self._queries:
+            query = normalize_query(query)
+            if not query:
+                continue
+            key = query_key(query)
+            if key in self.keys:
+                self.duplicates += 1
+                continue
+            self.keys.add(key)
+            if self.matcher is not None:
+                self.matcher.add(query)
+            if self.shard_count > 1 and zlib.crc32(key.encode('utf-8')) % self.shard_count != self.shard_index:
+                continue
+            yield query
+
+
+class DetailFirstTandem(RequestManagerTandem):
+    """
+    Request manager tandem that serves queued requests before feeding the next search.
+
+    The plain tandem adds every request it takes from the loader at the front
+    of the queue, so detail pages only got their turn once the whole query
+    stream had been fed. Taking them first keeps the queue short and gets
+    the first records out within seconds of the start.
+
+    With a `gate` (the AdaptiveHttpClient), a request is only handed out
+    once a concurrency slot of its kind is reserved for it. Queued requests
+    are taken while detail pages have a free slot and searches are fed
+    while searches have one; a request of the other kind found in the queue
+    (a retried search) is held back until its kind has a slot. While every
+    budget is full or paused the tandem reports no ready request, so the
+    crawler's pool starts no task and nothing waits inside a request
+    handler's timeout. The slot is given back once the request is handled
+    or reclaimed, unless the request to the registry already returned it.
+    """
+
+    def __init__(self, request_loader: RequestLoader, request_manager: RequestManager, gate=None):
+        super().__init__(request_loader, request_manager)
+        self._gate = gate
+        self._held: List[Tuple[Request, float]] = []
+
+    async def is_empty(self) -> bool:
+        if self._gate is None:
+            return await super().is_empty()
+        if any(self._gate.can_start(request_kind(request)) for request, _ in self._held):
+            return False
+        if self._gate.can_start('detail') and not await self._read_write_manager.is_empty():
+            return False
+        return not (self._gate.can_start('search') and not await self._read_only_loader.is_empty())
+
+    async def fetch_next_request(self) -> Optional[Request]:
+        if self._gate is None:
+            if not await self._read_write_manager.is_empty():
+                request = await self._read_write_manager.fetch_next_request()
+                if request is not None:
+                    return request
+            return await self._feed_next_request()
+
+        for position, (request, held_since) in enumerate(self._held):
+            if self._gate.reserve(request):
+                del self._held[position]
+                run_stats.observe(f'fetch_wait_{request_kind(request)}', time.monotonic() - held_since)
+                return request
+        request = None
+        if self._gate.can_start('detail') and not await self._read_write_manager.is_empty():
+            request = await self._read_write_manager.fetch_next_request()
+        if request is None and self._gate.can_start('search') and not await self._read_only_loader.is_empty():
+            request = await self._feed_next_request()
+        if request is None or self._gate.reserve(request):
+            return request
+        self._held.append((request, time.monotonic()))
+        return None
+
+    async def _feed_next_request(self) -> Optional[Request]:
+        # Like the tandem's own feeding, except that a search the queue won't run again (handled by an
+        # earlier attempt of a resumed run, or dropped) gives its feed slot back: its handlers never run
+        if await self._read_only_loader.is_finished():
+            return await self._read_write_manager.fetch_next_request()
+        request = await self._read_only_loader.fetch_next_request()
+        if request is None:
+            return await self._read_write_manager.fetch_next_request()
+        try:
+            processed = await self._read_write_manager.add_request(request, forefront=True)
+        except Exception:
+            logger.exception(f'Adding search {request.unique_key} to the request queue failed, it was dropped')
+            self._read_only_loader.release()
+            return None
+        if processed is not None and processed.was_already_handled:
+            self._read_only_loader.release()
+        await self._read_only_loader.mark_request_as_handled(request)
+        return await self._read_write_manager.fetch_next_request()
+
+    async def reclaim_request(self, request: Request, *, forefront: bool = False) -> None:
+        if self._gate is not None:
+            await self._gate.release_reservation(request)
+        await super().reclaim_request(request, forefront=forefront)
+
+    async def mark_request_as_handled(self, request: Request) -> None:
+        if self._gate is not None:
+            await self._gate.release_reservation(request)
+        await super().mark_request_as_handled(request)
+
+
+class QueryFeed(RequestLoader):
+    """
+    Feeds search requests to the crawler lazily, with at most `max_in_flight` unfinished.
+
+    Used as the read-only half of a request manager tandem (see
+    DetailFirstTandem): the crawler takes detail pages from the request queue
+    while there are any, and the next search from here whenever the queue is
+    empty and fewer than `max_in_flight` searches are running. The request handler calls `release()` once a search is done
+    (the tandem does for a search the request queue already handled, e.g. after a resume).
+    Queries added with `extend()` (e.g. split prefixes) are fed before the
+    rest of the stream.
+    """
+
+    def __init__(self):
+        self.max_in_flight = 0
+        self.in_flight = 0
+        self.fed = 0
+        self._queries: Iterator[str] = iter(())
+        self._extra: deque = deque()
+        self._build_request: Callable[[str], Optional[Request]] = lambda query: None
+        self._next: Optional[Request] = None
+
+    def open(self, queries: Iterable[str], build_request: Callable[[str], Optional[Request]],
+             max_in_flight: int = 50) -> None:
+        """
+        Args:
+            queries: Normalized queries (read lazily)
+            build_request: Builds the search request for a query, or returns None to skip it
+            max_in_flight: Maximum number of unfinished search requests
+        """
+        self._queries = iter(queries)
+        self._build_request = build_request
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.fed = 0
+        self._extra.clear()
+        self._next = None
+
+    def extend(self, queries: Iterable[str]) -> None:
+        """Feed these queries next, ahead of the remaining stream (depth first, so the backlog stays small)."""
+        self._extra.extendleft(reversed(list(queries)))
+
+    def release(self) -> None:
+        """Free a slot after a search request was handled or failed for good."""
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def _peek(self) -> Optional[Request]:
+        while self._next is None:
+            query = self._extra.popleft() if self._extra else next(self._queries, None)
+            if query is None:
+                return None
+            self._next = self._build_request(query)
+        return self._next
+
+    async def get_total_count(self) -> int:
+        return self.fed + (1 if self._peek() is not None else 0)
+
+    async def is_empty(self) -> bool:
+        return self.in_flight >= self.max_in_flight or self._peek() is None
+
+    async def is_finished(self) -> bool:
+        return self._peek() is None
+
+    async def fetch_next_request(self) -> Optional[Request]:
+        if self.in_flight >= self.max_in_flight or self._peek() is None:
+            return None
+        request, self._next = self._next, None
+        self.in_flight += 1
+        self.fed += 1
+        return request
+
+    async def to_tandem(self, request_manager: Optional[RequestManager] = None, gate=None) -> RequestManagerTandem:
+        return DetailFirstTandem(self, request_manager or await RequestQueue.open(), gate)
+
+    async def mark_request_as_handled(self, request: Request) -> Optional[ProcessedRequest]:
+        # The tandem hands every request on to the request queue, which tracks it from there
+        return None
+
+    async def get_handled_count(self) -> int:
+        return self.fed
+
+
+# Configured by the crawler entry point
+query_feed = QueryFeed()
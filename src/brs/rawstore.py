@@ -0,0 +1,54 @@
+import gzip
+import hashlib
+import os
+from typing import Optional
+
+
+class RawHtmlStore:
+    """
+    Content-addressed, gzip-compressed sidecar store for raw HTML.
+
+    Records only carry the SHA-256 of the HTML they came from; the HTML itself
+    is written once per distinct content to `<root>/<first 2 hex>/<hash>.html.gz`.
+    Disabled until `open()` is called.
+    """
+
+    def __init__(self):
+        self.root: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def open(self, root: Optional[str]) -> None:
+        self.root = root
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], f'{digest}.html.gz')
+
+    def put(self, html: str) -> Optional[str]:
+        """Store HTML and return its SHA-256, or None when the store is disabled."""
+        if not self.enabled:
+            return None
+
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> str:
+        """Load stored HTML by its hash."""
+        with gzip.open(self.path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+
+
+# Configured by the crawler entry point (and in each parser worker process)
+raw_html_store = RawHtmlStore()
@@ -0,0 +1,102 @@
+from typing import Any, Dict
+
+
+class Record:
+    """
+    Base for compact slotted records.
+
+    The fields are the subclass's `__slots__`, which also fix the key order of
+    `to_dict()`. Fields that aren't passed to the constructor default to None.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError(f'Unknown fields for {type(self).__name__}: {sorted(fields)}')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class BusinessListing(Record):
+    """A business card from a search results page."""
+
+    __slots__ = (
+        'business_name',
+        'business_type',
+        'status',
+        'business_category',
+        'business_id',
+        'detail_url',
+        'detail_path',
+        'search_query',
+        'source_url',
+        'icon_class',
+        'has_detail_link',
+        'domain',
+        'card_html_sha256',  # Only set when raw HTML is kept (see RawHtmlStore)
+    )
+
+
+class BusinessDetail(Record):
+    """A business detail page, in the key order of the dataset rows."""
+
+    __slots__ = (
+        'business_id',
+        'detail_url',
+        'page_type',
+        'extracted_at',
+        'business_name',
+        'business_type',
+        'address',
+        'registration_number',
+        'status',
+        'upn',
+        'sme_classification',
+        'owner',
+        'managing_director',
+        'board_of_directors',
+        'board_of_directors_count',
+        'shareholders',
+        'shareholders_count',
+        'business_names',
+        'business_names_count',
+        'business_activities',
+        'business_activities_count',
+        'permits',
+        'licenses',
+    )
+
+
+class DetailPageError(Record):
+    """A detail page that couldn't be extracted; the page itself is only kept by hash."""
+
+    __slots__ = (
+        'error',
+        'detail_url',
+        'page_type',
+        'business_id',
+        'html_length',
+        'html_sha256',  # Only set when raw HTML is kept (see RawHtmlStore)
+        'extracted_at',
+    )
+
+
+class ExtractionError(Record):
+    """A response that failed anywhere in the extraction pipeline."""
+
+    __slots__ = (
+        'error',
+        'url',
+        'extracted_at',
+    )
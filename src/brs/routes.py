@@ -1,13 +1,19 @@
 
 from crawlee.router import Router
 from crawlee import Request
-from crawlee.crawlers import HttpCrawlingContext
+from crawlee.crawlers import BasicCrawlingContext, HttpCrawlingContext
 
-from .extractors import RichDataExtractor, BusinessRegistryExtractor
+from .checkpoint import checkpoint
+from .clients import request_kind, search_query
+from .enumeration import prefix_enumerator
+from .extractors import RichDataExtractor
+from .records import BusinessDetail
+from .dedup import seen_index
+from .queries import normalize_query, query_feed
+from .stats import run_stats
 
 router = Router[HttpCrawlingContext]()
 extractor = RichDataExtractor()
-business_extractor = BusinessRegistryExtractor()
 
 
 @router.default_handler
@@ -18,18 +24,73 @@ async def default_handler(context: HttpCrawlingContext) -> None:
     # Get exact match configuration from request user_data
     exact_match_config = context.request.user_data or {}
     
-    # Extract and save rich data to dataset
-    await extractor.extract_and_save(context, exact_match_config)
+    # Parse the page once, save rich data to dataset and reuse the result below
+    with run_stats.time('extract_and_save'):
+        page = await extractor.extract_and_save(context, exact_match_config)
     
     # If this is a search results page, enqueue detail pages for deeper crawling
-    if '/SearchBusinessRegistry' in str(context.request.url):
-        html_content = context.http_response.read().decode('utf-8')
-        businesses = business_extractor.extract_business_listings(html_content, str(context.request.url))
-        
-        detail_urls = [b['detail_url'] for b in businesses if b.get('detail_url')]
-        if detail_urls:
-            context.log.info(f"Enqueueing {len(detail_urls)} detail pages")
+    if page and page.page_type == 'search_results':
+        # In enumeration mode, a full result page means the prefix has to be narrowed down
+        if prefix_enumerator.enabled and prefix_enumerator.is_saturated(len(page.listings)):
+            prefix = normalize_query(search_query(context.request))
+            longer = prefix_enumerator.split(prefix)
+            if longer:
+                checkpoint.mark_split(longer)
+                query_feed.extend(longer)
+                run_stats.increment('enumeration_splits')
+            else:
+                context.log.warning(f'Prefix {prefix!r} is saturated at the maximum length, results may be incomplete')
+                run_stats.increment('enumeration_saturated_max_length')
+
+        listings = [b for b in page.listings if b.detail_url]
+
+        # In exact match mode, don't fetch detail pages the listing card already rules out
+        if exact_match_config.get('exact_match_only', False):
+            with run_stats.time('exact_match_listings'):
+                candidates = [b for b in listings if extractor.could_match_listing(b)]
+            avoided = len(listings) - len(candidates)
+            if avoided:
+                context.log.info(f"Skipping {avoided} detail pages that can't match a query")
+                run_stats.increment('detail_fetches_avoided', avoided)
+            listings = candidates
+
+        # Fetch each business once per run (and not again while it's fresh from a previous run)
+        new_listings = []
+        for listing in listings:
+            skip_reason = seen_index.check(listing.business_id)
+            if skip_reason:
+                run_stats.increment(f'detail_skipped_{skip_reason}')
+            else:
+                new_listings.append(listing)
+
+        for listing in new_listings:
+            checkpoint.mark_pending(listing.business_id, listing.detail_url)
+
+        if new_listings:
+            context.log.info(f"Enqueueing {len(new_listings)} detail pages")
             # Pass exact match configuration to detail page requests
-            await context.add_requests([
-                Request.from_url(url, user_data=exact_match_config) for url in detail_urls
-            ])
+            with run_stats.time('enqueue'):
+                await context.add_requests([
+                    Request.from_url(
+                        b.detail_url,
+                        # Key on the business id so the ?key= suffix can't defeat queue dedup
+                        unique_key=f"business:{b.business_id}" if b.business_id else None,
+                        user_data=exact_match_config,
+                    )
+                    for b in new_listings
+                ])
+        checkpoint.mark_searched(context.request.unique_key)
+
+    elif page and page.saved and isinstance(page.detail, BusinessDetail):
+        # Only saved records count: a detail rejected by exact matching may match a later run's queries
+        seen_index.mark_fetched(page.detail.business_id)
+
+    if request_kind(context.request) == 'search':
+        # Let the next query in
+        query_feed.release()
+
+
+async def failed_request_handler(context: BasicCrawlingContext, error: Exception) -> None:
+    """Called once a request has run out of retries."""
+    if request_kind(context.request) == 'search':
+        query_feed.release()
@@ -0,0 +1,156 @@
+import datetime
+import heapq
+import json
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Statuses of businesses that have stopped trading; their records rarely change again
+INACTIVE_STATUSES = {'dissolved', 'struck off', 'deregistered', 'cancelled', 'liquidated', 'inactive', 'expired'}
+
+# Activity states whose dates no longer matter
+CLOSED_ACTIVITY_STATES = {'cancelled', 'expired', 'revoked'}
+
+DATE_FORMAT = '%d-%b-%Y'
+
+
+class DueBusiness(NamedTuple):
+    business_id: str
+    detail_url: str
+    next_check: datetime.datetime
+    urgency: float
+    # 'expiry' when an activity expiry date brought the check forward, 'interval' otherwise
+    reason: str
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a registry date ('10-Sep-2021'), or return None."""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value.strip(), DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a store run id or extracted_at timestamp (ISO format), or return None."""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class RecrawlScheduler:
+    """
+    Decides when each business in the store should be fetched again.
+
+    Every business gets a check interval from its status (active businesses
+    every `active_days`, dissolved ones every `inactive_days`). The interval
+    shrinks with the rate at which the record changed in the past and when an
+    activity was issued shortly before the last fetch, and grows for records
+    that haven't changed for a year (within `min_days`..`max_days`). Upcoming
+    activity expiry dates pull the next check forward: once
+    `expiry_lead_days` before the expiry and once the day after it.
+
+    Urgency is the time since the last fetch relative to the interval up to
+    the next check, so 1.0 means just due. Within the request budget, due
+    businesses whose check was brought forward by an expiry date go first,
+    then the rest, most urgent first.
+    """
+
+    def __init__(self, active_days: float = 30, inactive_days: float = 180, default_days: float = 60,
+                 min_days: float = 1, max_days: float = 365, expiry_lead_days: float = 7,
+                 recent_activity_days: float = 90):
+        self.active_days = active_days
+        self.inactive_days = inactive_days
+        self.default_days = default_days
+        self.min_days = min_days
+        self.max_days = max_days
+        self.expiry_lead_days = expiry_lead_days
+        self.recent_activity_days = recent_activity_days
+        self.due_count = 0
+
+    def interval_days(self, record: Dict[str, Any], last_seen: datetime.datetime, first_seen: datetime.datetime,
+                      last_changed: datetime.datetime, change_count: int) -> float:
+        """Regular check interval, before activity expiry dates are taken into account."""
+        status = (record.get('status') or '').strip().lower()
+        if status in INACTIVE_STATUSES:
+            days = self.inactive_days
+        elif status:
+            days = self.active_days
+        else:
+            days = self.default_days
+
+        # Records that changed often are likely to change again
+        tracked_years = max((last_seen - first_seen).days / 365.25, 0.25)
+        days /= 1 + change_count / tracked_years
+
+        issued = [parse_date(activity.get('issued_date')) for activity in record.get('business_activities') or []]
+        if any(date and 0 <= (last_seen - date).days <= self.recent_activity_days for date in issued):
+            days /= 2
+        if (last_seen - last_changed).days > 365:
+            days *= 2
+        return min(max(days, self.min_days), self.max_days)
+
+    def next_check(self, record: Dict[str, Any], last_seen: datetime.datetime, first_seen: datetime.datetime,
+                   last_changed: datetime.datetime, change_count: int) -> Tuple[datetime.datetime, str]:
+        """When the business should be fetched next, and why ('interval' or 'expiry')."""
+        interval = self.interval_days(record, last_seen, first_seen, last_changed, change_count)
+        next_check = last_seen + datetime.timedelta(days=interval)
+        reason = 'interval'
+
+        for activity in record.get('business_activities') or []:
+            if (activity.get('state') or '').strip().lower() in CLOSED_ACTIVITY_STATES:
+                continue
+            expiry = parse_date(activity.get('expiry_date'))
+            if expiry is None:
+                continue
+            for check in (expiry - datetime.timedelta(days=self.expiry_lead_days), expiry + datetime.timedelta(days=1)):
+                # Only checks after the last fetch; earlier ones have been covered by it
+                if last_seen < check < next_check:
+                    next_check, reason = check, 'expiry'
+        return next_check, reason
+
+    def plan(self, rows: Iterable[tuple], now: Optional[datetime.datetime] = None) -> Iterator[DueBusiness]:
+        """
+        Yield a DueBusiness for every store row, whether it's due or not.
+
+        Args:
+            rows: (business_id, record JSON, first_seen, last_seen, last_changed, change_count) tuples
+            now: Reference time (defaults to the current UTC time)
+        """
+        now = now or datetime.datetime.utcnow()
+        for business_id, record_json, first_seen, last_seen, last_changed, change_count in rows:
+            record = json.loads(record_json)
+            seen = parse_timestamp(last_seen) or parse_timestamp(record.get('extracted_at'))
+            if seen is None:
+                # No usable fetch time, so fetch it as soon as possible
+                yield DueBusiness(business_id, record.get('detail_url'), now, float('inf'), 'interval')
+                continue
+            first = parse_timestamp(first_seen) or seen
+            changed = parse_timestamp(last_changed) or seen
+            next_check, reason = self.next_check(record, seen, first, changed, change_count)
+            span = (next_check - seen).total_seconds()
+            urgency = (now - seen).total_seconds() / span if span > 0 else float('inf')
+            yield DueBusiness(business_id, record.get('detail_url'), next_check, urgency, reason)
+
+    def due(self, store, budget: int, now: Optional[datetime.datetime] = None) -> List[DueBusiness]:
+        """
+        Update every business' next check time in the store and return the due ones, most urgent first.
+
+        Args:
+            store: An open BusinessStore
+            budget: Maximum number of businesses to return
+            now: Reference time (defaults to the current UTC time)
+        """
+        now = now or datetime.datetime.utcnow()
+        due = []
+        next_checks = []
+        for business in self.plan(store.iter_schedule_rows(), now):
+            next_checks.append((business.next_check.isoformat(), business.business_id))
+            if business.next_check <= now and business.detail_url:
+                due.append(business)
+        store.set_next_checks(next_checks)
+        self.due_count = len(due)
+        return heapq.nlargest(budget, due, key=lambda business: (business.reason == 'expiry', business.urgency))
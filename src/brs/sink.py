@@ -0,0 +1,126 @@
+import asyncio
+import datetime
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict, IO, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LiveSink:
+    """
+    Streams dataset records as NDJSON while the crawl runs.
+
+    Every record pushed to the dataset writer is written as one JSON line to
+    stdout (`-`), a file or a named pipe as soon as it is extracted, so a
+    downstream consumer can start long before the crawl ends. Lines are
+    flushed every `flush_interval` seconds (and whenever the output buffer
+    fills up); `close()` writes a final summary line with `page_type`
+    "run_summary". Opening a named pipe waits for its reader. If the reader
+    goes away, streaming stops and the crawl carries on (see DatasetWriter).
+    """
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        self.path: Optional[str] = None
+        self.written = 0
+        self.errors = 0
+        self._file: Optional[IO[str]] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._started = 0.0
+        self._first_record_sec: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def open(self, path: Optional[str], flush_interval: Optional[float] = None) -> None:
+        """Start streaming to `path` (`-` for stdout); None or '' disables streaming."""
+        self.path = path or None
+        self.written = 0
+        self.errors = 0
+        self._first_record_sec = None
+        self._started = time.monotonic()
+        if flush_interval is not None:
+            self.flush_interval = flush_interval
+        if not path:
+            return
+        if path == '-':
+            self._file = sys.stdout
+        else:
+            # Line endings stay '\n' on every platform, as NDJSON expects
+            self._file = open(path, 'w', encoding='utf-8', newline='\n')
+        self._timer = asyncio.create_task(self._flush_periodically())
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Write one record as a JSON line."""
+        if self._file is None:
+            return
+        try:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        except (BrokenPipeError, OSError) as e:
+            self._stop(e)
+            return
+        if self._first_record_sec is None:
+            self._first_record_sec = time.monotonic() - self._started
+        self.written += 1
+        if 'error' in record:
+            self.errors += 1
+
+    def flush(self) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+        except (BrokenPipeError, OSError) as e:
+            self._stop(e)
+
+    def close(self, completed: bool = True, counters: Optional[Dict[str, int]] = None) -> None:
+        """Write the summary line, flush and stop streaming."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is None:
+            return
+        records = self.written
+        self.write({
+            'page_type': 'run_summary',
+            'completed': completed,
+            'records': records,
+            'errors': self.errors,
+            'elapsed_sec': round(time.monotonic() - self._started, 3),
+            'first_record_sec': round(self._first_record_sec, 3) if self._first_record_sec is not None else None,
+            'finished_at': datetime.datetime.utcnow().isoformat(),
+            'counters': counters or {},
+        })
+        # The summary line itself isn't a record
+        self.written = records
+        self.flush()
+        self._release()
+
+    def _stop(self, error: Exception) -> None:
+        logger.warning(f'Live output to {self.path} stopped: {error}')
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._release()
+
+    def _release(self) -> None:
+        file, self._file = self._file, None
+        if file is not None and file is not sys.stdout:
+            try:
+                file.close()
+            except OSError:
+                # A closed pipe can fail the final flush; nothing is left to save
+                pass
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+
+# Configured by the crawler entry point
+live_sink = LiveSink()
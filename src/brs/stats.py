@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Upper bounds (seconds) of the timing histogram buckets: 0.1ms doubling up to ~52s, then overflow
+BUCKET_BOUNDS = tuple(0.0001 * 2 ** i for i in range(20))
+
+
+class Histogram:
+    """Fixed log-scale histogram of durations in seconds."""
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of observations."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_sec': self.total,
+            'mean_sec': self.total / self.count if self.count else None,
+            'min_sec': self.min,
+            'max_sec': self.max,
+            'p50_sec': self.percentile(0.5),
+            'p90_sec': self.percentile(0.9),
+            'p99_sec': self.percentile(0.99),
+            'buckets': {
+                (f'le_{bound:g}' if i < len(BUCKET_BOUNDS) else 'overflow'): count
+                for i, (bound, count) in enumerate(zip(BUCKET_BOUNDS + (None,), self.buckets))
+                if count
+            },
+        }
+
+
+class RunStats:
+    """Counters and stage timings collected while crawling and reported once the run finishes."""
+
+    def __init__(self):
+        self.counters: Counter = Counter()
+        self.timings: Dict[str, Histogram] = {}
+        self.started_at = time.monotonic()
+
+    def start(self) -> None:
+        """Start a run: clear what an earlier run in this process collected and mark the start time."""
+        self.counters = Counter()
+        self.timings = {}
+        self.started_at = time.monotonic()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increase a named counter."""
+        self.counters[name] += amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record the duration of one run of a named stage."""
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        """Time the enclosed block (which may await) as one run of a named stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, int]:
+        """Return a sorted snapshot of all counters."""
+        return dict(sorted(self.counters.items()))
+
+    def format_summary(self) -> str:
+        """Render the counters as a single log-friendly line."""
+        return ', '.join(f'{name}={value}' for name, value in self.summary().items()) or 'no counters recorded'
+
+    def format_timings(self) -> str:
+        """Render the stage timings as a single log-friendly line."""
+        parts = []
+        for name, histogram in sorted(self.timings.items()):
+            parts.append(
+                f'{name}: n={histogram.count} total={histogram.total:.2f}s '
+                f'p50={histogram.percentile(0.5) * 1000:.1f}ms p99={histogram.percentile(0.99) * 1000:.1f}ms'
+            )
+        return '; '.join(parts) or 'no timings recorded'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Everything collected so far, in a JSON-serializable form."""
+        elapsed = time.monotonic() - self.started_at
+        pages = sum(value for name, value in self.counters.items() if name.startswith('pages_'))
+        return {
+            'elapsed_sec': elapsed,
+            'pages': pages,
+            'pages_per_sec': pages / elapsed if elapsed > 0 else None,
+            'counters': self.summary(),
+            'timings': {name: histogram.to_dict() for name, histogram in sorted(self.timings.items())},
+        }
+
+    async def log_periodically(self, log: logging.Logger, interval: float) -> None:
+        """Log a progress line every `interval` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            metrics = self.to_dict()
+            log.info(
+                f"Metrics after {metrics['elapsed_sec']:.0f}s: {metrics['pages']} pages "
+                f"({metrics['pages_per_sec']:.1f}/s); {self.format_timings()}"
+            )
+
+    def write(self, path: str) -> None:
+        """Write the metrics to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+# Shared by the request handler and the crawler entry point
+run_stats = RunStats()
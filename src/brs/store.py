@@ -0,0 +1,250 @@
+import datetime
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Fields that change on every fetch without the business itself changing (or depend on the run's queries)
+VOLATILE_FIELDS = ('extracted_at', 'detail_url', 'matched_query', 'match_score')
+
+# Fields whose changes are reported by the changes-only output
+TRACKED_FIELDS = ('status', 'board_of_directors', 'shareholders', 'business_activities')
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS businesses (
+    business_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    record TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_changed TEXT NOT NULL,
+    change_count INTEGER NOT NULL DEFAULT 0,
+    next_check TEXT
+);
+CREATE TABLE IF NOT EXISTS changes (
+    run_id TEXT NOT NULL,
+    business_id TEXT NOT NULL,
+    change_type TEXT NOT NULL,
+    changed_fields TEXT NOT NULL,
+    previous TEXT,
+    current TEXT NOT NULL,
+    PRIMARY KEY (run_id, business_id)
+);
+"""
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Hash a detail record, ignoring fields that differ between fetches of the same content."""
+    stable = {key: value for key, value in record.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha256(json.dumps(stable, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class BusinessStore:
+    """
+    Persistent local SQLite store of detail records keyed by business_id.
+
+    Every upsert compares a content hash with the stored one, so unchanged
+    businesses can be skipped downstream. Changes to the tracked fields are
+    logged per run in the `changes` table. `next_check` is filled in by the
+    recrawl scheduler.
+
+    Upserts are written in batches: their statements are kept in memory
+    (lookups see them) and run in one short transaction every `batch_size`
+    upserts, before the dataset writer pushes a batch, before reading the
+    store back and on close. Worker processes sharing the store
+    (`--workers`) take the write lock once per batch instead of once per
+    record, and a batch that still finds the database locked after
+    `timeout` seconds is retried.
+    """
+
+    # Attempts at writing a batch while other processes hold the write lock
+    LOCKED_RETRIES = 3
+
+    def __init__(self, batch_size: int = 100, timeout: float = 30.0):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.path: Optional[str] = None
+        self.run_id: Optional[str] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Tuple[str, tuple]] = []
+        self._pending_upserts = 0
+        # Lookups of the batch: business_id -> (content_hash, record, last_changed), and the logged changes
+        self._pending_rows: Dict[str, Tuple[str, str, str]] = {}
+        self._pending_changes: Dict[str, Tuple[str, str]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def open(self, path: str, run_id: Optional[str] = None) -> None:
+        """Open (or create) the store and start a new run, or continue `run_id`."""
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=self.timeout)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(businesses)')}
+        if 'next_check' not in columns:
+            # Stores created before the recrawl scheduler
+            self._conn.execute('ALTER TABLE businesses ADD COLUMN next_check TEXT')
+        self.run_id = run_id or datetime.datetime.utcnow().isoformat()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self.flush()
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def flush(self) -> None:
+        """Write the batched upserts in one transaction."""
+        if self._conn is None or not self._pending:
+            return
+        for attempt in range(1, self.LOCKED_RETRIES + 1):
+            try:
+                with self._conn:
+                    for sql, params in self._pending:
+                        self._conn.execute(sql, params)
+                break
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) or attempt == self.LOCKED_RETRIES:
+                    raise
+                logger.warning(f'Store is locked by another process, retrying the batch ({attempt}/{self.LOCKED_RETRIES})')
+                time.sleep(attempt)
+        self._pending = []
+        self._pending_upserts = 0
+        self._pending_rows.clear()
+        self._pending_changes.clear()
+
+    def _write(self, sql: str, params: tuple) -> None:
+        self._pending.append((sql, params))
+
+    def upsert(self, record: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """
+        Insert or update a detail record.
+
+        Args:
+            record: A business detail record with a business_id
+
+        Returns:
+            ('new' | 'changed' | 'unchanged', names of the tracked fields that changed)
+        """
+        business_id = record['business_id']
+        new_hash = content_hash(record)
+        row = self._pending_rows.get(business_id) or self._conn.execute(
+            'SELECT content_hash, record, last_changed FROM businesses WHERE business_id = ?', (business_id,)
+        ).fetchone()
+
+        if row is not None and row[0] == new_hash and row[2] == self.run_id:
+            # Upserted earlier in this (resumed) run: report the same result again
+            logged = self._pending_changes.get(business_id) or self._conn.execute(
+                'SELECT change_type, changed_fields FROM changes WHERE run_id = ? AND business_id = ?',
+                (self.run_id, business_id),
+            ).fetchone()
+            return (logged[0], json.loads(logged[1])) if logged else ('changed', [])
+
+        self._pending_upserts += 1
+        if row is not None and row[0] == new_hash:
+            self._write('UPDATE businesses SET last_seen = ? WHERE business_id = ?', (self.run_id, business_id))
+            self._flush_full_batch()
+            return 'unchanged', []
+
+        current = {field: record.get(field) for field in TRACKED_FIELDS}
+        serialized = json.dumps(record, sort_keys=True, ensure_ascii=False)
+
+        if row is None:
+            change_type = 'new'
+            changed_fields = list(TRACKED_FIELDS)
+            previous = None
+            self._write(
+                'INSERT INTO businesses (business_id, content_hash, record, first_seen, last_seen, last_changed) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (business_id, new_hash, serialized, self.run_id, self.run_id, self.run_id),
+            )
+        else:
+            change_type = 'changed'
+            stored = json.loads(row[1])
+            previous = {field: stored.get(field) for field in TRACKED_FIELDS}
+            changed_fields = [field for field in TRACKED_FIELDS if previous[field] != current[field]]
+            self._write(
+                'UPDATE businesses SET content_hash = ?, record = ?, last_seen = ?, last_changed = ?, '
+                'change_count = change_count + 1 WHERE business_id = ?',
+                (new_hash, serialized, self.run_id, self.run_id, business_id),
+            )
+
+        self._pending_rows[business_id] = (new_hash, serialized, self.run_id)
+        if changed_fields:
+            self._pending_changes[business_id] = (change_type, json.dumps(changed_fields))
+            self._write(
+                'INSERT OR REPLACE INTO changes (run_id, business_id, change_type, changed_fields, previous, current) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    self.run_id,
+                    business_id,
+                    change_type,
+                    json.dumps(changed_fields),
+                    json.dumps(previous, ensure_ascii=False) if previous is not None else None,
+                    json.dumps(current, ensure_ascii=False),
+                ),
+            )
+        self._flush_full_batch()
+        return change_type, changed_fields
+
+    def _flush_full_batch(self) -> None:
+        if self._pending_upserts >= self.batch_size:
+            self.flush()
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Yield the latest record of every business."""
+        self.flush()
+        for (record,) in self._conn.execute('SELECT record FROM businesses'):
+            yield json.loads(record)
+
+    def iter_schedule_rows(self) -> Iterator[Tuple[str, str, str, str, str, int]]:
+        """Yield (business_id, record JSON, first_seen, last_seen, last_changed, change_count) for every business."""
+        self.flush()
+        yield from self._conn.execute(
+            'SELECT business_id, record, first_seen, last_seen, last_changed, change_count FROM businesses'
+        )
+
+    def set_next_checks(self, next_checks: Iterable[Tuple[str, str]]) -> None:
+        """Store (next check time, business_id) pairs computed by the recrawl scheduler."""
+        self.flush()
+        self._conn.executemany('UPDATE businesses SET next_check = ? WHERE business_id = ?', next_checks)
+        self._conn.commit()
+
+    def iter_changes(self, run_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the tracked-field changes recorded in a run (the current run by default)."""
+        self.flush()
+        cursor = self._conn.execute(
+            'SELECT c.business_id, json_extract(b.record, \'$.business_name\'), c.change_type, c.changed_fields, '
+            'c.previous, c.current FROM changes c JOIN businesses b USING (business_id) '
+            'WHERE c.run_id = ? ORDER BY c.business_id',
+            (run_id or self.run_id,),
+        )
+        for business_id, business_name, change_type, changed_fields, previous, current in cursor:
+            yield {
+                'business_id': business_id,
+                'business_name': business_name,
+                'change_type': change_type,
+                'changed_fields': json.loads(changed_fields),
+                'previous': json.loads(previous) if previous else None,
+                'current': json.loads(current),
+            }
+
+    def export_changes(self, path: str, run_id: Optional[str] = None) -> int:
+        """Write the changes of a run as NDJSON and return how many were written."""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for change in self.iter_changes(run_id):
+                f.write(json.dumps(change, ensure_ascii=False) + '\n')
+                count += 1
+        return count
+
+
+# Shared by the extractor and the crawler entry point
+business_store = BusinessStore()
@@ -0,0 +1,203 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+from crawlee import Request
+from crawlee.http_clients import HttpClient, HttpCrawlingResult
+
+from .clients import DelegatingHttpClient, request_kind
+from .stats import run_stats
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on the number of in-flight requests of one kind.
+
+    The limit grows by roughly one slot per round of healthy responses up to
+    `ceiling`: no errors, and the smoothed latency under twice the baseline
+    (plus `tolerance` seconds, so jitter at near-zero latencies doesn't
+    count as load). The baseline is the lowest smoothed latency of the last
+    `window` responses, so neither one lucky response nor a server that got
+    slower for good stops the growth. Timeouts, 429s and 5xx responses
+    halve it and pause new requests for a backoff period that doubles on
+    consecutive failures.
+
+    Crawls take their slots with `try_acquire()` before a request is handed
+    to the crawler (see DetailFirstTandem), so requests wait for a slot in
+    the crawler's pool rather than inside their request handler timeout.
+    """
+
+    def __init__(self, name: str, ceiling: int, initial: Optional[int] = None, minimum: int = 1,
+                 max_backoff: float = 60.0, window: int = 100, tolerance: float = 0.01):
+        self.name = name
+        self.ceiling = max(ceiling, minimum)
+        self.minimum = minimum
+        self.limit = float(min(initial or minimum, self.ceiling))
+        self.max_backoff = max_backoff
+        self.in_flight = 0
+        self.tolerance = tolerance
+        self.latency: Optional[float] = None
+        self._recent_latencies: deque = deque(maxlen=window)
+        self._backoff = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    def ready(self) -> bool:
+        """Whether a new request could start now: not paused and under the limit."""
+        return self._paused_until <= time.monotonic() and self.in_flight < int(self.limit)
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free now, without waiting."""
+        if not self.ready():
+            return False
+        self.in_flight += 1
+        return True
+
+    async def acquire(self) -> None:
+        while True:
+            async with self._condition:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0:
+                    if self.in_flight < int(self.limit):
+                        self.in_flight += 1
+                        return
+                    await self._condition.wait()
+                    continue
+            await asyncio.sleep(pause)
+
+    async def release(self, latency: float, outcome: str, retry_after: Optional[float] = None) -> None:
+        """
+        Return a slot and adjust the limit.
+
+        Args:
+            latency: Seconds the request took
+            outcome: 'ok', 'throttled' (429), 'server_error' (5xx), 'timeout',
+                or 'error' for failures that say nothing about load
+            retry_after: Server-requested pause in seconds, if any
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if outcome == 'ok':
+                self._on_success(latency)
+            elif outcome != 'error':
+                self._on_failure(retry_after)
+            self._condition.notify_all()
+
+    async def cancel(self) -> None:
+        """Return a slot that wasn't used for a request to the registry."""
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _on_success(self, latency: float) -> None:
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self._recent_latencies.append(self.latency)
+        self._backoff = 0.0
+        if self.latency <= 2 * self.baseline_latency + self.tolerance:
+            self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+
+    @property
+    def baseline_latency(self) -> Optional[float]:
+        """Lowest smoothed latency of the last `window` successful responses."""
+        return min(self._recent_latencies) if self._recent_latencies else None
+
+    def _on_failure(self, retry_after: Optional[float]) -> None:
+        now = time.monotonic()
+        # Requests already in flight fail together; react once per latency window
+        if now - self._last_decrease < (self.latency or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit / 2)
+        self._backoff = min(self.max_backoff, max(1.0, self._backoff * 2))
+        pause = min(self.max_backoff, retry_after) if retry_after else self._backoff
+        self._paused_until = now + pause
+
+    def describe(self) -> str:
+        latency = f'{self.latency:.2f}s' if self.latency is not None else 'n/a'
+        return f'{self.name}: limit={int(self.limit)}/{self.ceiling} avg_latency={latency}'
+
+
+class AdaptiveHttpClient(DelegatingHttpClient):
+    """
+    Wraps another HttpClient with separate adaptive concurrency budgets for
+    search POSTs and detail GETs, driven by the registry's latency and errors.
+
+    The crawler's request manager reserves a slot with `reserve()` before it
+    hands out a request, and holds the request back while its budget is full
+    or paused. A request that arrives here without a reservation waits for
+    a slot instead.
+    """
+
+    def __init__(self, inner: HttpClient, search_ceiling: int = 4, detail_ceiling: int = 16):
+        super().__init__(inner)
+        self.limiters: Dict[str, AdaptiveLimiter] = {
+            'search': AdaptiveLimiter('search', search_ceiling, initial=1),
+            'detail': AdaptiveLimiter('detail', detail_ceiling, initial=2),
+        }
+        self._reserved: Dict[str, AdaptiveLimiter] = {}
+
+    def can_start(self, kind: str) -> bool:
+        """Whether a request of this kind could get a slot now."""
+        limiter = self.limiters.get(kind)
+        return limiter is None or limiter.ready()
+
+    def reserve(self, request: Request) -> bool:
+        """Take a slot for `request` if its budget has one free; it's used by `crawl()` or given back."""
+        limiter = self.limiters.get(request_kind(request))
+        if limiter is None:
+            return True
+        if not limiter.try_acquire():
+            return False
+        self._reserved[request.unique_key] = limiter
+        return True
+
+    async def release_reservation(self, request: Request) -> None:
+        limiter = self._reserved.pop(request.unique_key, None)
+        if limiter is not None:
+            await limiter.cancel()
+
+    async def crawl(self, request: Request, *, session=None, proxy_info=None, statistics=None) -> HttpCrawlingResult:
+        limiter = self._reserved.pop(request.unique_key, None)
+        if limiter is None:
+            limiter = self.limiters.get(request_kind(request))
+            if limiter is None:
+                return await super().crawl(request, session=session, proxy_info=proxy_info, statistics=statistics)
+            waited = time.monotonic()
+            await limiter.acquire()
+            run_stats.observe(f'fetch_wait_{limiter.name}', time.monotonic() - waited)
+        started = time.monotonic()
+        outcome = 'error'
+        retry_after = None
+        try:
+            result = await super().crawl(request, session=session, proxy_info=proxy_info, statistics=statistics)
+            status = result.http_response.status_code
+            if status == 429:
+                outcome = 'throttled'
+                retry_after = _parse_retry_after(result.http_response.headers.get('retry-after'))
+            elif status >= 500:
+                outcome = 'server_error'
+            else:
+                outcome = 'ok'
+            return result
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            outcome = 'timeout'
+            raise
+        finally:
+            latency = time.monotonic() - started
+            run_stats.observe(f'fetch_{limiter.name}', latency)
+            if outcome not in ('ok', 'error'):
+                run_stats.increment(f'adaptive_{limiter.name}_{outcome}')
+            await limiter.release(latency, outcome, retry_after)
+
+    def describe(self) -> str:
+        return ', '.join(limiter.describe() for limiter in self.limiters.values())
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,96 @@
+import ssl
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from crawlee.http_clients import HttpxHttpClient
+
+from .stats import run_stats
+
+COMPRESSION_MODES = ('auto', 'gzip', 'none')
+
+# Accept-Encoding sent for each compression mode; 'auto' keeps httpx's, every encoding it can decode
+ACCEPT_ENCODING = {'gzip': 'gzip', 'none': 'identity'}
+
+
+class _RequestTrace:
+    """httpcore trace callback of one request: did it open a connection, or reuse one?"""
+
+    __slots__ = ('connected', 'started')
+
+    def __init__(self):
+        self.connected = False
+        self.started = 0.0
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name in ('connection.connect_tcp.started', 'connection.start_tls.started'):
+            self.started = time.perf_counter()
+        elif event_name == 'connection.connect_tcp.complete':
+            self.connected = True
+            run_stats.increment('http_connections_opened')
+            run_stats.observe('http_connect', time.perf_counter() - self.started)
+        elif event_name == 'connection.start_tls.complete':
+            run_stats.increment('http_tls_handshakes')
+            run_stats.observe('http_tls_handshake', time.perf_counter() - self.started)
+        elif event_name.endswith('.send_request_headers.started') and not self.connected:
+            run_stats.increment('http_connections_reused')
+
+
+class ConnectionTracer:
+    """
+    Counts connection setup work from httpx's event hooks.
+
+    Each request gets an httpcore trace callback, which counts the TCP
+    connections opened and TLS handshakes made for it (with their timings)
+    and, for requests sent on a connection that was already open, a reuse.
+    Responses are counted by HTTP version.
+    """
+
+    async def on_request(self, request: httpx.Request) -> None:
+        request.extensions['trace'] = _RequestTrace()
+
+    async def on_response(self, response: httpx.Response) -> None:
+        version = response.http_version.lower().replace('/', '').replace('.', '')
+        run_stats.increment(f'http_responses_{version}')
+
+
+def build_http_client(pool_size: int = 100, keep_alive: bool = True, keep_alive_expiry: float = 30.0,
+                      http2: bool = True, connect_timeout: float = 5.0, request_timeout: float = 5.0,
+                      compression: str = 'auto', ca_bundle: Optional[str] = None) -> HttpxHttpClient:
+    """
+    The HTTP client every registry request goes through.
+
+    All requests share one connection pool, so search POSTs and detail GETs
+    reuse the same warm connections to the registry host. With HTTP/2 (when
+    the server negotiates it) concurrent requests are multiplexed over one
+    connection.
+
+    Args:
+        pool_size: Most open connections; further requests wait for one to be free
+        keep_alive: Keep connections open for the next request (up to `pool_size` of them)
+        keep_alive_expiry: Seconds an idle connection is kept open
+        http2: Offer HTTP/2 (negotiated over TLS), besides HTTP/1.1
+        connect_timeout: Seconds to open a connection
+        request_timeout: Seconds to send the request, read the response or wait for a pooled connection
+        compression: 'auto' (any encoding httpx can decode), 'gzip' or 'none'
+        ca_bundle: Verify the server's certificate against this file instead of the system's CAs
+    """
+    if compression not in COMPRESSION_MODES:
+        raise ValueError(f'Unknown compression {compression!r}, expected one of {COMPRESSION_MODES}')
+    tracer = ConnectionTracer()
+    options: Dict[str, Any] = {
+        'limits': httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size if keep_alive else 0,
+            keepalive_expiry=keep_alive_expiry,
+        ),
+        'timeout': httpx.Timeout(request_timeout, connect=connect_timeout),
+        'event_hooks': {'request': [tracer.on_request], 'response': [tracer.on_response]},
+    }
+    if compression in ACCEPT_ENCODING:
+        options['headers'] = {'Accept-Encoding': ACCEPT_ENCODING[compression]}
+    return HttpxHttpClient(
+        http2=http2,
+        verify=ssl.create_default_context(cafile=ca_bundle) if ca_bundle else True,
+        **options,
+    )
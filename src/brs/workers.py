@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from .checkpoint import Checkpoint
+from .dedup import SeenIndex
+from .export import merge_exports
+from .index import business_index, iter_ndjson_records
+from .store import business_store
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """
+    Runs a crawl as `count` worker processes and merges their output.
+
+    Each worker is a `brs` process with the same arguments, crawling shard
+    `i/count` of the queries (hashed by query key, or of the prefixes in
+    enumeration mode) with its own storage directory under `work_dir`.
+    Business ids are claimed in a shared SQLite file, so a business found by
+    queries of several shards is only fetched once. With a seen-index TTL
+    the fetch times of previous runs are copied from the pool's key-value
+    store into that file for the workers, and back once they're done, so
+    `--workers` runs and single-process runs share one index. Each worker exports
+    NDJSON; the pool merges those into the requested CSV/NDJSON/columnar
+    outputs and writes the change log of the shared store.
+    """
+
+    def __init__(self, count: int, work_dir: str):
+        self.count = count
+        self.work_dir = work_dir
+        self.claims_path = os.path.join(work_dir, 'claims.sqlite')
+        self.state_path = os.path.join(work_dir, 'run.json')
+
+    @classmethod
+    def for_run(cls, count: int, resume_run_id: Optional[str] = None) -> 'WorkerPool':
+        """Pool working under the storage directory, in a directory kept per resumable run."""
+        storage_dir = os.environ.get('CRAWLEE_STORAGE_DIR', './storage')
+        name = Checkpoint.storage_name(resume_run_id) if resume_run_id else 'default'
+        return cls(count, os.path.join(storage_dir, 'workers', name))
+
+    def shard_dir(self, index: int) -> str:
+        return os.path.join(self.work_dir, f'shard-{index}')
+
+    def shard_output(self, index: int) -> str:
+        return os.path.join(self.work_dir, f'shard-{index}.ndjson')
+
+    def shard_metrics(self, index: int) -> str:
+        return os.path.join(self.work_dir, f'shard-{index}.metrics.json')
+
+    def prepare(self, resume: bool = False) -> Dict[str, Any]:
+        """Create the work directory and return the run state (kept across resumes)."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        # Claims are rebuilt by the workers from their checkpoints, so nothing claimed before a crash is lost
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.claims_path + suffix):
+                os.remove(self.claims_path + suffix)
+        state = {}
+        if resume and os.path.exists(self.state_path):
+            with open(self.state_path, encoding='utf-8') as f:
+                state = json.load(f)
+        return state
+
+    async def share_seen_index(self, ttl_days: float) -> None:
+        """Copy the fetch times of previous runs to the claims file, where the workers load them."""
+        seen = SeenIndex(ttl_days)
+        await seen.load()
+        seen.share(self.claims_path)
+        await seen.save()
+        seen.share(None)
+
+    async def collect_seen_index(self, ttl_days: float) -> None:
+        """Copy the fetch times the workers saved in the claims file back to the pool's key-value store."""
+        seen = SeenIndex(ttl_days)
+        seen.share(self.claims_path)
+        await seen.load()
+        seen.share(None)
+        await seen.save()
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+    def spool_stdin(self) -> str:
+        """Copy stdin to a file all workers can read (gzip input stays compressed)."""
+        path = os.path.join(self.work_dir, 'queries.stdin')
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(sys.stdin.buffer, f)
+        return path
+
+    def worker_args(self, index: int, argv: List[str], overrides: List[str]) -> List[str]:
+        # Options given later on the command line win, so the worker settings are simply appended
+        return [
+            sys.executable, '-m', 'brs', *argv,
+            '--workers', '1',
+            '--shard', f'{index}/{self.count}',
+            '--output-csv', '',
+            '--output-ndjson', self.shard_output(index),
+            '--columnar-dir', '',
+            '--changes-only', '',
+            '--metrics-file', self.shard_metrics(index),
+            '--shared-claims', self.claims_path,
+            '--index', '',
+            *overrides,
+        ]
+
+    def run(self, argv: List[str], overrides: Optional[List[str]] = None,
+            shard_overrides: Optional[List[List[str]]] = None) -> List[int]:
+        """Start the workers and wait for them; returns their exit codes."""
+        processes = []
+        for index in range(self.count):
+            for path in (self.shard_output(index), self.shard_metrics(index)):
+                if os.path.exists(path):
+                    os.remove(path)
+            args = self.worker_args(index, argv, [*(overrides or []), *(shard_overrides[index] if shard_overrides else [])])
+            env = dict(os.environ, CRAWLEE_STORAGE_DIR=self.shard_dir(index))
+            # In their own session, so Ctrl-C reaches the workers once, through the pool
+            processes.append(subprocess.Popen(args, env=env, start_new_session=True))
+        try:
+            return [process.wait() for process in processes]
+        except KeyboardInterrupt:
+            # Interrupted workers flush their records and save their checkpoints; killing them could leave
+            # half-written storage files behind
+            for process in processes:
+                process.send_signal(signal.SIGINT)
+            for process in processes:
+                process.wait()
+            raise
+
+    def merge(self, csv_path: Optional[str], ndjson_path: Optional[str], columnar_dir: Optional[str] = None,
+              columnar_format: str = 'parquet') -> int:
+        """Merge the workers' exports into one, dropping businesses exported by more than one worker."""
+        outputs = [self.shard_output(index) for index in range(self.count) if os.path.exists(self.shard_output(index))]
+        written, duplicates = merge_exports(
+            outputs,
+            csv_path=csv_path,
+            ndjson_path=ndjson_path,
+            log=logger,
+            columnar_dir=columnar_dir,
+            columnar_format=columnar_format,
+        )
+        logger.info(f'Merged {len(outputs)} worker exports: {written} records, {duplicates} duplicates dropped')
+        return written
+
+    def update_index(self, index_path: str) -> Dict[str, int]:
+        """Index the workers' records (the index keeps the newest record per business)."""
+        outputs = [self.shard_output(index) for index in range(self.count) if os.path.exists(self.shard_output(index))]
+        business_index.open(index_path)
+        try:
+            return business_index.update(iter_ndjson_records(outputs))
+        finally:
+            business_index.close()
+
+    def merge_metrics(self, elapsed: float) -> Dict[str, Any]:
+        """Sum the workers' counters; per-worker stage timings are kept under `workers`."""
+        counters: Dict[str, int] = {}
+        workers = []
+        for index in range(self.count):
+            if not os.path.exists(self.shard_metrics(index)):
+                continue
+            with open(self.shard_metrics(index), encoding='utf-8') as f:
+                metrics = json.load(f)
+            workers.append(metrics)
+            for name, value in metrics.get('counters', {}).items():
+                counters[name] = counters.get(name, 0) + value
+        pages = sum(value for name, value in counters.items() if name.startswith('pages_'))
+        return {
+            'elapsed_sec': elapsed,
+            'pages': pages,
+            'pages_per_sec': pages / elapsed if elapsed > 0 else None,
+            'counters': dict(sorted(counters.items())),
+            'workers': workers,
+        }
+
+
+def run_workers(args, argv: List[str]) -> int:
+    """`brs --workers N`: run the crawl in N processes and export the merged result. Returns the exit code."""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    pool = WorkerPool.for_run(args.workers, args.resume)
+    state = pool.prepare(resume=bool(args.resume))
+    started = time.monotonic()
+
+    overrides = []
+    if args.store:
+        # All workers log their changes under one store run id, which a resumed run keeps
+        if 'store_run_id' not in state:
+            business_store.open(args.store)
+            state['store_run_id'] = business_store.run_id
+            business_store.close()
+        overrides += ['--store-run-id', state['store_run_id']]
+    pool.save_state(state)
+    if args.queries_file == '-':
+        overrides += ['--queries-file', pool.spool_stdin()]
+    shard_overrides = None
+    if args.resume:
+        shard_overrides = [['--resume', f'{args.resume}-shard-{index}-of-{pool.count}'] for index in range(pool.count)]
+
+    if args.seen_ttl_days > 0:
+        asyncio.run(pool.share_seen_index(args.seen_ttl_days))
+
+    logger.info(f'Starting {pool.count} workers in {pool.work_dir}')
+    try:
+        exit_codes = pool.run(argv, overrides, shard_overrides)
+    except KeyboardInterrupt:
+        logger.error('Interrupted' + (f'; run again with --resume {args.resume} to carry on' if args.resume else ''))
+        return 130
+    finally:
+        if args.seen_ttl_days > 0:
+            asyncio.run(pool.collect_seen_index(args.seen_ttl_days))
+    failed = [index for index, code in enumerate(exit_codes) if code != 0]
+    if failed:
+        logger.error(f'Workers {failed} failed; exporting what the others produced')
+
+    pool.merge(args.output_csv, args.output_ndjson, args.columnar_dir, args.columnar_format)
+    if args.store and args.changes_only:
+        business_store.open(args.store, run_id=state['store_run_id'])
+        changed = business_store.export_changes(args.changes_only)
+        business_store.close()
+        logger.info(f'Wrote {changed} changed businesses to {args.changes_only}')
+
+    if args.index:
+        logger.info(f'Updated index {args.index}: {pool.update_index(args.index)}')
+
+    metrics = pool.merge_metrics(time.monotonic() - started)
+    logger.info(f"Workers finished: {metrics['pages']} pages in {metrics['elapsed_sec']:.1f}s "
+                f"({metrics['pages_per_sec'] or 0:.1f} pages/s)")
+    if args.metrics_file:
+        with open(args.metrics_file, 'w', encoding='utf-8') as f:
+            json.dump(metrics, f, indent=2)
+    return 1 if failed else 0
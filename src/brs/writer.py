@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from crawlee import service_locator
+from crawlee.events import Event
+from crawlee.storages import Dataset
+
+from .checkpoint import checkpoint
+from .sink import live_sink
+from .stats import run_stats
+from .store import business_store
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetWriter:
+    """
+    Buffers dataset records and pushes them in batches.
+
+    A batch is pushed when it reaches `max_items` records or `max_bytes` of
+    serialized JSON, every `flush_interval` seconds, on the platform's
+    persist-state, migrating and aborting events, and on close. Every flush
+    writes the store's batched upserts first. If a push fails the records
+    stay buffered for the next flush; `push()` logs the failure rather than
+    raising it, since the record it was given is already buffered.
+
+    Records are also written to the live sink as they arrive. With
+    `stream_only` they go to the live sink alone, so nothing accumulates in
+    the dataset, until the live sink stops.
+    """
+
+    FLUSH_EVENTS = (Event.PERSIST_STATE, Event.MIGRATING, Event.ABORTING)
+
+    def __init__(self, max_items: int = 100, max_bytes: int = 1_000_000, flush_interval: float = 5.0):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.stream_only = False
+        self.pushed = 0
+        self._dataset: Optional[Dataset] = None
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_bytes = 0
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def open(self, dataset: Optional[Dataset] = None) -> None:
+        """Start writing to `dataset` (the default dataset if not given)."""
+        self._dataset = dataset or await Dataset.open()
+        self._lock = asyncio.Lock()
+        self._timer = asyncio.create_task(self._flush_periodically())
+        event_manager = service_locator.get_event_manager()
+        for event in self.FLUSH_EVENTS:
+            event_manager.on(event=event, listener=self.flush)
+
+    async def push(self, record: Dict[str, Any]) -> None:
+        """Add a record to the buffer, pushing the batch once it's full."""
+        live_sink.write(record)
+        if self.stream_only:
+            if live_sink.enabled:
+                self.pushed += 1
+                return
+            # The live output's reader went away; keep the rest of the records rather than drop them
+            logger.warning('Keeping the remaining records in the dataset')
+            self.stream_only = False
+        if self._dataset is None:
+            # Not opened (e.g. the extractor used on its own): write through
+            await (await Dataset.open()).push_data(record)
+            return
+
+        self._buffer.append(record)
+        self._buffer_bytes += len(json.dumps(record, ensure_ascii=False, default=str))
+        if len(self._buffer) >= self.max_items or self._buffer_bytes >= self.max_bytes:
+            try:
+                await self.flush()
+            except Exception as e:
+                # The record is buffered either way; raising would retry its request and push it twice
+                logger.warning(f'Dataset flush failed, will retry on the next flush: {e}')
+
+    async def flush(self) -> None:
+        """Push all buffered records in one call."""
+        async with self._lock:
+            # A record only reaches the dataset once its store row is written
+            business_store.flush()
+            if not self._buffer or self._dataset is None:
+                return
+            batch = self._buffer
+            self._buffer = []
+            self._buffer_bytes = 0
+            try:
+                with run_stats.time('push_data'):
+                    await self._dataset.push_data(batch)
+            except Exception:
+                # Keep the records for the next attempt instead of dropping them
+                self._buffer = batch + self._buffer
+                self._buffer_bytes = sum(len(json.dumps(r, ensure_ascii=False, default=str)) for r in self._buffer)
+                raise
+            self.pushed += len(batch)
+            checkpoint.record_pushed(batch)
+
+    async def close(self) -> None:
+        """Stop the timer and push whatever is left."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        event_manager = service_locator.get_event_manager()
+        for event in self.FLUSH_EVENTS:
+            event_manager.off(event=event, listener=self.flush)
+        await self.flush()
+        self._dataset = None
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f'Periodic dataset flush failed, will retry: {e}')
+
+
+# Shared by the extractor and the crawler entry point
+dataset_writer = DatasetWriter()
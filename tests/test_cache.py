@@ -0,0 +1,96 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlencode
+
+from crawlee import Request
+from crawlee.http_clients import HttpCrawlingResult
+
+from benchmarks import pages
+from brs.cache import CachedHttpResponse, CachingHttpClient, OfflineCacheMiss
+
+
+def search_request(query):
+    return Request.from_url(
+        f'{pages.BASE_URL}/BusinessRegistry/SearchBusinessRegistry', method='POST',
+        payload=urlencode({'query': query}).encode(), use_extended_unique_key=True,
+    )
+
+
+class TestCachingHttpClient(unittest.IsolatedAsyncioTestCase):
+    """On-disk response cache in front of the registry."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = temp_dir.name
+        self.inner = mock.Mock()
+        self.inner.crawl = mock.AsyncMock(side_effect=lambda request, **kwargs: HttpCrawlingResult(
+            http_response=CachedHttpResponse(200, {'content-type': 'text/html'}, f'page {request.url}'.encode())))
+
+    def client(self, **options):
+        return CachingHttpClient(self.inner, cache_dir=self.cache_dir, **options)
+
+    async def test_hits_across_spellings(self):
+        """Test that searches are cached by normalized query and details by business id."""
+        client = self.client()
+        first = await client.crawl(search_request('Coral  Traders'))
+        second = await client.crawl(search_request(' coral traders '))
+        self.assertEqual(second.http_response.read(), first.http_response.read())
+        await client.crawl(Request.from_url(pages.detail_url(100001)))
+        await client.crawl(Request.from_url(pages.detail_url(100001).split('?')[0] + '?key=other'))
+        self.assertEqual(self.inner.crawl.await_count, 2)
+
+    async def test_ttl(self):
+        """Test that entries older than their page type's TTL are fetched again."""
+        client = self.client(search_ttl=timedelta(hours=1))
+        await client.crawl(search_request('coral'))
+        search_dir = os.path.join(self.cache_dir, 'business.egov.mv', 'search')
+        path = os.path.join(search_dir, os.listdir(search_dir)[0])
+        os.utime(path, (time.time() - 7200, time.time() - 7200))
+        await client.crawl(search_request('coral'))
+        self.assertEqual(self.inner.crawl.await_count, 2)
+
+    async def test_hosts_are_kept_apart(self):
+        """Test that a crawl of another registry host neither hits nor replaces the real registry's entries."""
+        client = self.client()
+        await client.crawl(search_request('coral'))
+        fake = Request.from_url(
+            'http://127.0.0.1:8080/BusinessRegistry/SearchBusinessRegistry', method='POST',
+            payload=urlencode({'query': 'coral'}).encode(), use_extended_unique_key=True,
+        )
+        await client.crawl(fake)
+        await client.crawl(Request.from_url(pages.detail_url(100001).replace(pages.BASE_URL, 'http://127.0.0.1:8080')))
+        self.assertEqual(self.inner.crawl.await_count, 3)
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), ['127.0.0.1_8080', 'business.egov.mv'])
+        with self.assertRaises(OfflineCacheMiss):
+            await self.client(offline=True).crawl(Request.from_url(pages.detail_url(100001)))
+        cached = await self.client(offline=True).crawl(search_request('coral'))
+        self.assertIn(pages.BASE_URL, cached.http_response.read().decode())
+
+    async def test_errors_are_not_cached(self):
+        """Test that only 200 responses are cached."""
+        self.inner.crawl.side_effect = lambda request, **kwargs: HttpCrawlingResult(
+            http_response=CachedHttpResponse(503, {}, b'busy'))
+        client = self.client()
+        await client.crawl(search_request('coral'))
+        await client.crawl(search_request('coral'))
+        self.assertEqual(self.inner.crawl.await_count, 2)
+
+    async def test_offline(self):
+        """Test that offline mode serves stale entries and fails misses without retrying."""
+        await self.client(search_ttl=timedelta(seconds=0)).crawl(search_request('coral'))
+        offline = self.client(search_ttl=timedelta(seconds=0), offline=True)
+        await offline.crawl(search_request('coral'))
+        request = search_request('reef')
+        with self.assertRaises(OfflineCacheMiss):
+            await offline.crawl(request)
+        self.assertTrue(request.no_retry)
+        self.assertEqual(self.inner.crawl.await_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
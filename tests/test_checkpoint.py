@@ -0,0 +1,143 @@
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.fake_registry import Corpus, FakeRegistry
+from brs import checkpoint as checkpoint_module
+from brs.checkpoint import Checkpoint
+
+from .test_dedup import FakeStore
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+class FakeDataset:
+    def __init__(self, items):
+        self.items = items
+
+    async def get_data(self, offset=0, limit=1000):
+        items = self.items[offset:offset + limit]
+        return SimpleNamespace(items=items, count=len(items), total=len(self.items))
+
+
+class TestCheckpoint(unittest.IsolatedAsyncioTestCase):
+    """Progress of a resumable run."""
+
+    async def asyncSetUp(self):
+        self.store = FakeStore()
+        patcher = mock.patch.object(checkpoint_module.KeyValueStore, 'open', mock.AsyncMock(return_value=self.store))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_resume(self):
+        """Test that a reopened run carries on with what the earlier attempt hadn't finished."""
+        first = Checkpoint()
+        await first.open('run-1')
+        self.assertFalse(first.resumed)
+        first.mark_searched('search:a')
+        first.mark_split(['ab', 'ac'])
+        first.mark_pending('1', 'https://x/1')
+        first.mark_pending('2', 'https://x/2')
+        first.record_pushed([{'business_id': '1'}])
+        await first.close()
+
+        second = Checkpoint()
+        await second.open('run-1')
+        self.assertTrue(second.resumed)
+        self.assertFalse(second.finished)
+        self.assertTrue(second.is_searched('search:a'))
+        self.assertEqual(second.split_queries, ['ab', 'ac'])
+        self.assertEqual(second.pending_details(), {'2': 'https://x/2'})
+        self.assertEqual(sorted(second.known_ids()), ['1', '2'])
+        await second.close(finished=True)
+        self.assertTrue(self.store.value['finished'])
+
+    async def test_reconcile(self):
+        """Test that records pushed after the last save count as done."""
+        checkpoint = Checkpoint()
+        await checkpoint.open('run-1')
+        checkpoint.mark_pending('1', 'https://x/1')
+        checkpoint.mark_pending('2', 'https://x/2')
+        await checkpoint.reconcile(FakeDataset([{'business_id': '1'}, {'business_id': '3'}]))
+        self.assertEqual(checkpoint.pushed, 2)
+        self.assertEqual(checkpoint.pending_details(), {'2': 'https://x/2'})
+        await checkpoint.close()
+
+    async def test_other_run(self):
+        """Test that a store holding another run's state is refused."""
+        checkpoint = Checkpoint()
+        await checkpoint.open('run-1')
+        await checkpoint.close()
+        with self.assertRaises(ValueError):
+            await Checkpoint().open('run-2')
+
+    async def test_disabled(self):
+        """Test that nothing is tracked until the checkpoint is opened."""
+        checkpoint = Checkpoint()
+        checkpoint.mark_searched('search:a')
+        checkpoint.mark_done('1')
+        self.assertEqual((checkpoint.searched, checkpoint.done), (set(), set()))
+
+    async def test_close_forgets_run(self):
+        """Test that a closed checkpoint doesn't carry its run into the next crawl, opened or not."""
+        checkpoint = Checkpoint()
+        await checkpoint.open('run-1')
+        checkpoint.mark_pending('1', 'https://x/1')
+        await checkpoint.close()
+        await checkpoint.open('run-1')
+        self.assertTrue(checkpoint.resumed)
+        checkpoint.store_run_id = 'store-1'
+        await checkpoint.close()
+        self.assertEqual(self.store.value['store_run_id'], 'store-1')
+        self.assertEqual((checkpoint.resumed, checkpoint.store_run_id, checkpoint.pending_details()), (False, None, {}))
+
+        unopened = Checkpoint()
+        unopened.store_run_id = 'store-2'
+        await unopened.close()
+        self.assertIsNone(unopened.store_run_id)
+
+
+class TestResumedCrawl(unittest.TestCase):
+    """Running the same resumable run again."""
+
+    def test_handled_searches_are_skipped(self):
+        """Test that a resumed run searches only what the earlier attempt didn't and keeps its records."""
+        registry = FakeRegistry(Corpus(300)).start()
+        queries = registry.corpus.queries(6)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        work_dir = temp_dir.name
+
+        def crawl(queries):
+            result = subprocess.run(
+                [sys.executable, '-m', 'brs', ','.join(queries), '--base-url', registry.url,
+                 '--resume', 'nightly', '--output-csv', 'out.csv'],
+                cwd=work_dir, env=dict(os.environ, PYTHONPATH=SRC_DIR), capture_output=True, timeout=120,
+            )
+            self.assertEqual(result.returncode, 0, result.stderr.decode(errors='replace'))
+            with open(os.path.join(work_dir, 'out.csv'), encoding='utf-8') as f:
+                return [row['business_id'] for row in csv.DictReader(f)]
+
+        try:
+            first = crawl(queries[:3])
+            before = registry.stats()['requests']
+            second = crawl(queries)
+            resumed_requests = registry.stats()['requests'] - before
+            before = registry.stats()['requests']
+            crawl(queries)
+            repeated_requests = registry.stats()['requests'] - before
+        finally:
+            registry.stop()
+        self.assertTrue(set(first) < set(second))
+        self.assertEqual(len(second), len(set(second)))
+        self.assertEqual(resumed_requests, 3 + len(second) - len(first))
+        self.assertEqual(repeated_requests, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
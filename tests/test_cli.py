@@ -0,0 +1,26 @@
+import contextlib
+import io
+import unittest
+
+from brs.__main__ import parse_args
+
+
+class TestParseArgs(unittest.TestCase):
+    """Parsing and checking the crawler's command line."""
+
+    def test_argv(self):
+        """Test that the given argv is parsed instead of the process' arguments."""
+        args = parse_args(['abc,def', '--exact-match-only', '--shard', '1/4'])
+        self.assertEqual(args.queries, 'abc,def')
+        self.assertTrue(args.exact_match_only)
+        self.assertEqual((args.shard_index, args.shard_count), (1, 4))
+
+    def test_checks(self):
+        """Test that conflicting options are rejected."""
+        for argv in (['--enumerate', '--exact-match-only'], ['--refresh'], ['x', '--match-threshold', '0']):
+            with self.subTest(argv=argv), self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                parse_args(argv)
+
+
+if __name__ == '__main__':
+    unittest.main()
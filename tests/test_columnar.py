@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # The `columnar` extra isn't installed
+    pyarrow = None
+
+from benchmarks import pages
+from brs.columnar import BUSINESS_COLUMNS, ENTITY_TABLES, STATUS_TABLES, ColumnarExporter
+from brs.export import export_dataset, merge_exports
+from brs.extractors import RichDataExtractor
+
+from .test_export import FakeDataset, write_ndjson
+
+
+def detail_records(count, **options):
+    extractor = RichDataExtractor()
+    return [
+        extractor.parse_page(pages.detail_page(business_id, **options), pages.detail_url(business_id)).detail.to_dict()
+        for business_id in range(100001, 100001 + count)
+    ]
+
+
+def read_table(directory, name, file_format='parquet'):
+    path = os.path.join(directory, f'{name}.{file_format}')
+    if file_format == 'parquet':
+        return pyarrow.parquet.read_table(path)
+    with pyarrow.ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+@unittest.skipIf(pyarrow is None, 'needs pyarrow (the columnar extra)')
+class TestColumnarExporter(unittest.TestCase):
+    """Normalized per-entity tables of the detail records."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+
+    def test_round_trip(self):
+        """Test that every table reads back with its columns and one row per entity, in both formats."""
+        records = detail_records(3, directors=2, shareholders=4, business_names=1, activities=5)
+        for file_format in ('parquet', 'arrow'):
+            with self.subTest(file_format=file_format):
+                output_dir = os.path.join(self.dir, file_format)
+                exporter = ColumnarExporter(output_dir, file_format, row_group_size=2)
+                for record in records + [{'error': 'broken', 'url': 'x'}]:
+                    exporter.add(record)
+                counts = exporter.close()
+                self.assertEqual(counts, {
+                    'businesses': 3, 'directors': 6, 'shareholders': 12, 'business_names': 3,
+                    'business_activities': 15, 'permits': 3, 'licenses': 3,
+                })
+
+                businesses = read_table(output_dir, 'businesses', file_format)
+                self.assertEqual(businesses.column_names, [name for name, _ in BUSINESS_COLUMNS])
+                self.assertEqual(businesses.column('business_id').to_pylist(), ['100001', '100002', '100003'])
+                self.assertEqual(businesses.column('board_of_directors_count').to_pylist(), [2, 2, 2])
+                for name, (_, columns) in {**ENTITY_TABLES, **STATUS_TABLES}.items():
+                    table = read_table(output_dir, name, file_format)
+                    self.assertEqual(table.column_names, ['business_id'] + [column for column, _ in columns])
+                    self.assertEqual(table.num_rows, counts[name])
+                directors = read_table(output_dir, 'directors', file_format).to_pylist()
+                self.assertEqual(directors[0], {'business_id': '100001', **records[0]['board_of_directors'][0]})
+
+    def test_empty_tables(self):
+        """Test that tables without rows are still written, with their schema."""
+        exporter = ColumnarExporter(self.dir)
+        exporter.add(detail_records(1, directors=0)[0])
+        self.assertEqual(exporter.close()['directors'], 0)
+        directors = read_table(self.dir, 'directors')
+        self.assertEqual((directors.num_rows, directors.column_names), (0, ['business_id', 'name', 'appointed_date']))
+
+
+class FailingDataset(FakeDataset):
+    """A dataset whose second page can't be read."""
+
+    async def get_data(self, offset=0, limit=1000):
+        if offset:
+            raise OSError('storage went away')
+        return await super().get_data(offset, limit)
+
+
+@unittest.skipIf(pyarrow is None, 'needs pyarrow (the columnar extra)')
+class TestFailedExport(unittest.IsolatedAsyncioTestCase):
+    """Columnar tables of an export that fails halfway."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+
+    async def test_export_dataset(self):
+        """Test that the tables written before the failure are closed and readable."""
+        dataset = FailingDataset(detail_records(3))
+        with self.assertRaises(OSError):
+            await export_dataset(dataset, csv_path=None, columnar_dir=self.dir, chunk_size=2)
+        self.assertEqual(read_table(self.dir, 'businesses').num_rows, 2)
+
+    def test_merge_exports(self):
+        """Test that a merge failing halfway through its input leaves the rows so far readable."""
+        path = os.path.join(self.dir, 'shard.ndjson')
+        write_ndjson(path, detail_records(3))
+        add = ColumnarExporter.add
+
+        def add_until_full(exporter, record):
+            if record['business_id'] == '100003':
+                raise OSError('disk full')
+            return add(exporter, record)
+
+        with mock.patch.object(ColumnarExporter, 'add', add_until_full), self.assertRaises(OSError):
+            merge_exports([path], csv_path=None, columnar_dir=self.dir)
+        self.assertEqual(read_table(self.dir, 'businesses').num_rows, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from benchmarks import pages
+from brs import dedup
+from brs.dedup import SeenIndex
+from brs.extractors import RichDataExtractor
+from brs.matching import NameMatcher
+
+
+class FakeStore:
+    def __init__(self, value=None):
+        self.value = value
+
+    async def get_value(self, key, default=None):
+        return self.value if self.value is not None else default
+
+    async def set_value(self, key, value):
+        self.value = value
+
+
+class TestSeenIndex(unittest.IsolatedAsyncioTestCase):
+    """Fetching each business once per run, and not again while it's fresh."""
+
+    async def load(self, index, stored):
+        store = FakeStore(stored)
+        with mock.patch.object(dedup.KeyValueStore, 'open', mock.AsyncMock(return_value=store)):
+            await index.load()
+        return store
+
+    async def test_duplicate_within_run(self):
+        """Test that a business is claimed by the first query that finds it."""
+        index = SeenIndex()
+        self.assertIsNone(index.check('1'))
+        self.assertEqual(index.check('1'), 'duplicate')
+        self.assertIsNone(index.check(None))
+        index.mark_enqueued(['2'])
+        self.assertEqual(index.check('2'), 'duplicate')
+
+    async def test_ttl(self):
+        """Test that fetch times within the TTL skip the business, and older ones are dropped."""
+        index = SeenIndex(ttl_days=1)
+        now = time.time()
+        await self.load(index, {'fresh': now - 3600, 'stale': now - 2 * 86400})
+        self.assertEqual(index.check('fresh'), 'fresh')
+        self.assertIsNone(index.check('stale'))
+
+        index.mark_fetched('new')
+        store = FakeStore()
+        with mock.patch.object(dedup.KeyValueStore, 'open', mock.AsyncMock(return_value=store)):
+            await index.save()
+        self.assertEqual(set(store.value), {'fresh', 'new'})
+
+    async def test_no_ttl(self):
+        """Test that a TTL of 0 neither loads nor saves fetch times."""
+        index = SeenIndex()
+        store = await self.load(index, {'1': time.time()})
+        self.assertIsNone(index.check('1'))
+        index.mark_fetched('2')
+        await index.save()
+        self.assertEqual(store.value, {'1': mock.ANY})
+
+    async def test_claims(self):
+        """Test that workers sharing a claims file fetch each business once."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = os.path.join(temp_dir.name, 'claims.sqlite')
+        first, second = SeenIndex(), SeenIndex()
+        first.share(path)
+        second.share(path)
+        try:
+            self.assertIsNone(first.check('1'))
+            self.assertEqual(second.check('1'), 'claimed')
+            second.mark_enqueued(['2', '3'])
+            self.assertEqual(first.check('3'), 'claimed')
+            self.assertIsNone(second.check('4'))
+        finally:
+            first.share(None)
+            second.share(None)
+
+
+class TestSavedDetail(unittest.IsolatedAsyncioTestCase):
+    """Only saved records are recorded as fetched."""
+
+    async def extract(self, queries):
+        extractor = RichDataExtractor()
+        extractor.matcher = NameMatcher.from_queries(queries)
+        context = mock.Mock()
+        context.request.url = pages.detail_url(100001)
+        context.http_response.read.return_value = pages.detail_page(100001, name='CORAL TRADERS').encode()
+        with mock.patch('brs.extractors.dataset_writer.push', mock.AsyncMock()) as push:
+            page = await extractor.extract_and_save(context, {'exact_match_only': True})
+        return page, push
+
+    async def test_rejected_detail_is_not_saved(self):
+        """Test that a detail page exact matching rejects isn't marked saved."""
+        page, push = await self.extract(['OTHER NAME'])
+        self.assertFalse(page.saved)
+        push.assert_not_awaited()
+
+    async def test_matched_detail_is_saved(self):
+        """Test that a pushed record marks its page saved."""
+        page, push = await self.extract(['coral traders'])
+        self.assertTrue(page.saved)
+        push.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
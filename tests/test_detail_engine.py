@@ -0,0 +1,92 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from benchmarks import pages
+from brs.extractors import BusinessRegistryExtractor
+
+URL = pages.detail_url(100001)
+
+EDGE_CASES = {
+    'empty page': '<html><body></body></html>',
+    'no tbody': '''<html><body>
+<table id="homepage-board-directors-list"><tr><td>A</td><td>01-Jan-2020</td></tr></table>
+</body></html>''',
+    'banner variants': '''<html><body>
+<div class="businessRegistryBanner">
+<h1 class="name"><b>NESTED</b> NAME Pvt Ltd</h1>
+<p class="number"><span>Registered</span> C-1</p>
+<p class="number">   </p>
+<p class="number">x <!-- c --> 2021SP0000001D</p>
+</div>
+<div class="businessRegistryBanner"><p class="address">  Second banner  </p>
+<p class="smeClassification">Micro</p></div>
+</body></html>''',
+    'sections': '''<html><body>
+<div class="form_title"><h3>Beneficial <i>Owner</i></h3><p>   </p><p>Second</p></div>
+<div class="form_title"><h3>Owner</h3><p><b>Bold</b> tail</p></div>
+<div class="form_title"><h3>Managing Director</h3></div>
+<div class="form_title"><h3>Managing Director</h3><div><p>Nested MD</p></div></div>
+<div class="form_title"><h3>Permits</h3></div><span>x</span><div></div><div><p>Not the next div</p></div>
+<div class="form_title"><h3>Licenses and Permits</h3></div><div><p>Does not have any</p></div>
+</body></html>''',
+    'irregular tables': '''<html><body>
+<table id="homepage-shareholders-list"><tbody>
+<tr><td></td><td>Only date</td><td>extra</td></tr>
+<tr><td><span>Inner</span> tail</td><td>01-Jan-2020</td></tr>
+<tr><td>One cell</td></tr>
+</tbody></table>
+<table id="homepage-bn-list"><tbody><tr><td>N</td><td>1</td><td>U</td><td>more</td></tr><tr><td>N</td><td>1</td></tr></tbody></table>
+<table id="homepage-business-activity-list"><tbody>
+<tr><td><!-- c -->BA1</td><td><b> 6201 Programming </b></td><td></td><td>01-Jan-2020</td><td> - </td><td><span></span>tail</td><td>Addr</td></tr>
+<tr><td>BA2</td><td>x</td><td>y</td></tr>
+<tr><td>BA3</td><td>a</td><td>b</td><td>c</td><td>d</td><td>e</td><td>f</td><td>eighth</td></tr>
+</tbody></table>
+</body></html>''',
+}
+
+
+class TestDetailEngine(unittest.TestCase):
+    """The compiled detail engine against the reference extractor."""
+
+    def setUp(self):
+        self.extractor = BusinessRegistryExtractor()
+
+    def assertSameDetail(self, html, url=URL):
+        compiled = self.extractor.extract_business_details(html, url).to_dict()
+        reference = self.extractor.extract_business_details_reference(html, url).to_dict()
+        self.assertEqual(list(compiled), list(reference))
+        self.assertEqual(compiled, reference)
+
+    def test_generated_pages(self):
+        """Test that generated companies and sole proprietorships extract the same."""
+        for seed in range(25):
+            for activities in (0, 1, 20):
+                for sole_proprietorship in (False, True):
+                    with self.subTest(seed=seed, activities=activities, sole_proprietorship=sole_proprietorship):
+                        self.assertSameDetail(pages.detail_page(
+                            business_id=100000 + seed, activities=activities, seed=seed,
+                            business_names=seed % 3, sole_proprietorship=sole_proprietorship,
+                        ), pages.detail_url(100000 + seed))
+
+    def test_edge_cases(self):
+        """Test that unusual markup extracts the same."""
+        for name, html in EDGE_CASES.items():
+            with self.subTest(name):
+                self.assertSameDetail(html)
+
+    def test_error_is_logged(self):
+        """Test that a page the engine fails on becomes an error record, logged rather than printed."""
+        stdout = io.StringIO()
+        with mock.patch('brs.extractors.extract_detail_fields', side_effect=ValueError('broken')), \
+                self.assertLogs('brs.extractors', 'ERROR') as logs, contextlib.redirect_stdout(stdout):
+            detail = self.extractor.extract_business_details('<html></html>', URL)
+        self.assertEqual(detail.page_type, 'detail_page_error')
+        self.assertEqual(detail.error, 'broken')
+        self.assertIn('broken', logs.output[0])
+        self.assertEqual(stdout.getvalue(), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
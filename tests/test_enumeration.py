@@ -0,0 +1,67 @@
+import unittest
+from collections import deque
+
+from brs.enumeration import PrefixEnumerator, parse_shard
+
+
+def enumerate_names(names, enumerator):
+    """Crawl `names` like the registry search does: substring matches, cut off at the saturation."""
+    found = set()
+    searches = deque(enumerator.seed_prefixes())
+    while searches:
+        prefix = searches.popleft()
+        results = [name for name in names if prefix in name][:enumerator.saturation]
+        found.update(results)
+        if enumerator.is_saturated(len(results)):
+            searches.extend(enumerator.split(prefix))
+    return found
+
+
+class TestPrefixEnumerator(unittest.TestCase):
+    """Generating and splitting search prefixes."""
+
+    def setUp(self):
+        self.enumerator = PrefixEnumerator()
+        self.enumerator.open(saturation=3, max_length=4, alphabet='abcdefgh')
+
+    def test_split(self):
+        """Test that a prefix grows by one character, directly and after a space, up to the maximum length."""
+        self.assertEqual(self.enumerator.split('ab')[:2], ['aba', 'abb'])
+        self.assertEqual(len(self.enumerator.split('ab')), 16)
+        self.assertIn('ab h', self.enumerator.split('ab'))
+        self.assertEqual(self.enumerator.split('abc'), [f'abc{char}' for char in 'abcdefgh'])
+        self.assertEqual(self.enumerator.split('abcd'), [])
+
+    def test_close(self):
+        """Test that a closed enumerator no longer splits searches."""
+        self.assertTrue(self.enumerator.enabled)
+        self.enumerator.close()
+        self.assertFalse(self.enumerator.enabled)
+
+    def test_shards_partition_seeds(self):
+        """Test that the shards' seed prefixes cover every seed exactly once."""
+        seeds = [list(self.enumerator.seed_prefixes(2, index, 3)) for index in range(3)]
+        combined = [prefix for shard in seeds for prefix in shard]
+        self.assertEqual(sorted(combined), sorted(self.enumerator.seed_prefixes(2)))
+        self.assertEqual(len(combined), 64)
+
+    def test_saturated_prefixes_are_narrowed(self):
+        """Test that names behind saturated prefixes are found through longer ones."""
+        names = [f'ab{c}{d}' for c in 'cdef' for d in 'gh'] + ['hb ca']
+        self.assertEqual(enumerate_names(names, self.enumerator), set(names))
+
+    def test_name_ending_at_saturated_prefix(self):
+        """Test the documented gap: a name that ends where a saturated prefix ends is only found if another search returns it."""
+        names = [f'ab{c}{d}' for c in 'cdef' for d in 'gh'] + ['ab']
+        self.assertEqual(enumerate_names(names, self.enumerator), set(names) - {'ab'})
+
+    def test_parse_shard(self):
+        """Test that shards are INDEX/COUNT with the index below the count."""
+        self.assertEqual(parse_shard('1/4'), (1, 4))
+        for value in ('4/4', '1', 'a/b', '0/0'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_shard(value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from brs.export import export_dataset, merge_exports
+
+
+class FakeDataset:
+    def __init__(self, items):
+        self.items = items
+
+    async def get_info(self):
+        return SimpleNamespace(item_count=len(self.items))
+
+    async def get_data(self, offset=0, limit=1000):
+        items = self.items[offset:offset + limit]
+        return SimpleNamespace(items=items, count=len(items), total=len(self.items))
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+
+def write_ndjson(path, items):
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(json.dumps(item) + '\n')
+
+
+class TestExportDataset(unittest.IsolatedAsyncioTestCase):
+    """Streaming the dataset to CSV and NDJSON."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = temp_dir.name
+
+    async def test_union_header(self):
+        """Test that the CSV header is the union of all keys, in first-seen order, across dataset pages."""
+        items = [
+            {'business_id': '1', 'business_name': 'A'},
+            {'error': 'broken', 'url': 'x'},
+            {'business_id': '2', 'business_name': 'B', 'status': 'Registered'},
+        ]
+        csv_path = os.path.join(self.dir, 'out.csv')
+        ndjson_path = os.path.join(self.dir, 'out.ndjson')
+        exported = await export_dataset(FakeDataset(items), csv_path=csv_path, ndjson_path=ndjson_path, chunk_size=2)
+        self.assertEqual(exported, 3)
+        header, rows = read_csv(csv_path)
+        self.assertEqual(header, ['business_id', 'business_name', 'error', 'url', 'status'])
+        self.assertEqual(rows[1]['error'], 'broken')
+        self.assertEqual(rows[2]['status'], 'Registered')
+        with open(ndjson_path, encoding='utf-8') as f:
+            self.assertEqual([json.loads(line) for line in f], items)
+
+    async def test_csv_only(self):
+        """Test that a CSV-only export leaves no temporary NDJSON behind, and an empty dataset writes nothing."""
+        csv_path = os.path.join(self.dir, 'out.csv')
+        before = set(os.listdir(tempfile.gettempdir()))
+        await export_dataset(FakeDataset([{'business_id': '1'}]), csv_path=csv_path)
+        self.assertEqual(set(os.listdir(tempfile.gettempdir())) - before, set())
+        self.assertEqual(read_csv(csv_path)[1], [{'business_id': '1'}])
+
+        empty_path = os.path.join(self.dir, 'empty.csv')
+        self.assertEqual(await export_dataset(FakeDataset([]), csv_path=empty_path), 0)
+        self.assertFalse(os.path.exists(empty_path))
+
+
+class TestMergeExports(unittest.TestCase):
+    """Merging the exports of several shards or runs."""
+
+    def test_one_record_per_business(self):
+        """Test that details beat error rows, the newest record wins and records without an id are kept."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        directory = temp_dir.name
+        first, second = os.path.join(directory, 'shard-0.ndjson'), os.path.join(directory, 'shard-1.ndjson')
+        write_ndjson(first, [
+            {'business_id': '1', 'extracted_at': '2024-01-02', 'status': 'Registered'},
+            {'business_id': '2', 'error': 'broken'},
+            {'error': 'no id', 'url': 'x'},
+        ])
+        write_ndjson(second, [
+            {'business_id': '1', 'extracted_at': '2024-01-01', 'status': 'Dissolved'},
+            {'business_id': '2', 'extracted_at': '2024-01-01', 'owner': 'A'},
+            {'business_id': '3', 'extracted_at': '2024-01-01'},
+        ])
+        csv_path = os.path.join(directory, 'merged.csv')
+        ndjson_path = os.path.join(directory, 'merged.ndjson')
+        self.assertEqual(merge_exports([first, second], csv_path=csv_path, ndjson_path=ndjson_path), (4, 2))
+
+        with open(ndjson_path, encoding='utf-8') as f:
+            merged = [json.loads(line) for line in f]
+        self.assertEqual([item.get('business_id') for item in merged], ['1', None, '2', '3'])
+        self.assertEqual(merged[0]['status'], 'Registered')
+        self.assertEqual(merged[2]['owner'], 'A')
+        header, rows = read_csv(csv_path)
+        self.assertEqual(header, ['business_id', 'extracted_at', 'status', 'error', 'url', 'owner'])
+        self.assertEqual(len(rows), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
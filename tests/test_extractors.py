@@ -0,0 +1,95 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import pages
+from benchmarks.fake_registry import Corpus, FakeRegistry
+from brs.extractors import RichDataExtractor, configure_parser_worker
+from brs.rawstore import RawHtmlStore, raw_html_store
+
+BASE_URL = 'http://127.0.0.1:8080'
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+class TestParserPool(unittest.IsolatedAsyncioTestCase):
+    """Parsing pages in worker processes (`--parser-workers`)."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.worker_raw_dir = os.path.join(directory.name, 'workers')
+        raw_html_store.open(os.path.join(directory.name, 'inline'))
+        self.addCleanup(raw_html_store.open, None)
+
+        self.inline = RichDataExtractor(BASE_URL)
+        self.pooled = RichDataExtractor(BASE_URL)
+        self.pooled.parser_pool = ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=configure_parser_worker,
+            initargs=(self.worker_raw_dir, BASE_URL),
+        )
+        self.addCleanup(self.pooled.parser_pool.shutdown)
+
+    async def test_matches_inline_parsing(self):
+        """Test that workers parse pages like the crawler does, with its base URL and raw HTML store."""
+        search_url = f'{BASE_URL}/BusinessRegistry/SearchBusinessRegistry'
+        search_page = pages.search_page(20, seed=1)
+        bodies = [(search_page, search_url)] + [
+            (pages.detail_page(business_id, sole_proprietorship=business_id % 2 == 0), pages.detail_url(business_id))
+            for business_id in range(100001, 100005)
+        ]
+        for html, url in bodies:
+            with self.subTest(url=url):
+                pooled = await self.pooled.parse_response(html.encode('utf-8'), url)
+                inline = await self.inline.parse_response(html.encode('utf-8'), url)
+                self.assertEqual(pooled, inline)
+
+        listings = (await self.pooled.parse_response(search_page.encode('utf-8'), search_url)).listings
+        self.assertEqual(len(listings), 20)
+        self.assertTrue(all(listing.detail_url.startswith(f'{BASE_URL}/BusinessRegistry/ViewDetails/')
+                            for listing in listings))
+        # The cards were stored by the workers, in the store they were configured with
+        worker_store = RawHtmlStore()
+        worker_store.open(self.worker_raw_dir)
+        for listing in listings:
+            self.assertEqual(worker_store.get(listing.card_html_sha256), raw_html_store.get(listing.card_html_sha256))
+
+
+class TestParserWorkersCrawl(unittest.TestCase):
+    """A crawl with `--parser-workers`."""
+
+    def crawl(self, registry, queries, *options):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        result = subprocess.run(
+            [sys.executable, '-m', 'brs', ','.join(queries), '--base-url', registry.url,
+             '--raw-html-dir', 'raw', '--live-output', 'live.ndjson', '--output-csv', '', *options],
+            cwd=work_dir.name, env=dict(os.environ, PYTHONPATH=SRC_DIR), capture_output=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr.decode(errors='replace'))
+        with open(os.path.join(work_dir.name, 'live.ndjson'), encoding='utf-8') as f:
+            records = [json.loads(line) for line in f][:-1]
+        raw_files = sum(len(files) for _, _, files in os.walk(os.path.join(work_dir.name, 'raw')))
+        return {record['business_id']: dict(record, extracted_at=None) for record in records}, raw_files
+
+    def test_same_records_as_inline(self):
+        """Test that two parser workers save the same records as inline parsing and store the cards' HTML."""
+        registry = FakeRegistry(Corpus(300)).start()
+        self.addCleanup(registry.stop)
+        queries = registry.corpus.queries(3)
+        inline, inline_raw = self.crawl(registry, queries)
+        pooled, pooled_raw = self.crawl(registry, queries, '--parser-workers', '2')
+        self.assertGreater(len(inline), 0)
+        self.assertEqual(pooled, inline)
+        self.assertGreater(pooled_raw, 0)
+        self.assertEqual(pooled_raw, inline_raw)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+from brs.index import BusinessIndex
+
+RECORD = {
+    'business_id': '1',
+    'business_name': 'Coral Traders Pvt Ltd',
+    'status': 'Registered',
+    'registration_number': 'C-0123/2020',
+    'owner': 'Ahmed  Ali',
+    'board_of_directors': [{'name': 'Mariyam Hassan'}],
+    'shareholders': [{'name': 'ahmed ali'}],
+    'business_names': [{'name': 'Coral Cafe', 'number': 'BN-42', 'upn': 'upn 7'}],
+    'business_activities': [{'activity_description': '5610 Restaurants', 'number': 'A-9'}],
+    'extracted_at': '2024-01-01T00:00:00',
+}
+
+
+class TestBusinessIndex(unittest.TestCase):
+    """Looking businesses up by name, number and activity code."""
+
+    def setUp(self):
+        self.index = BusinessIndex()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.index.open(os.path.join(temp_dir.name, 'index.db'))
+        self.addCleanup(self.index.close)
+
+    def ids(self, query, **options):
+        return [result['business_id'] for result in self.index.lookup(query, **options)]
+
+    def test_lookup(self):
+        """Test that people, names, numbers and activity codes are found in any spelling, with their roles."""
+        self.index.update([RECORD, dict(RECORD, business_id='2', owner='Other', shareholders=[], business_name='Reef')])
+        [result] = self.index.lookup('AHMED ALI')
+        self.assertEqual((result['business_id'], result['business_name'], result['status']), ('1', 'Coral Traders Pvt Ltd', 'Registered'))
+        self.assertEqual(sorted(match['role'] for match in result['matches']), ['owner', 'shareholder'])
+        self.assertEqual(self.ids('c 0123 2020'), ['1', '2'])
+        self.assertEqual(self.ids('coral cafe', kind='business_name'), ['1', '2'])
+        self.assertEqual(self.ids('UPN7'), ['1', '2'])
+        self.assertEqual(self.ids('5610', kind='activity'), ['1', '2'])
+        self.assertEqual(self.ids('mariyam'), [])
+        self.assertEqual(self.ids('mariyam', prefix=True), ['1', '2'])
+        self.assertEqual(self.ids('coral', kind='business_name', prefix=True, limit=1), ['1'])
+
+    def test_incremental_update(self):
+        """Test that only newer, changed records replace the indexed one, and error rows are skipped."""
+        self.assertEqual(self.index.update([RECORD, {'business_id': '3', 'error': 'broken'}])['new'], 1)
+        changed = dict(RECORD, owner='Hawwa Ibrahim', extracted_at='2024-04-01T00:00:00')
+        older = dict(RECORD, owner='Someone Else', extracted_at='2023-12-01T00:00:00')
+        counts = self.index.update([dict(RECORD, extracted_at='2024-03-01T00:00:00'), changed, older])
+        self.assertEqual((counts['unchanged'], counts['updated']), (2, 1))
+        self.assertEqual(self.ids('ahmed ali', kind='person'), ['1'])
+        self.assertEqual([m['role'] for m in self.index.lookup('ahmed ali')[0]['matches']], ['shareholder'])
+        self.assertEqual(self.ids('hawwa ibrahim'), ['1'])
+        self.assertEqual(self.ids('someone else'), [])
+        self.assertEqual(self.index.stats()['businesses'], 1)
+
+    def test_unchanged_recrawl_keeps_newest_time(self):
+        """Test that re-crawls with the same content move the indexed time on, so an older copy can't win."""
+        self.index.update([RECORD])
+        self.index.update([dict(RECORD, extracted_at='2024-03-01T00:00:00')])
+        counts = self.index.update([dict(RECORD, owner='Someone Else', extracted_at='2024-02-01T00:00:00')])
+        self.assertEqual(counts['unchanged'], 1)
+        self.assertEqual(self.ids('ahmed ali', kind='person'), ['1'])
+        self.assertEqual(self.ids('someone else'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks.fake_registry import Corpus, FakeRegistry
+from brs.extractors import BusinessRegistryExtractor
+from brs.sink import LiveSink
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+class BrokenPipe(io.StringIO):
+    def write(self, text):
+        raise BrokenPipeError('reader went away')
+
+
+class TestLiveSink(unittest.IsolatedAsyncioTestCase):
+    """Streaming records as NDJSON."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, 'live.ndjson')
+
+    def read_lines(self):
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    async def test_summary(self):
+        """Test that close() ends the stream with a summary that doesn't count itself."""
+        sink = LiveSink()
+        sink.open(self.path)
+        sink.write({'business_id': '1'})
+        sink.write({'error': 'broken', 'url': 'x'})
+        sink.close(completed=True, counters={'pages_business_detail': 2})
+
+        lines = self.read_lines()
+        self.assertEqual(lines[:2], [{'business_id': '1'}, {'error': 'broken', 'url': 'x'}])
+        summary = lines[2]
+        self.assertEqual(summary['page_type'], 'run_summary')
+        self.assertEqual((summary['completed'], summary['records'], summary['errors']), (True, 2, 1))
+        self.assertEqual(summary['counters'], {'pages_business_detail': 2})
+        self.assertIsNotNone(summary['first_record_sec'])
+        self.assertEqual(sink.written, 2)
+        self.assertFalse(sink.enabled)
+
+    async def test_periodic_flush(self):
+        """Test that records reach the file before the sink is closed."""
+        sink = LiveSink()
+        sink.open(self.path, flush_interval=0.01)
+        sink.write({'business_id': '1'})
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.read_lines(), [{'business_id': '1'}])
+        sink.close()
+
+    async def test_broken_pipe(self):
+        """Test that a reader going away stops streaming without raising."""
+        sink = LiveSink()
+        sink.open(self.path)
+        sink._file.close()
+        sink._file = BrokenPipe()
+        with self.assertLogs('brs.sink', 'WARNING'):
+            sink.write({'business_id': '1'})
+        self.assertFalse(sink.enabled)
+        sink.write({'business_id': '2'})
+        sink.close()
+        self.assertEqual(sink.written, 0)
+
+    async def test_disabled(self):
+        """Test that no path means no streaming."""
+        sink = LiveSink()
+        sink.open(None)
+        sink.write({'business_id': '1'})
+        sink.close()
+        self.assertFalse(sink.enabled)
+        self.assertEqual(sink.written, 0)
+
+
+class TestStdoutStream(unittest.TestCase):
+    """`--live-output -` shares stdout with nothing else."""
+
+    def test_extraction_errors_are_not_printed(self):
+        """Test that listing and detail extraction errors are logged, not printed."""
+        extractor = BusinessRegistryExtractor()
+        stdout = io.StringIO()
+        card = '<div class="feature_home"><h3><span>NAME</span></h3></div>'
+        page = f'<html><body>{card}</body></html>'
+        with mock.patch.object(extractor, '_map_icon_to_category', side_effect=ValueError('bad card')), \
+                self.assertLogs('brs.extractors', 'ERROR'), contextlib.redirect_stdout(stdout):
+            self.assertEqual(extractor.extract_business_listings(page, 'https://x/SearchBusinessRegistry'), [])
+        with mock.patch.object(extractor, '_extract_business_banner', side_effect=ValueError('bad page')), \
+                self.assertLogs('brs.extractors', 'ERROR'), contextlib.redirect_stdout(stdout):
+            detail = extractor.extract_business_details_reference(page, 'https://x/ViewDetails/1')
+        self.assertEqual(detail.page_type, 'detail_page_error')
+        self.assertEqual(stdout.getvalue(), '')
+
+    def test_stdout_has_only_json_lines(self):
+        """Test that a crawl streaming to stdout writes nothing but JSON lines, ending with the summary."""
+        registry = FakeRegistry(Corpus(300)).start()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        work_dir = temp_dir.name
+        try:
+            result = subprocess.run(
+                [sys.executable, '-m', 'brs', ','.join(registry.corpus.queries(3)), '--base-url', registry.url,
+                 '--live-output', '-', '--output-csv', ''],
+                cwd=work_dir, env=dict(os.environ, PYTHONPATH=SRC_DIR), capture_output=True, timeout=120,
+            )
+        finally:
+            registry.stop()
+        self.assertEqual(result.returncode, 0, result.stderr.decode(errors='replace'))
+        lines = result.stdout.decode('utf-8').splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertGreater(len(records), 1)
+        self.assertEqual(records[-1]['page_type'], 'run_summary')
+        self.assertEqual(records[-1]['records'], len(records) - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import random
+import unittest
+
+from benchmarks import pages
+from benchmarks.fake_registry import Corpus
+from brs.extractors import RichDataExtractor
+from brs.matching import NameMatcher, _core, ngrams, normalize_business_name
+from brs.records import BusinessListing
+
+
+def dice(name, query):
+    name_grams = set(ngrams(_core(normalize_business_name(name))))
+    query_grams = set(ngrams(_core(normalize_business_name(query))))
+    return 2 * len(name_grams & query_grams) / (len(name_grams) + len(query_grams))
+
+
+class TestNormalization(unittest.TestCase):
+    """Matching keys of business names."""
+
+    def test_equivalent_spellings(self):
+        """Test that case, punctuation, whitespace and legal form spellings don't change the key."""
+        key = normalize_business_name('abc private limited')
+        for name in ('ABC (Pvt.) Ltd', 'abc  PVT. LTD.', 'abc\tpvt ltd'):
+            with self.subTest(name=name):
+                self.assertEqual(normalize_business_name(name), key)
+        self.assertEqual(normalize_business_name("Ali's Co & Sons"), 'alis company and sons')
+        self.assertEqual(normalize_business_name('R&D'), 'r and d')
+        self.assertEqual(normalize_business_name(' -- '), '')
+
+
+class TestNameMatcher(unittest.TestCase):
+    """Matching business names against the queries."""
+
+    def test_exact(self):
+        """Test that exact mode matches normalized names only, reporting the first query with that key."""
+        matcher = NameMatcher.from_queries(['Coral Traders Pvt Ltd', 'coral traders private limited', 'Blue'])
+        self.assertEqual(len(matcher), 2)
+        self.assertEqual(matcher.match('CORAL TRADERS (PVT) LTD'), ('Coral Traders Pvt Ltd', 1.0))
+        self.assertIsNone(matcher.match('Coral Trader Pvt Ltd'))
+        self.assertIsNone(matcher.match(None))
+        self.assertEqual(matcher.match_any([None, 'Other', 'blue']), ('Blue', 1.0))
+
+    def test_fuzzy_threshold(self):
+        """Test that fuzzy matches need the threshold, leave out legal forms and prefer the best query."""
+        matcher = NameMatcher.from_queries(['Coral Traders', 'Coral Tradings'], mode='fuzzy', threshold=0.8)
+        match = matcher.match('Coral Trader Pvt Ltd')
+        self.assertEqual(match.query, 'Coral Traders')
+        self.assertAlmostEqual(match.score, dice('Coral Trader', 'Coral Traders'), places=4)
+        self.assertIsNone(matcher.match('Coral Reef Divers'))
+        strict = NameMatcher.from_queries(['Coral Traders'], mode='fuzzy', threshold=0.95)
+        self.assertIsNone(strict.match('Coral Trader'))
+
+    def test_fuzzy_index_matches_linear_scan(self):
+        """Test that the n-gram index finds the same best score as scoring every query."""
+        rng = random.Random(0)
+        queries = [card.name for card in Corpus(500).cards.values()]
+        for threshold in (0.5, 0.8):
+            matcher = NameMatcher.from_queries(queries, mode='fuzzy', threshold=threshold)
+            for query in rng.sample(queries, 50):
+                name = query[:-2] + query[-1]
+                scores = [dice(name, other) for other in queries]
+                best = max(scores)
+                match = matcher.match(name)
+                with self.subTest(name=name, threshold=threshold):
+                    if normalize_business_name(name) in map(normalize_business_name, queries):
+                        self.assertEqual(match.score, 1.0)
+                    elif best >= threshold:
+                        self.assertAlmostEqual(match.score, round(best, 4), places=4)
+                    else:
+                        self.assertIsNone(match)
+
+    def test_invalid_options(self):
+        """Test that unknown modes and thresholds outside (0, 1] are rejected."""
+        with self.assertRaises(ValueError):
+            NameMatcher('phonetic')
+        with self.assertRaises(ValueError):
+            NameMatcher('fuzzy', 0)
+
+
+class TestListingPrefilter(unittest.TestCase):
+    """Ruling out detail pages from their search result card."""
+
+    def setUp(self):
+        self.extractor = RichDataExtractor()
+        self.extractor.matcher = NameMatcher.from_queries(['Coral Traders'])
+
+    def test_categories(self):
+        """Test that sole proprietorship and company cards are fetched without a name match."""
+        cases = {
+            ('OTHER NAME', 'Sole Proprietorship'): True,
+            ('OTHER NAME', 'Unknown'): True,
+            ('OTHER NAME', 'Business Name'): False,
+            ('CORAL TRADERS', 'Unknown'): True,
+            ('coral  traders', 'Business Activity'): True,
+        }
+        for (name, category), expected in cases.items():
+            with self.subTest(name=name, category=category):
+                listing = BusinessListing(business_name=name, business_category=category)
+                self.assertEqual(self.extractor.could_match_listing(listing), expected)
+
+    def test_company_matched_by_trading_name(self):
+        """Test that a company whose only matching name is a trading name is fetched and matched."""
+        detail_html = pages.detail_page(100001, business_names=1, name='OTHER NAME Pvt Ltd')
+        trading_name = self.extractor.parse_page(detail_html, pages.detail_url(100001)).detail.business_names[0]['name']
+        self.extractor.matcher = NameMatcher.from_queries([trading_name])
+
+        card = pages.Card(100001, 'OTHER NAME Pvt Ltd', '', 'Private Company', 'Registered')
+        search_url = f'{pages.BASE_URL}/BusinessRegistry/SearchBusinessRegistry'
+        listings = self.extractor.parse_page(pages.render_search_page(trading_name, [card]), search_url).listings
+        self.assertEqual([listing.business_category for listing in listings], ['Unknown'])
+        self.assertTrue(self.extractor.could_match_listing(listings[0]))
+
+        detail = self.extractor.parse_page(detail_html, pages.detail_url(100001)).detail
+        self.assertEqual(self.extractor.match_detail(detail), (trading_name, 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from crawlee import Request
+from crawlee.storage_clients.models import ProcessedRequest
+
+from benchmarks.fake_registry import Corpus, FakeRegistry
+from brs import routes
+from brs.matching import NameMatcher
+from brs.queries import DetailFirstTandem, QueryFeed, QueryStream
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def build_request(query):
+    return None if query == 'skip' else Request.from_url(f'https://x/search?q={query}')
+
+
+class HandledQueue:
+    """Persisted request queue in which the given searches were handled by an earlier attempt."""
+
+    def __init__(self, handled_urls):
+        self.handled_urls = set(handled_urls)
+        self.pending = []
+
+    async def is_empty(self):
+        return not self.pending
+
+    async def add_request(self, request, *, forefront=False):
+        handled = request.url in self.handled_urls
+        if not handled:
+            self.pending.insert(0 if forefront else len(self.pending), request)
+        return ProcessedRequest(
+            id=request.id, unique_key=request.unique_key, was_already_present=handled, was_already_handled=handled,
+        )
+
+    async def fetch_next_request(self):
+        return self.pending.pop(0) if self.pending else None
+
+
+class TestQueryStream(unittest.TestCase):
+    """Normalizing, deduplicating and sharding queries."""
+
+    def test_dedup_and_shards(self):
+        """Test that shards split the queries while the matcher gets all of them."""
+        queries = [' abc  co ', 'ABC CO', '', 'def', 'ghi', 'jkl']
+        matcher = NameMatcher()
+        shards = [list(QueryStream(queries, index, 2, matcher=matcher if index == 0 else None)) for index in range(2)]
+        self.assertEqual(sorted(shards[0] + shards[1]), ['abc co', 'def', 'ghi', 'jkl'])
+        self.assertEqual(len(matcher), 4)
+
+
+class TestQueryFeed(unittest.IsolatedAsyncioTestCase):
+    """Feeding searches with a bounded number in flight."""
+
+    async def test_in_flight_limit(self):
+        """Test that at most max_in_flight searches are fed until one is released."""
+        feed = QueryFeed()
+        feed.open(['a', 'skip', 'b', 'c'], build_request, max_in_flight=2)
+        first = await feed.fetch_next_request()
+        second = await feed.fetch_next_request()
+        self.assertEqual([first.url, second.url], ['https://x/search?q=a', 'https://x/search?q=b'])
+        self.assertTrue(await feed.is_empty())
+        self.assertFalse(await feed.is_finished())
+        self.assertIsNone(await feed.fetch_next_request())
+
+        feed.release()
+        self.assertEqual((await feed.fetch_next_request()).url, 'https://x/search?q=c')
+        feed.release()
+        feed.release()
+        self.assertTrue(await feed.is_finished())
+        self.assertEqual((feed.in_flight, feed.fed), (0, 3))
+        self.assertEqual(await feed.get_handled_count(), 3)
+
+    async def test_extend_goes_first(self):
+        """Test that extended queries are fed ahead of the stream, in order."""
+        feed = QueryFeed()
+        feed.open(['a', 'b'], build_request, max_in_flight=10)
+        await feed.fetch_next_request()
+        feed.extend(['a1', 'a2'])
+        urls = [(await feed.fetch_next_request()).url for _ in range(3)]
+        self.assertEqual(urls, ['https://x/search?q=a1', 'https://x/search?q=a2', 'https://x/search?q=b'])
+
+    async def test_release_on_failure(self):
+        """Test that a search that failed for good frees its slot, and a failed detail page doesn't."""
+        feed = QueryFeed()
+        feed.open(['a', 'b'], build_request, max_in_flight=1)
+        search = await feed.fetch_next_request()
+        detail = Request.from_url('https://x/BusinessRegistry/ViewDetails/1')
+        with mock.patch.object(routes, 'query_feed', feed):
+            await routes.failed_request_handler(mock.Mock(request=detail), RuntimeError('gone'))
+            self.assertEqual(feed.in_flight, 1)
+            with mock.patch.object(routes, 'request_kind', return_value='search'):
+                await routes.failed_request_handler(mock.Mock(request=search), RuntimeError('gone'))
+        self.assertEqual(feed.in_flight, 0)
+        self.assertIsNotNone(await feed.fetch_next_request())
+
+    async def test_release_already_handled(self):
+        """Test that a search the request queue already handled gives its slot back, so the feed goes on."""
+        feed = QueryFeed()
+        queue = HandledQueue(['https://x/search?q=a', 'https://x/search?q=b'])
+        for gate in (None, mock.Mock(can_start=mock.Mock(return_value=True), reserve=mock.Mock(return_value=True))):
+            with self.subTest(gated=gate is not None):
+                feed.open(['a', 'b', 'c'], build_request, max_in_flight=1)
+                tandem = DetailFirstTandem(feed, queue, gate)
+                self.assertIsNone(await tandem.fetch_next_request())
+                self.assertEqual(feed.in_flight, 0)
+                self.assertIsNone(await tandem.fetch_next_request())
+                self.assertEqual((await tandem.fetch_next_request()).url, 'https://x/search?q=c')
+                self.assertEqual((feed.in_flight, feed.fed), (1, 3))
+
+
+class TestExactMatchOrdering(unittest.TestCase):
+    """Exact matching doesn't depend on the order queries are read in."""
+
+    def test_later_exact_query_still_saves(self):
+        """Test that a business found by an earlier, broader search is saved for a later exact query."""
+        corpus = Corpus(300)
+        name = corpus.cards[100001].name
+        queries = [name.split()[0], 'zzqq1', 'zzqq2', 'zzqq3', name]
+        registry = FakeRegistry(corpus).start()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        work_dir = temp_dir.name
+        try:
+            result = subprocess.run(
+                [sys.executable, '-m', 'brs', ','.join(queries), '--base-url', registry.url,
+                 '--exact-match-only', '--max-pending-searches', '1',
+                 '--live-output', 'live.ndjson', '--output-csv', ''],
+                cwd=work_dir, env=dict(os.environ, PYTHONPATH=SRC_DIR), capture_output=True, timeout=120,
+            )
+        finally:
+            registry.stop()
+        self.assertEqual(result.returncode, 0, result.stderr.decode(errors='replace'))
+        with open(os.path.join(work_dir, 'live.ndjson'), encoding='utf-8') as f:
+            records = [json.loads(line) for line in f][:-1]
+        self.assertEqual([(r['business_id'], r['matched_query']) for r in records], [('100001', name)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from brs.rawstore import RawHtmlStore
+
+
+class TestRawHtmlStore(unittest.TestCase):
+    """Content-addressed storage of raw HTML."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = os.path.join(directory.name, 'raw')
+        self.store = RawHtmlStore()
+        self.store.open(self.root)
+
+    def files(self):
+        return sorted(os.path.relpath(os.path.join(path, name), self.root)
+                      for path, _, names in os.walk(self.root) for name in names)
+
+    def test_round_trip(self):
+        """Test that stored HTML comes back unchanged from a gzip file named by its SHA-256."""
+        html = '<div class="feature_home"><h3>ރަށު Traders</h3></div>'
+        digest = self.store.put(html)
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(self.store.get(digest), html)
+        self.assertEqual(self.files(), [os.path.join(digest[:2], f'{digest}.html.gz')])
+        with gzip.open(self.store.path(digest), 'rb') as f:
+            self.assertEqual(f.read(), html.encode('utf-8'))
+
+    def test_deduplication(self):
+        """Test that identical HTML is stored once and different HTML gets its own file."""
+        first = self.store.put('<p>same</p>')
+        mtime = os.path.getmtime(self.store.path(first))
+        os.utime(self.store.path(first), (mtime - 60, mtime - 60))
+        self.assertEqual(self.store.put('<p>same</p>'), first)
+        self.assertEqual(os.path.getmtime(self.store.path(first)), mtime - 60)
+        other = self.store.put('<p>other</p>')
+        self.assertNotEqual(other, first)
+        self.assertEqual(len(self.files()), 2)
+
+    def test_disabled(self):
+        """Test that a store that wasn't opened with a directory keeps nothing."""
+        store = RawHtmlStore()
+        store.open(None)
+        self.assertFalse(store.enabled)
+        self.assertIsNone(store.put('<p>x</p>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
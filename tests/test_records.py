@@ -0,0 +1,58 @@
+import pickle
+import unittest
+
+from benchmarks import pages
+from brs.extractors import BusinessRegistryExtractor
+from brs.records import BusinessDetail, BusinessListing, DetailPageError
+
+# Keys of the dicts the extractor returned before records were slotted, in their order
+DETAIL_KEYS = [
+    'business_id', 'detail_url', 'page_type', 'extracted_at',
+    'business_name', 'business_type', 'address', 'registration_number', 'status', 'upn', 'sme_classification',
+    'owner', 'managing_director', 'board_of_directors', 'board_of_directors_count',
+    'shareholders', 'shareholders_count', 'business_names', 'business_names_count',
+    'business_activities', 'business_activities_count', 'permits', 'licenses',
+]
+LISTING_KEYS = [
+    'business_name', 'business_type', 'status', 'business_category', 'business_id', 'detail_url', 'detail_path',
+    'search_query', 'source_url', 'icon_class', 'has_detail_link', 'domain',
+]
+
+
+class TestRecords(unittest.TestCase):
+    """Slotted records and their dict form."""
+
+    def test_detail_key_order(self):
+        """Test that a detail record's dict has the keys of the old dataset rows, in the same order."""
+        extractor = BusinessRegistryExtractor()
+        detail = extractor.extract_business_details(pages.detail_page(100001), pages.detail_url(100001))
+        self.assertIsInstance(detail, BusinessDetail)
+        record = detail.to_dict()
+        self.assertEqual(list(record), DETAIL_KEYS)
+        self.assertEqual((record['business_id'], record['page_type']), ('100001', 'business_detail'))
+        self.assertEqual(record['board_of_directors_count'], len(record['board_of_directors']))
+
+    def test_listing_key_order(self):
+        """Test that listings keep their old key order, with the card's hash in place of its HTML."""
+        listing = BusinessRegistryExtractor().extract_business_listings(pages.search_page(1), pages.search_url())[0]
+        self.assertEqual(list(listing.to_dict()), LISTING_KEYS + ['card_html_sha256'])
+        self.assertIsNone(listing.card_html_sha256)
+
+    def test_fields(self):
+        """Test that missing fields default to None, unknown fields are rejected and records compare by value."""
+        error = DetailPageError(error='broken', business_id='1')
+        self.assertEqual(error.to_dict(), {
+            'error': 'broken', 'detail_url': None, 'page_type': None, 'business_id': '1',
+            'html_length': None, 'html_sha256': None, 'extracted_at': None,
+        })
+        with self.assertRaises(TypeError):
+            BusinessListing(business_name='A', card_html='<div></div>')
+        self.assertEqual(BusinessListing(business_name='A'), BusinessListing(business_name='A'))
+        self.assertNotEqual(BusinessListing(business_name='A'), BusinessListing(business_name='B'))
+        self.assertEqual(pickle.loads(pickle.dumps(error)), error)
+        with self.assertRaises(AttributeError):
+            error.full_html = '<html></html>'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from brs.schedule import RecrawlScheduler
+from brs.store import BusinessStore
+
+NOW = datetime.datetime(2024, 3, 1)
+
+
+def record(business_id, status='Registered', activities=()):
+    return {
+        'business_id': business_id,
+        'status': status,
+        'detail_url': f'https://x/BusinessRegistry/ViewDetails/{business_id}',
+        'business_activities': [dict(activity) for activity in activities],
+    }
+
+
+def days_ago(days):
+    return NOW - datetime.timedelta(days=days)
+
+
+class TestRecrawlScheduler(unittest.TestCase):
+    """Deciding which stored businesses to fetch again."""
+
+    def setUp(self):
+        self.scheduler = RecrawlScheduler()
+        self.store = BusinessStore()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, 'brs.db')
+        self.addCleanup(self.store.close)
+
+    def add(self, seen, *records):
+        self.store.open(self.path, run_id=seen.isoformat())
+        for item in records:
+            self.store.upsert(item)
+        self.store.close()
+
+    def test_intervals(self):
+        """Test that the interval follows the status, the change rate and how long the record stayed the same."""
+        seen = days_ago(0)
+        interval = self.scheduler.interval_days
+        self.assertEqual(interval(record('1'), seen, seen, seen, 0), 30)
+        self.assertEqual(interval(record('1', 'Dissolved'), seen, seen, seen, 0), 180)
+        self.assertEqual(interval(record('1', None), seen, seen, seen, 0), 60)
+        self.assertAlmostEqual(interval(record('1'), seen, days_ago(730), seen, 2), 15, places=1)
+        self.assertEqual(interval(record('1', 'Dissolved'), seen, days_ago(800), days_ago(400), 0), 360)
+        self.assertEqual(interval(record('1'), seen, seen, seen, 1000), 1)
+
+    def test_expiry_brings_check_forward(self):
+        """Test that the next check is a week before an open activity's expiry, and closed activities don't count."""
+        seen = days_ago(10)
+        expiring = record('1', activities=[{'expiry_date': '10-Mar-2024', 'state': 'Active'}])
+        self.assertEqual(self.scheduler.next_check(expiring, seen, seen, seen, 0), (datetime.datetime(2024, 3, 3), 'expiry'))
+        closed = record('1', activities=[{'expiry_date': '10-Mar-2024', 'state': 'Cancelled'}])
+        self.assertEqual(self.scheduler.next_check(closed, seen, seen, seen, 0)[1], 'interval')
+
+    def test_due_order_and_budget(self):
+        """Test that due businesses come expiry checks first, then by urgency, within the budget."""
+        self.add(days_ago(60), record('overdue'), record('dissolved', 'Dissolved'))
+        self.add(days_ago(35), record('due'))
+        self.add(days_ago(9), record('expiring', activities=[{'expiry_date': '05-Mar-2024'}]), record('fresh'))
+
+        self.store.open(self.path)
+        due = self.scheduler.due(self.store, budget=10, now=NOW)
+        self.assertEqual([business.business_id for business in due], ['expiring', 'overdue', 'due'])
+        self.assertEqual(self.scheduler.due_count, 3)
+        self.assertAlmostEqual(due[1].urgency, 2.0)
+
+        self.assertEqual([b.business_id for b in self.scheduler.due(self.store, budget=2, now=NOW)], ['expiring', 'overdue'])
+        next_checks = dict(self.store._conn.execute('SELECT business_id, next_check FROM businesses'))
+        self.assertEqual(next_checks['fresh'], days_ago(9 - 30).isoformat())
+        self.assertEqual(next_checks['dissolved'], days_ago(60 - 180).isoformat())
+
+
+if __name__ == '__main__':
+    unittest.main()
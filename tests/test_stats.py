@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from benchmarks.fake_registry import Corpus, FakeRegistry
+from brs.stats import Histogram, RunStats
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+class TestHistogram(unittest.TestCase):
+    """Log-scale timing histogram."""
+
+    def test_percentiles(self):
+        """Test that percentiles are bucket upper bounds, capped at the largest observation."""
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(0.5))
+        for seconds in (0.001, 0.001, 0.001, 0.05):
+            histogram.observe(seconds)
+        self.assertAlmostEqual(histogram.percentile(0.5), 0.0016, places=6)
+        self.assertEqual(histogram.percentile(0.99), 0.05)
+        self.assertEqual((histogram.count, histogram.min, histogram.max), (4, 0.001, 0.05))
+
+
+class TestRunStats(unittest.TestCase):
+    """Counters and stage timings of a run."""
+
+    def test_start_resets(self):
+        """Test that starting a run drops the counters and timings of an earlier run in the same process."""
+        stats = RunStats()
+        stats.increment('pages_business_detail', 3)
+        with stats.time('decode'):
+            pass
+        stats.start()
+        self.assertEqual(stats.summary(), {})
+        self.assertEqual(stats.timings, {})
+        stats.increment('pages_business_detail')
+        self.assertEqual(stats.to_dict()['pages'], 1)
+
+    def test_write(self):
+        """Test that the metrics file holds the counters, page rate and a histogram per timed stage."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = os.path.join(temp_dir.name, 'metrics.json')
+        stats = RunStats()
+        stats.increment('pages_search_results')
+        stats.increment('pages_business_detail', 2)
+        stats.increment('queries_searched')
+        for _ in range(3):
+            with stats.time('extract_and_save'):
+                pass
+        stats.observe('crawl', 0.25)
+        stats.write(path)
+
+        with open(path, encoding='utf-8') as f:
+            metrics = json.load(f)
+        self.assertEqual(list(metrics), ['elapsed_sec', 'pages', 'pages_per_sec', 'counters', 'timings'])
+        self.assertEqual(metrics['pages'], 3)
+        self.assertGreater(metrics['pages_per_sec'], 0)
+        self.assertEqual(metrics['counters'], {
+            'pages_business_detail': 2, 'pages_search_results': 1, 'queries_searched': 1,
+        })
+        self.assertEqual(list(metrics['timings']), ['crawl', 'extract_and_save'])
+        self.assertEqual(metrics['timings']['extract_and_save']['count'], 3)
+        self.assertEqual(metrics['timings']['crawl'], {
+            'count': 1, 'total_sec': 0.25, 'mean_sec': 0.25, 'min_sec': 0.25, 'max_sec': 0.25,
+            'p50_sec': 0.25, 'p90_sec': 0.25, 'p99_sec': 0.25, 'buckets': {'le_0.4096': 1},
+        })
+
+
+class TestCrawlMetrics(unittest.TestCase):
+    """Metrics of a crawl, in the metrics file and the METRICS record."""
+
+    def test_stage_timings(self):
+        """Test that every stage of a crawl is timed, and the METRICS record matches the metrics file."""
+        registry = FakeRegistry(Corpus(50)).start()
+        self.addCleanup(registry.stop)
+        queries = registry.corpus.queries(2)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        work_dir = temp_dir.name
+        result = subprocess.run(
+            [sys.executable, '-m', 'brs', ','.join(queries), '--base-url', registry.url,
+             '--output-csv', 'businesses.csv', '--metrics-file', 'metrics.json'],
+            cwd=work_dir, env=dict(os.environ, PYTHONPATH=SRC_DIR), capture_output=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr.decode(errors='replace'))
+
+        with open(os.path.join(work_dir, 'metrics.json'), encoding='utf-8') as f:
+            metrics = json.load(f)
+        counters, timings = metrics['counters'], metrics['timings']
+        self.assertEqual(counters['queries_searched'], 2)
+        searches, details = counters['pages_search_results'], counters['pages_business_detail']
+        self.assertEqual(searches, 2)
+        self.assertGreater(details, 0)
+        self.assertEqual(metrics['pages'], searches + details)
+        self.assertEqual(timings['crawl']['count'], 1)
+        self.assertEqual(timings['export']['count'], 1)
+        self.assertEqual(timings['extract_and_save']['count'], searches + details)
+        self.assertEqual(timings['enqueue']['count'], searches)
+
+        with open(os.path.join(work_dir, 'storage', 'key_value_stores', 'default', 'METRICS.json'),
+                  encoding='utf-8') as f:
+            record = json.load(f)
+        self.assertEqual(record['counters'], counters)
+        self.assertEqual(list(record['timings']), list(timings))
+
+
+if __name__ == '__main__':
+    unittest.main()
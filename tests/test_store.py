@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from benchmarks import pages
+from brs.extractors import RichDataExtractor
+from brs.store import BusinessStore, content_hash
+
+
+def record(business_id='1', **fields):
+    return {'business_id': business_id, 'business_name': 'CORAL', 'status': 'Registered',
+            'shareholders': [{'name': 'A'}], 'extracted_at': '2024-01-01T00:00:00', **fields}
+
+
+class TestBusinessStore(unittest.TestCase):
+    """Upserting detail records and logging their changes."""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, 'brs.db')
+
+    def open(self, run_id, **options):
+        store = BusinessStore(**options)
+        store.open(self.path, run_id=run_id)
+        self.addCleanup(store.close)
+        return store
+
+    def test_content_hash_ignores_volatile_fields(self):
+        """Test that fetch time, URL and match fields don't change the hash, and content does."""
+        base = content_hash(record())
+        self.assertEqual(content_hash(record(extracted_at='later', detail_url='x', matched_query='c', match_score=1)), base)
+        self.assertNotEqual(content_hash(record(status='Dissolved')), base)
+
+    def test_new_unchanged_changed(self):
+        """Test that upserts across runs report new, unchanged and changed records with their changed fields."""
+        first = self.open('run-1')
+        self.assertEqual(first.upsert(record()), ('new', ['status', 'board_of_directors', 'shareholders', 'business_activities']))
+        first.close()
+
+        second = self.open('run-2')
+        self.assertEqual(second.upsert(record(extracted_at='later')), ('unchanged', []))
+        self.assertEqual(second.upsert(record('2')), ('new', mock.ANY))
+        second.close()
+
+        third = self.open('run-3')
+        self.assertEqual(third.upsert(record(status='Dissolved')), ('changed', ['status']))
+        changes = list(third.iter_changes())
+        self.assertEqual(len(changes), 1)
+        self.assertEqual((changes[0]['previous']['status'], changes[0]['current']['status']), ('Registered', 'Dissolved'))
+        self.assertEqual(list(third.iter_changes('run-2'))[0]['business_id'], '2')
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = os.path.join(temp_dir.name, 'changes.ndjson')
+        self.assertEqual(third.export_changes(path), 1)
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(json.loads(f.readline())['change_type'], 'changed')
+
+    def test_resumed_run_repeats_result(self):
+        """Test that upserting the same record again in a run reports the first result, batched or not."""
+        store = self.open('run-1')
+        self.assertEqual(store.upsert(record())[0], 'new')
+        self.assertEqual(store.upsert(record())[0], 'new')
+        store.flush()
+        self.assertEqual(store.upsert(record())[0], 'new')
+
+    def test_batched_commits(self):
+        """Test that upserts are committed once per batch, and reads see the pending ones."""
+        store = self.open('run-1', batch_size=3)
+        reader = sqlite3.connect(self.path)
+        self.addCleanup(reader.close)
+
+        def count():
+            return reader.execute('SELECT COUNT(*) FROM businesses').fetchone()[0]
+
+        store.upsert(record('1'))
+        store.upsert(record('2'))
+        self.assertEqual(count(), 0)
+        self.assertEqual(len(list(store.iter_records())), 2)
+        self.assertEqual(count(), 2)
+        for business_id in '345':
+            store.upsert(record(business_id))
+        self.assertEqual(count(), 5)
+
+    def test_locked_store_retries(self):
+        """Test that a batch blocked by another writer is kept and retried, and written once the lock is free."""
+        store = self.open('run-1', timeout=0.01)
+        store.upsert(record())
+        other = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+        with mock.patch('brs.store.time.sleep') as sleep, self.assertLogs('brs.store', 'WARNING'):
+            with self.assertRaises(sqlite3.OperationalError):
+                store.flush()
+        self.assertEqual(sleep.call_count, BusinessStore.LOCKED_RETRIES - 1)
+        other.execute('COMMIT')
+        store.flush()
+        self.assertEqual(other.execute('SELECT business_id FROM businesses').fetchall(), [('1',)])
+
+
+class TestUnchangedDetail(unittest.IsolatedAsyncioTestCase):
+    """Detail pages whose record is already stored."""
+
+    async def test_unchanged_is_not_pushed(self):
+        """Test that an unchanged record is reported once as unchanged, not also as skipped."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        path = os.path.join(temp_dir.name, 'brs.db')
+        store = BusinessStore()
+        self.addCleanup(store.close)
+        extractor = RichDataExtractor()
+        context = mock.Mock()
+        context.request.url = pages.detail_url(100001)
+        context.http_response.read.return_value = pages.detail_page(100001).encode()
+        with mock.patch('brs.extractors.business_store', store), \
+                mock.patch('brs.extractors.dataset_writer.push', mock.AsyncMock()) as push:
+            store.open(path, run_id='run-1')
+            first = await extractor.extract_and_save(context)
+            store.close()
+            store.open(path, run_id='run-2')
+            context.log.reset_mock()
+            second = await extractor.extract_and_save(context)
+        push.assert_awaited_once()
+        self.assertTrue(first.saved and second.saved)
+        messages = [call.args[0] for call in context.log.info.call_args_list]
+        self.assertTrue(any(message.startswith('UNCHANGED') for message in messages))
+        self.assertFalse(any(message.startswith('SKIPPING') for message in messages))
+
+
+if __name__ == '__main__':
+    unittest.main()
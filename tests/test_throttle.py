@@ -0,0 +1,192 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from urllib.parse import urlencode
+
+from crawlee import Request
+
+from benchmarks import pages
+from benchmarks.fake_registry import Corpus, FakeRegistry
+from brs.queries import DetailFirstTandem, QueryFeed
+from brs.throttle import AdaptiveHttpClient, AdaptiveLimiter
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def search_request(query):
+    return Request.from_url(
+        f'{pages.BASE_URL}/BusinessRegistry/SearchBusinessRegistry', method='POST',
+        payload=urlencode({'query': query}).encode(), use_extended_unique_key=True,
+    )
+
+
+class FakeQueue:
+    """In-memory stand-in for the crawler's request queue."""
+
+    def __init__(self, requests=()):
+        self.pending = list(requests)
+        self.in_progress = []
+        self.handled = []
+
+    async def is_empty(self):
+        return not self.pending
+
+    async def is_finished(self):
+        return not self.pending and not self.in_progress
+
+    async def add_request(self, request, *, forefront=False):
+        self.pending.insert(0 if forefront else len(self.pending), request)
+
+    async def fetch_next_request(self):
+        if not self.pending:
+            return None
+        request = self.pending.pop(0)
+        self.in_progress.append(request)
+        return request
+
+    async def reclaim_request(self, request, *, forefront=False):
+        self.in_progress.remove(request)
+        await self.add_request(request, forefront=forefront)
+
+    async def mark_request_as_handled(self, request):
+        self.in_progress.remove(request)
+        self.handled.append(request)
+
+
+class TestAdaptiveLimiter(unittest.IsolatedAsyncioTestCase):
+    """AIMD concurrency limit driven by latency and errors."""
+
+    async def respond(self, limiter, latencies, outcome='ok'):
+        for latency in latencies:
+            await limiter.acquire()
+            await limiter.release(latency, outcome)
+
+    async def test_converges_under_jitter(self):
+        """Test that the limit reaches the ceiling when latency only jitters around a steady mean."""
+        rng = random.Random(0)
+        limiter = AdaptiveLimiter('detail', 32, initial=2)
+        await self.respond(limiter, (max(0.001, rng.gauss(0.1, 0.04)) for _ in range(2000)))
+        self.assertEqual(int(limiter.limit), 32)
+
+    async def test_converges_at_near_zero_latency(self):
+        """Test that relative jitter of sub-millisecond responses doesn't hold the limit back."""
+        rng = random.Random(0)
+        limiter = AdaptiveLimiter('detail', 16, initial=2)
+        await self.respond(limiter, (rng.expovariate(1000) for _ in range(1000)))
+        self.assertEqual(int(limiter.limit), 16)
+
+    async def test_latency_rise_stops_growth(self):
+        """Test that the limit doesn't grow while latency is well above the baseline, until the window forgets it."""
+        limiter = AdaptiveLimiter('detail', 64, initial=2, window=50)
+        await self.respond(limiter, [0.1] * 100)
+        await self.respond(limiter, [1.0] * 10)
+        grown = limiter.limit
+        await self.respond(limiter, [1.0] * 30)
+        self.assertEqual(limiter.limit, grown)
+        await self.respond(limiter, [1.0] * 100)
+        self.assertGreater(limiter.limit, grown)
+        self.assertAlmostEqual(limiter.baseline_latency, 1.0)
+
+    async def test_failure_halves(self):
+        """Test that a 429 halves the limit once per latency window and pauses new requests."""
+        limiter = AdaptiveLimiter('search', 8, initial=8)
+        await self.respond(limiter, [0.1])
+        await limiter.acquire()
+        await limiter.acquire()
+        await limiter.release(0.1, 'throttled', retry_after=0.05)
+        await limiter.release(0.1, 'throttled')
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertGreater(limiter._paused_until, 0)
+        await limiter.release(0.1, 'error')
+        self.assertEqual(limiter.limit, 4)
+
+
+class TestGatedTandem(unittest.IsolatedAsyncioTestCase):
+    """Requests are only handed to the crawler with a concurrency slot."""
+
+    def setUp(self):
+        self.client = AdaptiveHttpClient(None, search_ceiling=1, detail_ceiling=2)
+        self.feed = QueryFeed()
+        self.feed.open(['coral', 'reef'], search_request, max_in_flight=10)
+        self.queue = FakeQueue(Request.from_url(pages.detail_url(business_id)) for business_id in range(100001, 100004))
+        self.tandem = DetailFirstTandem(self.feed, self.queue, self.client)
+
+    async def test_budgets(self):
+        """Test that each kind is handed out up to its limit and the slot comes back once the request is handled."""
+        details = [await self.tandem.fetch_next_request() for _ in range(2)]
+        self.assertEqual([str(r.url) for r in details], [pages.detail_url(100001), pages.detail_url(100002)])
+        search = await self.tandem.fetch_next_request()
+        self.assertIn('SearchBusinessRegistry', str(search.url))
+        self.assertTrue(await self.tandem.is_empty())
+        self.assertIsNone(await self.tandem.fetch_next_request())
+        self.assertFalse(await self.tandem.is_finished())
+
+        await self.tandem.mark_request_as_handled(details[0])
+        self.assertEqual(self.client.limiters['detail'].in_flight, 1)
+        self.assertFalse(await self.tandem.is_empty())
+        self.assertEqual(str((await self.tandem.fetch_next_request()).url), pages.detail_url(100003))
+
+    async def test_pause_holds_requests_back(self):
+        """Test that nothing is handed out while a 429 pauses a kind, and a retried search waits for its budget."""
+        detail = self.client.limiters['detail']
+        search = self.client.limiters['search']
+        detail.limit = 1
+        search.limit = 1
+        await detail.acquire()
+        await detail.release(0.1, 'throttled', retry_after=30)
+        first = await self.tandem.fetch_next_request()
+        self.assertIn('SearchBusinessRegistry', str(first.url))
+        self.assertTrue(await self.tandem.is_empty())
+        self.assertIsNone(await self.tandem.fetch_next_request())
+
+        # The search fails and goes back to the queue, ahead of the details, while searches are full
+        await self.tandem.reclaim_request(first, forefront=True)
+        await search.acquire()
+        detail._paused_until = 0
+        self.assertIsNone(await self.tandem.fetch_next_request())
+        self.assertEqual(self.tandem._held, [(first, self.tandem._held[0][1])])
+        self.assertEqual(str((await self.tandem.fetch_next_request()).url), pages.detail_url(100001))
+        await search.cancel()
+        self.assertIs(await self.tandem.fetch_next_request(), first)
+        self.assertEqual(search.in_flight, 1)
+        await self.tandem.mark_request_as_handled(first)
+        self.assertEqual(search.in_flight, 0)
+
+
+class TestThrottledCrawl(unittest.TestCase):
+    """A crawl the registry throttles."""
+
+    def test_no_requests_lost(self):
+        """Test that a crawl with 429s and Retry-After pauses still saves every business."""
+        corpus = Corpus(300)
+        queries = corpus.queries(10)
+        registry = FakeRegistry(corpus, throttle_rate=0.2, retry_after=3).start()
+        expected = {str(card.business_id) for query in queries for card in corpus.search(query, registry.max_results)}
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        try:
+            result = subprocess.run(
+                [sys.executable, '-m', 'brs', ','.join(queries), '--base-url', registry.url,
+                 '--live-output', 'live.ndjson', '--output-csv', ''],
+                cwd=work_dir.name, env=dict(os.environ, PYTHONPATH=SRC_DIR), capture_output=True, timeout=300,
+            )
+            throttled = sum(count for (kind, status), count in registry.counts.items() if status == 429)
+        finally:
+            registry.stop()
+        log = result.stderr.decode(errors='replace')
+        self.assertEqual(result.returncode, 0, log)
+        self.assertGreater(throttled, 0)
+        with open(os.path.join(work_dir.name, 'live.ndjson'), encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual({record['business_id'] for record in records[:-1]}, expected)
+        self.assertNotIn('timed out', log)
+        self.assertNotIn('reached maximum retries', log)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import shutil
+import tempfile
+import unittest
+
+import httpx
+from crawlee import Request
+
+from benchmarks import pages
+from benchmarks.fake_registry import Corpus, FakeRegistry, self_signed_certificate
+from brs.stats import run_stats
+from brs.transport import build_http_client
+
+
+class RecordingRegistry(FakeRegistry):
+    """Fake registry that remembers the Accept-Encoding of every request."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(Corpus(10), *args, **kwargs)
+        self.accept_encodings = []
+
+    def respond(self, method, path, body=b'', accept_encoding=''):
+        self.accept_encodings.append(accept_encoding)
+        return super().respond(method, path, body, accept_encoding)
+
+
+class TestBuildHttpClient(unittest.IsolatedAsyncioTestCase):
+    """Transport options of the registry client."""
+
+    def setUp(self):
+        run_stats.start()
+        self.registry = RecordingRegistry().start()
+        self.addCleanup(self.registry.stop)
+
+    async def fetch(self, client, count=1):
+        url = pages.detail_url(100001).replace(pages.BASE_URL, self.registry.url)
+        async with client:
+            for _ in range(count):
+                result = await client.crawl(Request.from_url(url))
+                self.assertEqual(result.http_response.status_code, 200)
+
+    def test_limits_and_timeouts(self):
+        """Test that the pool size, keep-alive and timeouts reach the httpx client and its pool."""
+        client = build_http_client(pool_size=7, keep_alive_expiry=3, connect_timeout=1, request_timeout=2)
+        httpx_client = client._get_client(None)
+        self.assertEqual(httpx_client.timeout, httpx.Timeout(2, connect=1))
+        pool = client._transport._pool
+        self.assertEqual((pool._max_connections, pool._max_keepalive_connections, pool._keepalive_expiry), (7, 7, 3))
+
+        pool = build_http_client(pool_size=7, keep_alive=False)._get_client(None)._transport._pool
+        self.assertEqual((pool._max_connections, pool._max_keepalive_connections), (7, 0))
+
+    async def test_compression(self):
+        """Test that each compression mode sends its Accept-Encoding, and unknown modes are rejected."""
+        for compression, expected in (('gzip', 'gzip'), ('none', 'identity')):
+            with self.subTest(compression=compression):
+                await self.fetch(build_http_client(compression=compression))
+                self.assertEqual(self.registry.accept_encodings[-1], expected)
+        await self.fetch(build_http_client())
+        self.assertIn('gzip', self.registry.accept_encodings[-1])
+        self.assertNotEqual(self.registry.accept_encodings[-1], 'gzip')
+        with self.assertRaises(ValueError):
+            build_http_client(compression='br')
+
+    async def test_connection_counters(self):
+        """Test that kept-alive connections are opened once and reused, and without keep-alive every time."""
+        await self.fetch(build_http_client(http2=False), count=3)
+        self.assertEqual(run_stats.summary(), {
+            'http_connections_opened': 1, 'http_connections_reused': 2, 'http_responses_http11': 3,
+        })
+        self.assertEqual(self.registry.connections, 1)
+        self.assertEqual(run_stats.timings['http_connect'].count, 1)
+
+        run_stats.start()
+        await self.fetch(build_http_client(http2=False, keep_alive=False), count=3)
+        self.assertEqual(run_stats.summary(), {'http_connections_opened': 3, 'http_responses_http11': 3})
+        self.assertEqual(self.registry.connections, 4)
+
+
+@unittest.skipUnless(shutil.which('openssl'), 'needs openssl for a self-signed certificate')
+class TestTls(unittest.IsolatedAsyncioTestCase):
+    """Registry client over TLS."""
+
+    def setUp(self):
+        run_stats.start()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.certificate = self_signed_certificate(directory.name)
+
+    async def fetch(self, client, registry, count=1):
+        url = pages.detail_url(100001).replace(pages.BASE_URL, registry.url)
+        async with client:
+            for _ in range(count):
+                result = await client.crawl(Request.from_url(url))
+                self.assertEqual(result.http_response.status_code, 200)
+
+    async def test_ca_bundle_and_handshakes(self):
+        """Test that the CA bundle is trusted, and kept-alive HTTP/1.1 and HTTP/2 connections need one handshake."""
+        for http2 in (False, True):
+            with self.subTest(http2=http2):
+                run_stats.start()
+                registry = FakeRegistry(Corpus(10), certificate=self.certificate, http2=http2).start()
+                self.addCleanup(registry.stop)
+                await self.fetch(build_http_client(http2=http2, ca_bundle=self.certificate[0]), registry, count=3)
+                version = 'http2' if http2 else 'http11'
+                self.assertEqual(run_stats.summary(), {
+                    'http_connections_opened': 1, 'http_connections_reused': 2, 'http_tls_handshakes': 1,
+                    f'http_responses_{version}': 3,
+                })
+                self.assertEqual(run_stats.timings['http_tls_handshake'].count, 1)
+
+    async def test_untrusted_certificate(self):
+        """Test that without the CA bundle the self-signed certificate is rejected."""
+        registry = FakeRegistry(Corpus(10), certificate=self.certificate).start()
+        self.addCleanup(registry.stop)
+        with self.assertRaises(httpx.ConnectError):
+            await self.fetch(build_http_client(), registry)
+
+
+if __name__ == '__main__':
+    unittest.main()
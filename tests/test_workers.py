@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from benchmarks.fake_registry import Corpus, FakeRegistry
+from brs import dedup
+from brs.dedup import SeenIndex
+from brs.workers import WorkerPool
+
+from .test_dedup import FakeStore
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def read_ndjson(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+class TestSharedSeenIndex(unittest.IsolatedAsyncioTestCase):
+    """The seen index of a `--workers` run."""
+
+    async def test_round_trip(self):
+        """Test that workers see the pool's fetch times and the pool gets theirs back."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        pool = WorkerPool(2, temp_dir.name)
+        store = FakeStore({'old': time.time() - 3600, 'expired': time.time() - 3 * 86400})
+        with mock.patch.object(dedup.KeyValueStore, 'open', mock.AsyncMock(return_value=store)) as open_store:
+            await pool.share_seen_index(1)
+
+            for index in range(pool.count):
+                worker = SeenIndex(1)
+                worker.share(pool.claims_path)
+                await worker.load()
+                self.assertEqual(worker.check('old'), 'fresh')
+                worker.mark_fetched(f'new-{index}')
+                await worker.save()
+                worker.share(None)
+            self.assertEqual(open_store.await_count, 1)
+
+            await pool.collect_seen_index(1)
+        self.assertEqual(set(store.value), {'old', 'new-0', 'new-1'})
+        self.assertTrue(os.path.exists(pool.claims_path))
+
+
+
+class TestRunWorkers(unittest.TestCase):
+    """A crawl with `--workers`."""
+
+    def crawl(self, registry, queries, *options):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        work_dir = temp_dir.name
+        command = [sys.executable, '-m', 'brs', ','.join(queries), '--base-url', registry.url,
+                   '--output-csv', '', '--output-ndjson', 'out.ndjson', '--metrics-file', 'metrics.json',
+                   '--store', 'brs.db', '--changes-only', 'changes.ndjson', '--seen-ttl-days', '1', *options]
+        result = subprocess.run(command, cwd=work_dir, env=dict(os.environ, PYTHONPATH=SRC_DIR),
+                                capture_output=True, timeout=300)
+        self.assertEqual(result.returncode, 0, result.stderr.decode(errors='replace'))
+        return work_dir
+
+    def test_same_records_as_single_process(self):
+        """Test that two workers split the queries, fetch each business once and merge like a single process."""
+        registry = FakeRegistry(Corpus(300)).start()
+        self.addCleanup(registry.stop)
+        queries = registry.corpus.queries(6)
+        single_dir = self.crawl(registry, queries)
+        pooled_dir = self.crawl(registry, queries, '--workers', '2')
+
+        single = {record['business_id']: dict(record, extracted_at=None)
+                  for record in read_ndjson(os.path.join(single_dir, 'out.ndjson'))}
+        merged = read_ndjson(os.path.join(pooled_dir, 'out.ndjson'))
+        ids = [record['business_id'] for record in merged]
+        self.assertGreater(len(single), 0)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual({record['business_id']: dict(record, extracted_at=None) for record in merged}, single)
+
+        # Disjoint shards: every query searched by one worker, every business fetched by one worker
+        pool_dir = os.path.join(pooled_dir, 'storage', 'workers', 'default')
+        shards = [{record['business_id'] for record in read_ndjson(os.path.join(pool_dir, f'shard-{index}.ndjson'))}
+                  for index in range(2)]
+        self.assertEqual(shards[0] & shards[1], set())
+        with open(os.path.join(pooled_dir, 'metrics.json'), encoding='utf-8') as f:
+            metrics = json.load(f)
+        self.assertTrue(all(worker['counters']['queries_searched'] for worker in metrics['workers']))
+        self.assertEqual(metrics['counters']['queries_searched'], len(queries))
+        self.assertEqual(metrics['counters']['pages_business_detail'], len(single))
+
+        # The change log of the shared store and the seen index hold every worker's businesses
+        changes = read_ndjson(os.path.join(pooled_dir, 'changes.ndjson'))
+        self.assertEqual({change['business_id'] for change in changes}, set(single))
+        with open(os.path.join(pooled_dir, 'storage', 'key_value_stores', 'brs-seen-index', 'fetched_at.json'),
+                  encoding='utf-8') as f:
+            self.assertEqual(set(json.load(f)), set(single))
+
+
+if __name__ == '__main__':
+    unittest.main()
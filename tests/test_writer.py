@@ -0,0 +1,68 @@
+import unittest
+from unittest import mock
+
+from brs.writer import DatasetWriter
+
+
+class FlakyDataset:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.items = []
+
+    async def push_data(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('storage unavailable')
+        self.items.extend(batch)
+
+
+class TestDatasetWriter(unittest.IsolatedAsyncioTestCase):
+    """Buffering records and pushing them in batches."""
+
+    def writer(self, dataset, **options):
+        writer = DatasetWriter(**options)
+        writer._dataset = dataset
+        return writer
+
+    async def test_batches(self):
+        """Test that records are pushed once a batch is full, and the rest on flush."""
+        dataset = FlakyDataset()
+        writer = self.writer(dataset, max_items=2)
+        for business_id in '123':
+            await writer.push({'business_id': business_id})
+        self.assertEqual(len(dataset.items), 2)
+        await writer.flush()
+        self.assertEqual([item['business_id'] for item in dataset.items], ['1', '2', '3'])
+        self.assertEqual(writer.pushed, 3)
+
+    async def test_failed_flush_in_push(self):
+        """Test that a failed size-triggered flush is logged, not raised, and its records are pushed once later."""
+        dataset = FlakyDataset(failures=1)
+        writer = self.writer(dataset, max_items=2)
+        await writer.push({'business_id': '1'})
+        with self.assertLogs('brs.writer', 'WARNING'):
+            await writer.push({'business_id': '2'})
+        self.assertEqual(dataset.items, [])
+        await writer.flush()
+        self.assertEqual([item['business_id'] for item in dataset.items], ['1', '2'])
+
+    async def test_failed_explicit_flush(self):
+        """Test that an explicit flush raises and keeps the records buffered."""
+        writer = self.writer(FlakyDataset(failures=1))
+        await writer.push({'business_id': '1'})
+        with self.assertRaises(ConnectionError):
+            await writer.flush()
+        self.assertEqual(len(writer._buffer), 1)
+
+    async def test_flush_writes_store_first(self):
+        """Test that the store's batched upserts are written before records reach the dataset."""
+        writer = self.writer(FlakyDataset())
+        await writer.push({'business_id': '1'})
+        with mock.patch('brs.writer.business_store.flush', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                await writer.flush()
+        self.assertEqual(writer.pushed, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()